@@ -0,0 +1,58 @@
+"""
+Benchmark: JSON shard files vs. SQLite as cache backend, for the write pattern of a galaxy sync
+(one record upserted at a time into a growing shard) and for point reads.
+Run from the repository root: 'python3 -m benchmarks.bench_cache_backends'
+"""
+
+#==========
+import tempfile
+from time import perf_counter
+from src.utilities.cache_backends import CacheBackend, FileShardBackend, SqliteBackend
+
+#----------
+def make_system(num:int) -> dict:
+    """A record roughly the size of a cached system"""
+    symbol = f"X1-{num:05d}"
+    waypoints = [{"symbol":f"{symbol}-{w}","type":"PLANET","x":w,"y":-w} for w in range(10)]
+    return {symbol:{"symbol":symbol,"sectorSymbol":"X1","type":"RED_STAR","x":num,"y":num
+                    ,"waypoints":waypoints,"factions":[]}}
+
+#----------
+def time_backend(backend:CacheBackend,root:str,records:int) -> tuple[float,float,float]:
+    """Seconds for: one-by-one upserts, one bulk upsert, and one point read per record"""
+    systems = [make_system(num) for num in range(records)]
+    #Everything in one shard - the worst case of a sync filling a shard:
+    file_path = f"{root}/systems/X1-0.json"
+
+    start = perf_counter()
+    for system in systems:
+        backend.upsert(file_path,system)
+    upserts = perf_counter() - start
+
+    bulk = {}
+    for system in systems:
+        bulk.update(system)
+    start = perf_counter()
+    backend.bulk_upsert({f"{root}/systems/X1-1.json":bulk})
+    bulk_time = perf_counter() - start
+
+    start = perf_counter()
+    for system in systems:
+        backend.get(file_path,next(iter(system)))
+    reads = perf_counter() - start
+    return upserts,bulk_time,reads
+
+#----------
+def main(records:int=500) -> None:
+    print(f"{records} records       upserts      bulk     point reads")
+    with tempfile.TemporaryDirectory() as root:
+        results = time_backend(FileShardBackend(),root + "/files",records)
+        print("JSON files:    " + "".join(f"{seconds:9.3f}s " for seconds in results))
+        backend = SqliteBackend(root + "/sqlite")
+        results = time_backend(backend,root + "/sqlite",records)
+        backend.close()
+        print("SQLite (WAL):  " + "".join(f"{seconds:9.3f}s " for seconds in results))
+
+#----------
+if __name__ == "__main__":
+    main()
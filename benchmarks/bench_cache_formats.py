@@ -0,0 +1,68 @@
+"""
+Benchmark: size on disk, load time and peak memory of a full-galaxy systems cache in each shard
+format (formats whose optional packages aren't installed are skipped).
+Run from the repository root: 'python3 -m benchmarks.bench_cache_formats'
+"""
+
+#==========
+import os
+import tempfile
+import tracemalloc
+from time import perf_counter
+from src.utilities.cache_backends import FileShardBackend
+from src.utilities.cache_formats import get_shard_format
+from .bench_cache_backends import make_system
+
+#----------
+def write_galaxy(backend:FileShardBackend,root:str,systems:int) -> None:
+    """Systems sharded like Systems.create_cache_path (first 4 characters of the symbol)"""
+    shards = {}
+    for num in range(systems):
+        system = make_system(num)
+        symbol = next(iter(system))
+        shards.setdefault(f"{root}/systems/{symbol[0:4]}{num % 26}.json",{}).update(system)
+    for file_path,data in shards.items():
+        backend.write_shard(file_path,data)
+
+#----------
+def measure_format(root:str,format_name:str,systems:int) -> tuple[int,float,int]:
+    """(bytes on disk, seconds to load every shard, peak bytes allocated while loading)"""
+    root = f"{root}/{format_name}"
+    write_galaxy(FileShardBackend(root,{"systems":format_name}),root,systems)
+    #Shard files only (not the offset indexes in 'systems/.index/'):
+    size = sum(os.path.getsize(f"{root}/systems/{name}") for name in os.listdir(f"{root}/systems")
+               if not name.startswith("."))
+
+    start = perf_counter()
+    load_all(root,format_name)
+    load_time = perf_counter() - start
+    #Separate pass, since tracing allocations slows down loading:
+    tracemalloc.start()
+    load_all(root,format_name)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size,load_time,peak
+
+#----------
+def load_all(root:str,format_name:str) -> None:
+    """Reads every shard through a fresh backend, so nothing is served from memory"""
+    backend = FileShardBackend(root,{"systems":format_name})
+    for file_path in backend.list_shards(f"{root}/systems"):
+        backend.read_shard(file_path)
+
+#----------
+def main(systems:int=8000) -> None:
+    print(f"{systems} systems      size on disk     load time    peak memory")
+    with tempfile.TemporaryDirectory() as root:
+        for format_name in ("json","json-compact","msgpack","msgpack+zstd"):
+            try:
+                get_shard_format(format_name)
+            except ImportError as e:
+                print(f"{format_name:14} skipped: {e}")
+                continue
+            size,load_time,peak = measure_format(root,format_name,systems)
+            print(f"{format_name:14} {size / 2**20:10.2f} MiB {load_time:10.3f}s {peak / 2**20:10.1f} MiB")
+
+#----------
+if __name__ == "__main__":
+    main()
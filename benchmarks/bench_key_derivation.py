@@ -0,0 +1,38 @@
+"""
+Benchmark: cost of decrypting the API key on a cold start vs. a warm start (the same agent's token
+decrypted again in the same process - e.g., when the connection is re-created).
+Run from the repository root: 'python3 -m benchmarks.bench_key_derivation'
+"""
+
+#==========
+from time import perf_counter
+from src.utilities.crypt_utilities import password_encrypt, password_decrypt_cached, clear_key_cache
+
+#----------
+def time_decrypt(token:bytes,password:str,repeats:int) -> float:
+    """Mean seconds per decryption"""
+    start = perf_counter()
+    for _ in range(repeats):
+        password_decrypt_cached(token,lambda: password)
+    return (perf_counter() - start) / repeats
+
+#----------
+def main(repeats:int=5) -> None:
+    password = "benchmark-password"
+    token = password_encrypt(b"benchmark-api-key",password)
+
+    cold_times = []
+    for _ in range(repeats):
+        clear_key_cache()
+        cold_times.append(time_decrypt(token,password,1))
+    cold = sum(cold_times) / repeats
+    warm = time_decrypt(token,password,repeats * 20)
+
+    print(f"Cold decrypt (PBKDF2 runs): {cold * 1000:8.2f} ms")
+    print(f"Warm decrypt (cached):      {warm * 1000:8.2f} ms")
+    print(f"Speed-up:                   {cold / warm:8.0f}x")
+    clear_key_cache()
+
+#----------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: time to first HUD (ship list + ShipOperator for the chosen ship) with and without the
+cache warm-up, against a simulated API with network latency and the shipped rate limits. The player
+spends 'menu_seconds' in the main menu before choosing 'command'.
+Run from the repository root: 'python3 -m benchmarks.bench_prefetch'
+"""
+
+#==========
+import os
+import json
+import yaml
+import tempfile
+from time import sleep,perf_counter
+from unittest import mock
+from requests.models import Response
+from src import base
+from src.base import SpaceTraderConfigSetup,reset_shared_connection
+from src.utilities.crypt_utilities import password_encrypt
+from src.utilities.http_utilities import SessionManager
+
+#==========
+password = "bench-password"
+systems = {"X1-HQ":8,"X1-FAR":5} #System: waypoints (every second one has a marketplace)
+
+#----------
+def make_system(symbol:str,waypoints:int) -> dict:
+    return {"symbol":symbol,"sectorSymbol":"X1","type":"RED_STAR","x":0,"y":0,"factions":[]
+            ,"waypoints":[{"symbol":f"{symbol}-W{num}","type":"PLANET","x":num,"y":num
+                           ,"traits":[{"symbol":"MARKETPLACE" if num % 2 == 0 else "ROCKY"}]}
+                          for num in range(waypoints)]}
+
+#----------
+def make_ship(symbol:str,system:str) -> dict:
+    nav = {"systemSymbol":system,"waypointSymbol":f"{system}-W0","status":"DOCKED","flightMode":"CRUISE"
+           ,"route":{"arrival":"2026-10-01T00:00:00Z"}}
+    return {"symbol":symbol,"nav":nav,"crew":{},"mounts":[],"modules":[],"frame":{},"reactor":{}
+            ,"engine":{},"cargo":{"inventory":[]},"fuel":{"current":100,"capacity":100}}
+
+#----------
+def fake_api(latency:float):
+    """SessionManager.request answering like the API for one agent with two ships"""
+    ships = [make_ship("BENCH-1","X1-HQ"),make_ship("BENCH-2","X1-FAR")]
+    def request(self,method:str,url:str,**kwargs) -> Response:
+        sleep(latency)
+        path = url.split("/v2",1)[1].split("?")[0]
+        parts = path.strip("/").split("/")
+        if path == "/my/agent":
+            body = {"data":{"symbol":"BENCH","credits":1000,"headquarters":"X1-HQ-W0"}}
+        elif path == "/my/ships":
+            body = {"data":ships,"meta":{"total":len(ships),"page":1,"limit":20}}
+        elif path == "/my/contracts":
+            body = {"data":[{"id":"C1","accepted":True}],"meta":{"total":1,"page":1,"limit":20}}
+        elif path == "/factions":
+            body = {"data":[{"symbol":"COSMIC"}],"meta":{"total":1,"page":1,"limit":20}}
+        elif path.endswith("/scan/waypoints"):
+            system = next(ship for ship in ships if ship["symbol"] == parts[2])["nav"]["systemSymbol"]
+            waypoints = make_system(system,systems[system])["waypoints"]
+            body = {"data":{"waypoints":[dict(waypoint,systemSymbol=system) for waypoint in waypoints]}}
+        elif path.endswith("/cooldown"):
+            body = {"data":{"expiration":"2026-10-01T00:00:00Z"}}
+        elif path.endswith("/orbit"):
+            body = {"data":{"nav":next(ship for ship in ships if ship["symbol"] == parts[2])["nav"]}}
+        elif path.endswith("/nav"):
+            body = {"data":next(ship for ship in ships if ship["symbol"] == parts[2])["nav"]}
+        elif parts[0:2] == ["my","ships"]:
+            body = {"data":next(ship for ship in ships if ship["symbol"] == parts[2])}
+        elif path.endswith("/market"):
+            body = {"data":{"symbol":parts[3],"imports":[],"exports":[],"exchange":[],"tradeGoods":[]}}
+        elif parts[0] == "systems":
+            body = {"data":make_system(parts[1],systems[parts[1]])}
+        else:
+            body = {"data":{}}
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response._content = json.dumps(body).encode()
+        return response
+    return request
+
+#----------
+def time_to_first_hud(prefetch:list[str],menu_seconds:float,latency:float) -> tuple[float,int]:
+    """Seconds from choosing 'command' to the first HUD, and the number of API calls by then"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = yaml.safe_load(open(SpaceTraderConfigSetup.config_path))
+        config["agents"] = {"all_agents":[{"callsign":"BENCH","key_encrypted":
+                                           password_encrypt(b"token",password,iterations=1000).decode()}]
+                            ,"current":"BENCH"}
+        config["cache"].update({"path":tmp_dir + "/","epochs":False,"prefetch":prefetch})
+        config_path = tmp_dir + "/gameinfo.yaml"
+        with open(config_path,"w") as file:
+            yaml.dump(config,file)
+
+        calls = []
+        request = fake_api(latency)
+        def counted_request(self,method:str,url:str,**kwargs) -> Response:
+            calls.append(url)
+            return request(self,method,url,**kwargs)
+
+        with mock.patch.object(SpaceTraderConfigSetup,"config_path",config_path) \
+            ,mock.patch.dict(os.environ,{"SPACETRADER_PASSWORD":password}) \
+            ,mock.patch.object(SessionManager,"request",counted_request) \
+            ,mock.patch.object(base,"_shared_rate_limiter",None),mock.patch.object(base,"_shared_scheduler",None):
+            #(A fresh rate limit budget for every run)
+            reset_shared_connection()
+            #Imported late - as in the game, importing them must not connect (see prefetch):
+            from src import prefetch
+            from src.ship_operator import ShipOperator
+            from src.ships import Ships
+            from src.systems import Systems
+            #A fresh warmer, and endpoints pointing at this run's cache:
+            prefetch.cache_warmer = warmer = prefetch.CacheWarmer()
+            ShipOperator.systems = Systems()
+            with mock.patch("src.ship_operator.cache_warmer",warmer):
+                #As main_menu_loop, and ship_command_loop when the player picks a ship:
+                warmer.start(prefetch.SpaceTraderConfigSetup().get_cache_config().get("prefetch") or [])
+                sleep(menu_seconds)
+                start = perf_counter()
+                ship_list = list(warmer.take("ships") or Ships().list_all_ships())
+                ShipOperator(ship_list[1])
+                seconds = perf_counter() - start
+            warmer.wait()
+            reset_shared_connection()
+        return seconds,len(calls)
+
+#----------
+def main(menu_seconds:float=3.0,latency:float=0.15,rounds:int=3) -> None:
+    print(f"API latency {latency}s, {menu_seconds}s in the main menu, best of {rounds}")
+    print("                     time to first HUD   API calls")
+    shipped = SpaceTraderConfigSetup().get_cache_config().get("prefetch") or []
+    for label,prefetch in [("no prefetch",[]),("ships, contracts",["ships","contracts"]),("shipped config",shipped)]:
+        results = [time_to_first_hud(prefetch,menu_seconds,latency) for _ in range(rounds)]
+        seconds,calls = min(results)
+        print(f"{label:<21}{seconds:>16.3f}s {calls:>11}")
+
+#----------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark: price index updates for a stream of market refreshes, writing the price chart after
+every refresh vs. in batches.
+Run from the repository root: 'python3 -m benchmarks.bench_price_index'
+"""
+
+#==========
+import random
+import tempfile
+from time import perf_counter
+from src.utilities.cache_utilities import FileShardBackend,set_cache_backend
+from src.utilities.price_index import PriceIndex
+
+#----------
+def make_refreshes(refreshes:int,markets:int,commodities:int) -> list[tuple[str,list[dict]]]:
+    """Market refreshes as from several ships: (waypoint, trade goods) with random prices"""
+    rng = random.Random(1)
+    symbols = [f"GOOD_{num}" for num in range(commodities)]
+    result = []
+    for _ in range(refreshes):
+        waypoint = f"X1-M{rng.randrange(markets)}"
+        goods = [{"symbol":sym,"purchasePrice":rng.randint(10,500),"sellPrice":rng.randint(10,500)}
+                 for sym in rng.sample(symbols,12)]
+        result.append((waypoint,goods))
+    return result
+
+#----------
+def time_index(root:str,refreshes:list,depth:int,flush_seconds:float) -> float:
+    index = PriceIndex(f"{root}/price_chart.json",depth=depth,flush_seconds=flush_seconds)
+    start = perf_counter()
+    for waypoint,goods in refreshes:
+        index.update_market(waypoint,goods)
+    index.flush()
+    return perf_counter() - start
+
+#----------
+def main(refreshes:int=2000,markets:int=300,commodities:int=60) -> None:
+    updates = make_refreshes(refreshes,markets,commodities)
+    print(f"{refreshes} market refreshes, {markets} markets, {commodities} commodities")
+    print("depth   write every refresh   batched (30s)")
+    for depth in (3,10):
+        with tempfile.TemporaryDirectory() as root:
+            set_cache_backend(FileShardBackend())
+            every = time_index(root + "/every",updates,depth,flush_seconds=0)
+            batched = time_index(root + "/batched",updates,depth,flush_seconds=30)
+            print(f"{depth:>5} {every:>20.3f}s {batched:>14.3f}s")
+    set_cache_backend(FileShardBackend())
+
+#----------
+if __name__ == "__main__":
+    main()
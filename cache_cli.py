@@ -0,0 +1,116 @@
+"""
+Command-line tools for maintaining the local game cache (gameData), separate from the game itself.
+Example: 'python3 cache_cli.py sync-systems --resume'
+"""
+import typer
+from src.systems import Systems
+from src.base import SpaceTraderConfigSetup,SpaceTraderConnection,configure_cache_backend,get_current_cache_config
+from src.utilities.cache_backends import FileShardBackend,SqliteBackend,migrate_files_to_backend
+from src.utilities.cache_utilities import (get_cache_sharding,reshard_cache_dir,get_shard_load_report
+    ,get_cache_namespace_report)
+
+#Cache directories whose records are sharded by system symbol:
+SHARDED_DIRS = ["systems","markets"]
+#Cached markets are keyed by waypoint, but sharded by the waypoint's system:
+SHARD_KEYS = {"markets":SpaceTraderConnection.get_system_from_waypoint}
+
+#----------
+app = typer.Typer()
+
+#----------
+@app.command()
+def sync_systems(resume:bool = typer.Option(False,"--resume",help="Continue an interrupted sync from its checkpoint")):
+    """Download all systems in the galaxy into the cache. Needed after every server reset."""
+    Systems().reload_systems_in_cache(resume=resume)
+
+#----------
+@app.command()
+def migrate_to_sqlite():
+    """Copy the JSON cache files into the SQLite cache database. Set 'cache: backend: sqlite' in
+    gameinfo.yaml afterwards to use it. The JSON files are left in place."""
+    cache_path = get_current_cache_config(SpaceTraderConfigSetup().get_cache_config())["path"]
+    backend = SqliteBackend(cache_path)
+    migrated = migrate_files_to_backend(cache_path,backend)
+    backend.close()
+    for namespace,records in migrated.items():
+        print(f"{namespace}: {records} records")
+    print(f"Migrated {sum(migrated.values())} records into {backend.db_path}")
+
+#----------
+@app.command()
+def reshard(directory:list[str] = typer.Argument(None,help="Cache directories to re-shard (default: systems, markets)")):
+    """Re-distribute cached records over shards of the strategy set in gameinfo.yaml ('cache: sharding').
+    Run after changing the strategy, so existing records are found again."""
+    cache_config = get_current_cache_config(SpaceTraderConfigSetup().get_cache_config())
+    configure_cache_backend(cache_config)
+    print(f"Sharding: {get_cache_sharding().get_config()}")
+    for name in directory or SHARDED_DIRS:
+        result = reshard_cache_dir(cache_config["path"] + name + "/",shard_key=SHARD_KEYS.get(name))
+        print(f"{name}: {result['records']} records, {result['shards_before']} -> {result['shards_after']} shards")
+
+#----------
+@app.command()
+def shard_report(directory:list[str] = typer.Argument(None,help="Cache directories to report on (default: systems, markets)")
+                 ,largest:int = typer.Option(5,help="Number of largest shards to list")):
+    """Show how evenly cached records are spread over shards"""
+    cache_config = get_current_cache_config(SpaceTraderConfigSetup().get_cache_config())
+    configure_cache_backend(cache_config)
+    for name in directory or SHARDED_DIRS:
+        report = get_shard_load_report(cache_config["path"] + name + "/")
+        summary = report["summary"]
+        print(f"{name}: {summary['records']} records in {summary['shards']} shards ({summary['bytes'] / 1024:.0f} KiB)"
+              ,f"- min {summary['min_records']}, max {summary['max_records']}"
+              ,f", mean {summary['mean_records']}, skew {summary['skew']}")
+        shards = sorted(report["shards"].items(),key=lambda item: item[1]["records"],reverse=True)
+        for file_path,size in shards[0:largest]:
+            print(f"   {file_path}: {size['records']} records, {size['bytes'] / 1024:.0f} KiB")
+
+#----------
+@app.command()
+def reindex(directory:list[str] = typer.Argument(None,help="Cache directories to re-index (default: systems, markets)")):
+    """Re-write cache files so each has an up-to-date offset index (needed once for files written
+    before indexes existed - they are still read, just by parsing the whole file)"""
+    cache_config = get_current_cache_config(SpaceTraderConfigSetup().get_cache_config())
+    backend = configure_cache_backend(cache_config)
+    if not isinstance(backend,FileShardBackend):
+        print("Only the 'files' cache backend uses offset indexes.")
+        return
+    for name in directory or SHARDED_DIRS:
+        print(f"{name}: {backend.reindex(cache_config['path'] + name + '/')} files re-indexed")
+
+#----------
+@app.command()
+def check_manifest(directory:list[str] = typer.Argument(None,help="Cache directories to check (default: systems, markets)")
+                   ,repair:bool = typer.Option(False,"--repair",help="Rebuild manifest entries that don't match the files")):
+    """Check that the manifests (record counts and keys per file) match the cache files"""
+    cache_config = get_current_cache_config(SpaceTraderConfigSetup().get_cache_config())
+    backend = configure_cache_backend(cache_config)
+    if not isinstance(backend,FileShardBackend):
+        print("Only the 'files' cache backend uses manifests.")
+        return
+    for name in directory or SHARDED_DIRS:
+        report = backend.check_manifest(cache_config['path'] + name + '/',repair)
+        if report["ok"]:
+            print(f"{name}: OK")
+            continue
+        print(f"{name}: {len(report['missing'])} missing, {len(report['orphaned'])} orphaned"
+              ,f", {len(report['stale'])} stale" + (" - repaired" if repair else ""))
+
+#----------
+@app.command()
+def stats():
+    """Show the size of every cache namespace, its disk quota ('cache: quotas'), hit rate and evictions.
+    Hits, misses and evictions are counted by all game and sync processes using the cache."""
+    cache_config = get_current_cache_config(SpaceTraderConfigSetup().get_cache_config())
+    configure_cache_backend(cache_config)
+    for namespace,report in get_cache_namespace_report(cache_config["path"]).items():
+        quota = report["quota"]
+        quota_text = f"{quota['max_bytes'] / 1024**2:.0f} MiB {quota['policy']}" if quota else "no quota"
+        hit_rate = f"{report['hit_rate']:.0%}" if report["hit_rate"] is not None else "-"
+        print(f"{namespace}: {report['bytes'] / 1024**2:.1f} MiB ({quota_text}), {report['records']} records"
+              ,f"in {report['shards']} shards - hit rate {hit_rate}"
+              ,f"({report['hits']} hits, {report['misses']} misses), {report['evictions']} shards evicted")
+
+#----------
+if __name__ == "__main__":
+    app()
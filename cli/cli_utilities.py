@@ -6,6 +6,8 @@ from simple_term_menu import TerminalMenu
 from textwrap import fill
 from typing import Callable, TypedDict
 from enum import Enum
+from src.base import request_priority
+from src.utilities.custom_types import RequestPriority
 
 #==========
 class CliCommand(Enum):
@@ -114,7 +116,9 @@ def command_loop(cmd_list:dict,
 #==========
 def command_switch(cmd:str,cmd_map:dict) -> CliCommand | None:
     if cmd in cmd_map.keys():
-        return cmd_map[cmd].get('func')()
+        #Player commands jump ahead of queued background / automated API requests:
+        with request_priority(RequestPriority.INTERACTIVE):
+            return cmd_map[cmd].get('func')()
     else:
         cli_print(f"Command '{cmd}' not found","red")
         cli_print(border_med_equals,"red")
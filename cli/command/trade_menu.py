@@ -11,7 +11,6 @@ from art.str_formatting import format_market_info_template, format_margin_info_t
 
 #==========
 ship_operator:ShipOperator
-market = Markets()
 market_items_list:list[dict]
 
 #==========
@@ -28,7 +27,7 @@ def load_market_data() -> None:
     the player will move locations while staying in this menu (which is always true as of the
     creation of this function."""
     waypoint = ship_operator.currWaypoint['symbol']
-    current_market = market.get_market(waypoint)
+    current_market = Markets().get_market(waypoint)
 
     market_info = list(current_market.values())[0]
 
@@ -227,7 +226,7 @@ def get_profit_margins() -> None:
 #==========
 def get_best_margins():
     """Show player data on the best profit margins - and where to find them - across all items."""
-    best_margins = market.find_best_margins(limit = 3)
+    best_margins = Markets().find_best_margins(limit = 3)
     #Creating formatted strings with margin details separated by '|' for menu preview:
     menu_items = []
     for item in best_margins:
@@ -248,7 +247,7 @@ def get_item_margin():
     msg = "Pick an item to find optimal markets for:"
     item = pick_item_from_market_menu(market_items_list,prompt=msg)
 
-    best_market = market.find_margin(item)
+    best_market = Markets().find_margin(item)
 
     menu_item = f"{item}|{format_margin_info_template(best_market)}"
     menu = create_menu([menu_item],
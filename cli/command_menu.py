@@ -1,7 +1,9 @@
 """Holder of most commands for CLI"""
 from src.ship_operator import *
 from typing import Callable
+from time import monotonic
 from src.ships import Ships
+from src.prefetch import cache_warmer
 from cli_utilities import *
 from cli.info_menu import info_loop, print_hud
 from cli.contracts_menu import contracts_loop
@@ -21,11 +23,14 @@ def print_cmd_menu_header() -> str:
     cli_print(border_cmd_menu,cmd_menu_color)
 
 #==========
-def pick_ship(cancel_option:str) -> str:
-    ships = Ships()
-    data = ships.list_all_ships()
-    ship_list = list(data.keys())
-    ship_list.append(cancel_option)
+def get_ship_list() -> list[str]:
+    #Ships listed by the cache warm-up (see prefetch) if they were, and not too long ago:
+    data = cache_warmer.take("ships") or Ships().list_all_ships()
+    return list(data.keys())
+
+#==========
+def pick_ship(ship_list:list[str],cancel_option:str) -> str:
+    ship_list = ship_list + [cancel_option]
     if len(ship_list) > 1:
         ship_menu = create_menu(ship_list,prompt="Choose a ship to command, Captain:")
         chosen_ship = menu_prompt(ship_menu)
@@ -37,18 +42,24 @@ def pick_ship(cancel_option:str) -> str:
 def ship_command_loop(returnHeaderFunc:Callable) -> CliCommand | None:
     cancel_option = "[cancel and return to main menu]"
     cli_print("Loading ship list...",cmd_menu_color)
-    ship = pick_ship(cancel_option)
+    #Time to first HUD - loading only, not the time the player takes to pick a ship:
+    start = monotonic()
+    ship_list = get_ship_list()
+    loading_time = monotonic() - start
+    ship = pick_ship(ship_list,cancel_option)
     if ship == cancel_option:
         return False
 
     cli_clear()
     cli_print("Loading ship details...",cmd_menu_color)
+    start = monotonic()
 
     global ship_operator
     ship_operator = ShipOperator(ship)
 
     cli_print(f"Welcome aboard {ship}, Captain")
     print_cmd_menu_header()
+    cache_warmer.record_time_to_hud(loading_time + monotonic() - start)
 
     prompt = "Type a command. Type 'menu' to see a list of commands."
     res = command_loop(command_menu,prompt,loop_func=print_cmd_menu_header)
@@ -9,7 +9,6 @@ from art.str_formatting import (format_contract_list,
 
 #==========
 ship_operator:ShipOperator
-contracts = Contracts()
 
 #==========
 contracts_menu_color = "chartreuse2" #Color used by default in cli_print
@@ -33,7 +32,7 @@ def contracts_loop(ship:ShipOperator,headerFunc:Callable) -> None:
 #==========
 def print_contracts_info() -> None:
     """Print information about player contracts"""
-    data = contracts.list_all_contracts()
+    data = Contracts().list_all_contracts()
     if len(data) > 0:
         cli_print(format_contract_list(data),color=contracts_menu_color)
     else:
@@ -50,7 +49,7 @@ def print_current_contract_info() -> None:
 
 #==========
 def choose_contract() -> None:
-    contract_list = contracts.list_all_contracts()
+    contract_list = Contracts().list_all_contracts()
     chosen_contract = pick_contract_from_menu(contract_list)
 
     #If contract already accepted:
@@ -17,7 +17,7 @@ sys.path.append(PROJECT_ROOT)
 
 #==========
 import typer
-from src.contracts import Contracts
+from src.prefetch import start_cache_warmup
 from command_menu import ship_command_loop
 from cli_utilities import *
 from command_menu import ship_command_loop
@@ -25,7 +25,6 @@ from contracts_menu import print_contracts_info
 
 #==========
 app = typer.Typer()
-contracts = Contracts()
 
 #==========
 main_menu_color = "cornflower_blue" #Color used by default in cli_print
@@ -38,6 +37,8 @@ def print_main_menu_header() -> None:
 def main_menu_loop() -> None:
     """Wrapper for command_loop. First menu in the game. Once this function ends the game ends.
     """
+    #Loading what the first ship command needs while the player is still in this menu:
+    start_cache_warmup()
     cli_clear()
     print_start_screen()
     cli_print(f"Welcome back, Captain.\n","yellow")
@@ -0,0 +1,142 @@
+"""
+asyncio variant of the SpaceTraderConnection class, so that independent requests (e.g., for several
+ships at once) can be in flight at the same time instead of queuing behind each other.
+The asyncio endpoint classes (AsyncShips etc.) are made from the synchronous ones with
+awaitable_methods.
+"""
+
+#==========
+import asyncio
+from collections import deque
+from functools import wraps
+from typing import AsyncGenerator,Callable
+from .base import SpaceTraderConnection,get_shared_connection
+from .utilities.custom_types import SpaceTraderResp
+
+
+#==========
+class AsyncSpaceTraderConnection:
+    """
+    Same surface as SpaceTraderConnection, but with awaitable HTTP methods.
+    Requests are sent on worker threads through the same pooled session, shared rate limiter and
+    retry policy as the synchronous client - so sync and async callers share one request budget and
+    concurrent requests overlap only as far as the rate limit allows.
+    By default, it wraps the shared connection of the current agent (created on first use).
+    NOTE: Creating a connection still decrypts the API key and loads the agent synchronously.
+    """
+    #----------
+    def __init__(self,given_api_key:str=None,connection:SpaceTraderConnection|None=None):
+        """An existing (synchronous) connection or an API key can be given instead of using the
+        shared connection"""
+        if given_api_key != None:
+            connection = SpaceTraderConnection(given_api_key)
+        self.__connection = connection
+
+    #----------
+    @property
+    def connection(self) -> SpaceTraderConnection:
+        return self.__connection if self.__connection else get_shared_connection()
+
+    #----------
+    @property
+    def callsign(self) -> str:
+        return self.connection.callsign
+
+    #----------
+    @property
+    def base_url(self) -> str:
+        return self.connection.base_url
+
+    #----------
+    @property
+    def base_cache_path(self) -> str:
+        return self.connection.base_cache_path
+
+    #----------
+    async def get_agent(self) -> dict:
+        """Get basic information about agent: callsign, account ID, faction, HQ, etc."""
+        url = f"{self.base_url}/my/agent"
+        response = await self.stc_http_request(method="GET",url=url)
+        if not self.response_ok(response): raise Exception(response)
+        return response['http_data']['data']
+
+    #----------
+    def response_ok(self,response:SpaceTraderResp) -> bool:
+        return self.connection.response_ok(response)
+
+    #----------
+    def get_system_from_waypoint(self,waypoint:str) -> str:
+        return self.connection.get_system_from_waypoint(waypoint)
+
+    #----------
+    async def stc_http_request(self, method:str, url:str, **kwargs) -> SpaceTraderResp:
+        """Awaitable wrapper for SpaceTraderConnection.stc_http_request"""
+        return await asyncio.to_thread(self.connection.stc_http_request,method,url,**kwargs)
+
+    #----------
+    async def stc_get_paginated_data(self,method:str,url:str,page:int=1,**kwargs) -> AsyncGenerator[SpaceTraderResp,None]:
+        """Async generator for getting paginated data from the SpaceTrader API.
+        After the first page, the remaining pages are requested concurrently and yielded in order."""
+        limit = self.connection.page_limit
+        response = await self.stc_http_request(method=method,url=f"{url}?limit={limit}&page={page}",**kwargs)
+        if not self.response_ok(response): raise Exception(response)
+        if not response['http_data']['data']:
+            return
+        yield(response)
+
+        page_urls = self.connection.get_page_urls(url,response,page)
+        if page_urls is None:
+            #No total given - fall back to walking pages until an empty one is returned:
+            page += 1
+            while True:
+                response = await self.__get_page(page,method,f"{url}?limit={limit}&page={page}",**kwargs)
+                if len(response['http_data']['data']) == 0:
+                    break
+                yield(response)
+                page += 1
+            return
+
+        window = self.connection.page_workers * 2
+        pending = deque()
+        try:
+            for num,page_url in enumerate(page_urls, start=page + 1):
+                pending.append(asyncio.create_task(self.__get_page(num,method,page_url,**kwargs)))
+                if len(pending) >= window:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    #----------
+    async def __get_page(self,page:int,method:str,url:str,**kwargs) -> SpaceTraderResp:
+        try:
+            return await self.stc_http_request(method=method,url=url,**kwargs)
+        except Exception as e:
+            #If system fails mid-cache, return page (shows progress for re-trying):
+            print(page)
+            raise e
+
+
+#==========
+def to_thread(method:Callable) -> Callable:
+    """Awaitable version of a synchronous method: the method runs on a worker thread (with the
+    caller's context, e.g. request priority), so the event loop isn't blocked"""
+    @wraps(method)
+    async def wrapper(self,*args,**kwargs):
+        return await asyncio.to_thread(method,self,*args,**kwargs)
+    return wrapper
+
+#----------
+def awaitable_methods(*names:str) -> Callable[[type],type]:
+    """
+    Class decorator for the asyncio counterparts of endpoint classes: the named methods, inherited
+    from the synchronous class, become awaitable (see to_thread). Requests, caching and checkpoints
+    are those of the synchronous methods - nothing is written twice.
+    """
+    def decorator(cls:type) -> type:
+        for name in names:
+            setattr(cls,name,to_thread(getattr(cls,name)))
+        return cls
+    return decorator
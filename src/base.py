@@ -4,17 +4,35 @@ This file also contains a class for registering a new agent and thereby setting
 """
 
 #==========
+import os
 import logging
 import json
 import yaml
 import re
+from copy import deepcopy
+from math import ceil
+from datetime import datetime,timezone
+from functools import partial
 from time import sleep
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar,copy_context
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor,Future
 from typing import Generator
-from requests import request
 from requests.models import Response
+from requests.exceptions import ConnectionError,Timeout
 from .utilities.basic_utilities import get_user_password,dict_to_bytes
-from .utilities.crypt_utilities import password_encrypt,password_decrypt
-from .utilities.custom_types import SpaceTraderResp
+from .utilities.crypt_utilities import password_encrypt,password_decrypt_cached
+from .utilities.http_utilities import (SessionManager,RateLimiter,PriorityScheduler,RetryPolicy
+    ,RequestCoalescer,get_endpoint_label)
+from .utilities.custom_types import SpaceTraderResp,RequestPriority
+from .utilities.cache_utilities import (get_cache_backend,set_cache_backend,set_cache_sharding
+    ,TtlPolicy,get_ttl_policy,set_ttl_policy,cache_refresher,NegativeCache,get_negative_cache
+    ,set_negative_cache,CacheQuotas,get_cache_quotas,set_cache_quotas)
+from .utilities.cache_sharding import get_sharding_strategy
+from .utilities.cache_backends import CacheBackend,FileShardBackend,SqliteBackend,write_file_atomic
+from .utilities.cache_epochs import CacheEpochs
 
 #For debugging HTTP requests:
 # import http.client
@@ -24,22 +42,37 @@ from .utilities.custom_types import SpaceTraderResp
 #===========
 class SpaceTraderConfigSetup:
     """Class to interact with the configurtion file which provides game details
-    NOTE: This class purposefully does not hold stateful data as class attributes because
-    config data can change mid-game (most commonly after creating new agents"""
+    NOTE: Config data can change mid-game (most commonly after creating new agents), so the parsed
+    config is only cached together with the file's modification time and size - any change to the
+    file (by this process or another) causes it to be parsed again on the next read."""
 
     config_path = "./gameinfo.yaml"
 
+    #Shared by all instances: {config_path: (mtime_ns, size, parsed config)}
+    __config_cache:dict[str,tuple] = {}
+    __config_lock = Lock()
+
     #----------
     def __init__(self):
         pass
 
     #----------
-    def __get_config(self) -> None:
+    def __get_config(self) -> dict:
+        """Returns a copy of the parsed config - so callers may modify it freely"""
+        stat = os.stat(self.config_path)
+        with self.__config_lock:
+            cached = self.__config_cache.get(self.config_path)
+            if cached and cached[0:2] == (stat.st_mtime_ns,stat.st_size):
+                return deepcopy(cached[2])
         with open(self.config_path, "r") as stream:
             try:
-                return yaml.safe_load(stream)
+                config = yaml.safe_load(stream)
             except yaml.YAMLError as exc:
                 print(exc)
+                return None
+        with self.__config_lock:
+            self.__config_cache[self.config_path] = (stat.st_mtime_ns,stat.st_size,config)
+        return deepcopy(config)
 
     #----------
     def get_encrypted_key(self,callsign:str) -> str:
@@ -58,11 +91,45 @@ class SpaceTraderConfigSetup:
         config = self.__get_config()
         return config["cache"]["path"]
 
+    #----------
+    def get_cache_config(self) -> dict:
+        """Cache storage settings: backend ('files' or 'sqlite'), sharding strategy (see
+        cache_sharding), whether the cache is split by server reset (see cache_epochs) and, for
+        files, the shard format per namespace (see cache_formats) and the namespaces to read
+        through memory maps. Also the data to warm up on startup (see prefetch) and how the price
+        chart is kept (see price_index)"""
+        config = self.__get_config()
+        return config["cache"]
+
     #----------
     def get_api_url(self) -> str:
         config = self.__get_config()
         return config["api"]["url"]
 
+    #----------
+    def get_session_config(self) -> dict:
+        """Connection pool settings for HTTP sessions (see SessionManager for options)"""
+        config = self.__get_config()
+        return config["api"].get("session") or {}
+
+    #----------
+    def get_rate_limit_config(self) -> dict:
+        """Steady rate and burst pool of the API rate limit (see RateLimiter for options)"""
+        config = self.__get_config()
+        return config["api"].get("rate_limit") or {}
+
+    #----------
+    def get_retry_config(self) -> dict:
+        """Retry limits and backoff for throttled / failed requests (see RetryPolicy for options)"""
+        config = self.__get_config()
+        return config["api"].get("retry") or {}
+
+    #----------
+    def get_pagination_workers(self) -> int:
+        """Number of pages of paginated data to request concurrently"""
+        config = self.__get_config()
+        return config["api"].get("pagination_workers",4)
+
     #----------
     def get_config(self) -> dict:
         config = self.__get_config()
@@ -82,6 +149,7 @@ class SpaceTraderConfigSetup:
 
     #----------
     def add_new_agent(self,callsign:str,encrypted_key:str) -> None:
+        """Add agent to the config and make it the current agent (in a single write)"""
         config = self.__get_config()
         data = {
             "callsign":callsign
@@ -91,8 +159,8 @@ class SpaceTraderConfigSetup:
             config['agents']['all_agents'].append(data)
         else:
             config['agents']['all_agents'] = [data]
+        config['agents']['current'] = callsign
         self.write_to_file(config)
-        self.set_new_current_agent(callsign)
 
     #----------
     def remove_agent_details(self,callsign:str) -> None:
@@ -108,9 +176,171 @@ class SpaceTraderConfigSetup:
 
     #----------
     def write_to_file(self,config:dict) -> None:
-        """Write config to file"""
-        with open(self.config_path, 'w') as configfile:
-            yaml.dump(config,configfile)
+        """Write config to file - atomically, so readers never see a half-written config, and flushed
+        to disk unless 'cache: durable' is off (see write_file_atomic). The in-memory cache is updated
+        with what was written."""
+        durable = (config.get("cache") or {}).get("durable",True)
+        stamp = write_file_atomic(self.config_path,yaml.dump(config).encode("utf-8"),durable)
+        with self.__config_lock:
+            self.__config_cache[self.config_path] = (*stamp[0:2],deepcopy(config))
+
+
+#==========
+#Every connection (and agent registration) shares one pooled session, so that keep-alive
+#connections are re-used across the endpoint classes instead of each opening their own.
+_shared_session:SessionManager | None = None
+
+def get_shared_session() -> SessionManager:
+    """Returns the process-wide HTTP session, creating it from the config file on first use"""
+    global _shared_session
+    if _shared_session is None:
+        _shared_session = SessionManager(**SpaceTraderConfigSetup().get_session_config())
+    return _shared_session
+
+#The API rate limit applies per agent across all requests - so all connections must draw from
+#the same budget.
+_shared_rate_limiter:RateLimiter | None = None
+
+def get_shared_rate_limiter() -> RateLimiter:
+    """Returns the process-wide rate limiter, creating it from the config file on first use"""
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        _shared_rate_limiter = RateLimiter(**SpaceTraderConfigSetup().get_rate_limit_config())
+    return _shared_rate_limiter
+
+#Requests wait for the rate limiter in priority order (see RequestPriority), so that a player at the
+#terminal is not stuck behind a background sync:
+_shared_scheduler:PriorityScheduler | None = None
+
+def get_shared_scheduler() -> PriorityScheduler:
+    """Returns the process-wide request scheduler in front of the shared rate limiter"""
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        _shared_scheduler = PriorityScheduler(get_shared_rate_limiter())
+    return _shared_scheduler
+
+#Priority of requests made in the current thread / task. Code that is not a player command defaults
+#to SHIP_ACTION; the CLI marks player commands as INTERACTIVE and bulk jobs mark themselves BACKGROUND.
+current_request_priority:ContextVar[RequestPriority] = ContextVar("current_request_priority"
+                                                                  ,default=RequestPriority.SHIP_ACTION)
+
+@contextmanager
+def request_priority(priority:RequestPriority):
+    """Context manager to send all requests made inside the 'with' block at the given priority"""
+    token = current_request_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_request_priority.reset(token)
+
+#Stale cache records are re-fetched without getting in the way of interactive requests:
+cache_refresher.context_factory = partial(request_priority,RequestPriority.BACKGROUND)
+
+#----------
+def get_request_owner(url:str) -> str | None:
+    """Requests are shared fairly between ships: the owner of a request is the ship it acts on"""
+    match = re.search(r"/my/ships/([^/?]+)",url)
+    return match.group(1) if match else None
+
+_shared_retry_policy:RetryPolicy | None = None
+
+def get_shared_retry_policy() -> RetryPolicy:
+    """Returns the process-wide retry policy (which also collects retry metrics)"""
+    global _shared_retry_policy
+    if _shared_retry_policy is None:
+        _shared_retry_policy = RetryPolicy(**SpaceTraderConfigSetup().get_retry_config())
+    return _shared_retry_policy
+
+#Identical GETs that are in flight at the same time share one HTTP request:
+request_coalescer = RequestCoalescer()
+
+#----------
+def send_api_request(method:str,url:str,**kwargs) -> Response:
+    """Sends a request through the shared session, within the shared rate limit.
+    Requests are queued for the rate limit by the priority of the calling context (request_priority).
+    Rate-limited (429) responses, server errors and dropped connections are retried according to the
+    shared retry policy; the last response is returned once retries are exhausted."""
+    limiter = get_shared_rate_limiter()
+    scheduler = get_shared_scheduler()
+    policy = get_shared_retry_policy()
+    priority = current_request_priority.get().value
+    owner = get_request_owner(url)
+    attempt = 0
+    while True:
+        scheduler.acquire(priority,owner)
+        try:
+            http_response = get_shared_session().request(method=method,url=url,**kwargs)
+        except (ConnectionError,Timeout):
+            if not policy.should_retry(method,url,None,attempt): raise
+            status = None
+            delay = policy.get_delay(attempt)
+        else:
+            status = http_response.status_code
+            if not policy.should_retry(method,url,status,attempt):
+                return http_response
+            if status == 429:
+                #Server says our budget is spent, even if the local limiter disagrees:
+                limiter.drain()
+            delay = policy.get_delay(attempt,http_response)
+        logging.info(f"Retrying {method} {url} (status {status}) in {delay:.2f}s")
+        policy.record_retry(status,delay)
+        sleep(delay)
+        attempt += 1
+
+
+#----------
+#Reset epochs per cache path - one instance each, so old epochs aren't removed by several threads:
+_cache_epochs:dict[str,CacheEpochs] = {}
+_cache_epochs_lock = Lock()
+
+def get_cache_epochs(cache_path:str) -> CacheEpochs:
+    with _cache_epochs_lock:
+        return _cache_epochs.setdefault(os.path.abspath(cache_path),CacheEpochs(cache_path))
+
+#----------
+#Date of the current universe reset per API url - fetched once per process (see get_reset_date):
+_reset_dates:dict[str,str] = {}
+
+#----------
+def get_current_cache_config(cache_config:dict) -> dict:
+    """The 'cache' config with its path pointing at the directory of the current reset epoch, as
+    last switched to by the game (no API call). Unchanged if the cache isn't split by epochs."""
+    current = get_cache_epochs(cache_config["path"]).get_current() if cache_config.get("epochs") else None
+    if current is None:
+        return cache_config
+    return dict(cache_config,path=get_cache_epochs(cache_config["path"]).get_epoch_path(current))
+
+#----------
+def configure_cache_backend(cache_config:dict) -> CacheBackend:
+    """Sets the cache backend, sharding strategy, TTLs, negative cache and disk quotas from the
+    'cache' config section. An already matching backend is kept, so re-creating connections doesn't re-open the cache."""
+    backend = get_cache_backend()
+    set_cache_sharding(get_sharding_strategy(cache_config.get("sharding")))
+    root = os.path.abspath(cache_config["path"])
+    ttl_policy = TtlPolicy(root,cache_config.get("ttl"))
+    ttl_policy.reset_time = get_ttl_policy().reset_time
+    set_ttl_policy(ttl_policy)
+    negative = NegativeCache(cache_config["path"] + "negative/",**(cache_config.get("negative") or {}))
+    previous = get_negative_cache()
+    if (previous.dir_path,previous.ttl,previous.endpoints) != (negative.dir_path,negative.ttl,negative.endpoints):
+        set_negative_cache(negative)
+    quotas = CacheQuotas(root,cache_config.get("quotas"))
+    if (get_cache_quotas().root,get_cache_quotas().quotas) != (quotas.root,quotas.quotas):
+        set_cache_quotas(quotas)
+    if cache_config.get("backend","files") == "sqlite":
+        if not (isinstance(backend,SqliteBackend) and backend.root == root):
+            backend = SqliteBackend(root)
+            set_cache_backend(backend)
+    else:
+        formats = cache_config.get("formats") or {}
+        mmap_namespaces = cache_config.get("mmap") or []
+        durable = cache_config.get("durable",True)
+        settings = (root,formats,mmap_namespaces)
+        if not (isinstance(backend,FileShardBackend) and backend.durable == durable
+                and (backend.root,backend.formats,backend.mmap_namespaces) == settings):
+            backend = FileShardBackend(*settings,durable=durable)
+            set_cache_backend(backend)
+    return backend
 
 
 #==========
@@ -129,11 +359,19 @@ class SpaceTraderConnection:
     base_url:str
 
     base_cache_path:str
+    #Reset epochs of the cache ('cache: epochs') - None if the cache isn't split by reset:
+    cache_epochs:CacheEpochs | None = None
+
+    #Largest page size the API allows for paginated endpoints:
+    page_limit:int = 20
+    #How many pages of paginated data may be requested at the same time:
+    page_workers:int
 
     #----------
     def __init__(self,given_api_key:str=None):
         self.base_url = self.config_setup.get_api_url()
         self.base_cache_path = self.config_setup.get_cache_path()
+        self.page_workers = self.config_setup.get_pagination_workers()
 
         #If an api key is provided, use that to start the game. Otherwise, find the current player
         #in the local file and initialize the game using that information.
@@ -149,18 +387,62 @@ class SpaceTraderConnection:
                 raise Exception(msg) from e
 
         self.default_header.update({"Authorization" : "Bearer " + self.api_key})
+        cache_config = self.config_setup.get_cache_config()
+        if cache_config.get("epochs"):
+            self.cache_epochs = get_cache_epochs(self.base_cache_path)
+            self.base_cache_path = self.enter_cache_epoch(self.cache_epochs)
+        configure_cache_backend(dict(cache_config,path=self.base_cache_path))
         self.callsign = self.get_agent()['symbol']
 
     #----------
     def __decrypt_api_key(self,encrypted_key:str) -> None:
         """Purpose: Decrypt API key and store it locally so that we can use it
-        for future API calls"""
-        password = get_user_password(prompt="Please enter password to decrypt your API key: "
-                                     ,password_name="SPACETRADER_PASSWORD",double_entry=False)
+        for future API calls. A key already decrypted in this process is re-used, without asking
+        for the password again."""
+        get_password = partial(get_user_password,prompt="Please enter password to decrypt your API key: "
+                               ,password_name="SPACETRADER_PASSWORD",double_entry=False)
         bytes_key = encrypted_key.encode("utf-8")
-        decrypted_key_bytes = password_decrypt(bytes_key, password)
+        decrypted_key_bytes = password_decrypt_cached(bytes_key, get_password)
         return decrypted_key_bytes.decode() #converting to string
 
+    #----------
+    def get_server_status(self) -> dict:
+        """Get status of the game server - including the date of the last universe reset"""
+        url = f"{self.base_url}/"
+        response = self.stc_http_request(method="GET",url=url)
+        if not self.response_ok(response): raise Exception(response)
+        return response['http_data']
+
+    #----------
+    def get_reset_date(self) -> str:
+        """The game universe is wiped on every reset - this date identifies the current one.
+        Fetched once per process, so connections created later (e.g., after switching agents) don't
+        wait for the server status again."""
+        reset_date = _reset_dates.get(self.base_url)
+        if reset_date is None:
+            reset_date = _reset_dates[self.base_url] = self.get_server_status()['resetDate']
+        #Cached records from before the reset are stale for namespaces with a 'reset' TTL:
+        reset = datetime.strptime(reset_date,"%Y-%m-%d").replace(tzinfo=timezone.utc)
+        get_ttl_policy().reset_time = reset.timestamp()
+        return reset_date
+
+    #----------
+    def enter_cache_epoch(self,epochs:CacheEpochs) -> str:
+        """Switches the cache to the directory of the current server reset, and starts removing those
+        of earlier resets in the background. Returns the cache path to use. If the server status
+        can't be fetched, the epoch used last is kept."""
+        try:
+            reset_date = self.get_reset_date()
+        except Exception as e:
+            reset_date = epochs.get_current()
+            if reset_date is None:
+                raise
+            logging.warning(f"Server status unavailable, using the cache of reset {reset_date}: {e}")
+        else:
+            epochs.switch(reset_date,since=get_ttl_policy().reset_time)
+        epochs.remove_stale()
+        return epochs.get_epoch_path(reset_date)
+
     #----------
     def get_agent(self) -> dict:
         """Get basic information about agent: callsign, account ID, faction, HQ, etc."""
@@ -192,49 +474,193 @@ class SpaceTraderConnection:
         return packet
 
     #----------
-    def get_system_from_waypoint(self,waypoint:str) -> str:
+    @staticmethod
+    def get_system_from_waypoint(waypoint:str) -> str:
         """In Alpha version of the game, the system is the first part of the waypoint, before the
         second dash (e.g., waypoint = 'X1-Z7-45360X', system = 'X1-Z7').
         Rather than pass both values around, this derives system from waypoint"""
         match = re.match(r"^[\w]+-[\w]+",waypoint)
         return match.group()
 
+    #----------
+    def get_connection_stats(self) -> dict:
+        """Connection re-use statistics for the shared HTTP session"""
+        return get_shared_session().get_stats()
+
+    #----------
+    def get_rate_limit_budget(self) -> dict:
+        """Remaining request budget under the shared client-side rate limiter"""
+        return get_shared_rate_limiter().get_budget()
+
+    #----------
+    def get_retry_stats(self) -> dict:
+        """Retry counts and time spent waiting before retries, across all connections"""
+        return get_shared_retry_policy().get_stats()
+
+    #----------
+    def get_scheduler_stats(self) -> dict[str,dict]:
+        """Queue depth and wait times for each request priority class"""
+        stats = get_shared_scheduler().get_stats()
+        return {RequestPriority(priority).name:class_stats for priority,class_stats in stats.items()}
+
+    #----------
+    def get_coalescing_stats(self) -> dict[str,dict]:
+        """Per-endpoint counts of GET requests, and how many shared an identical in-flight request"""
+        return request_coalescer.get_stats()
+
+    #----------
+    def get_negative_cache_stats(self) -> dict[str,dict]:
+        """Per endpoint: 'nothing here' results stored, and API requests they avoided"""
+        return get_negative_cache().get_stats()
+
+    #----------
+    def get_cache_epoch_stats(self) -> dict | None:
+        """Current reset epoch of the cache, epoch switches and removal of old epochs"""
+        return self.cache_epochs.get_stats() if self.cache_epochs else None
+
+    #----------
+    def get_cache_quota_stats(self) -> dict[str,dict]:
+        """Per cache namespace: hit rate, and shards evicted to stay within its disk quota"""
+        return get_cache_quotas().get_stats()
+
+    #----------
+    def get_cache_refresh_stats(self) -> dict:
+        """Background refreshes of stale cache records: queued, refreshed, failed, pending"""
+        return cache_refresher.get_stats()
+
     #----------
     def stc_http_request(self, method:str, url:str, **kwargs) -> SpaceTraderResp:
-        """Wrapper for HTTP get - implements spacetrader-specific handling of response"""
-        http_response = request(
-            method=method
-            ,url=url
-            ,headers=self.default_header
-            ,**kwargs
-        )
+        """Wrapper for HTTP get - implements spacetrader-specific handling of response.
+        Throttling and retries of rate-limited / failed requests are handled by send_api_request.
+        Identical GET requests which are already in flight are coalesced into a single request.
+        GET requests that recently returned nothing are answered from the negative cache."""
+        def send() -> SpaceTraderResp:
+            http_response = send_api_request(
+                method=method
+                ,url=url
+                ,headers=self.default_header
+                ,**kwargs
+            )
+            response = self.repackage_http_response(http_response)
+            get_negative_cache().put(method,url,response)
+            return response
+
+        #Known 'nothing here' answers (e.g., no market at a waypoint) aren't requested again:
+        negative = get_negative_cache().get(method,url)
+        if negative is not None:
+            return negative
+        if method.upper() != "GET":
+            return send()
+        #Priority is part of the key so that a player's request never waits on a queued background one:
+        key = (url,self.api_key,repr(sorted(kwargs.items())),current_request_priority.get())
+        return request_coalescer.run(key,get_endpoint_label(url),send)
 
-        return self.repackage_http_response(http_response)
+    #----------
+    def get_page_urls(self,url:str,first_response:SpaceTraderResp,page:int) -> list[str] | None:
+        """Given the response for 'page', list the URLs of all following pages using the total
+        record count the API returns in 'meta'. Returns None if the response has no usable meta data."""
+        meta = first_response['http_data'].get('meta')
+        if not meta or 'total' not in meta:
+            return None
+        last_page = ceil(meta['total'] / self.page_limit)
+        return [f"{url}?limit={self.page_limit}&page={num}" for num in range(page + 1, last_page + 1)]
 
     #----------
     def stc_get_paginated_data(self,method:str,url:str,page:int=1,**kwargs) -> Generator[SpaceTraderResp,None,None]:
-        """Generator function for getting paginated data from the SpaceTrader API."""
-        #NOTE: The speed of this is heavily constrained by API limits (<2 per second).
-        # If the API limits are raised, we could remove the sleep function and try
-        # to parallelize this more.
-        limit = 20
-        url = f"{url}?limit={limit}"
+        """Generator function for getting paginated data from the SpaceTrader API.
+        The first page tells us the total number of records, so the remaining pages are requested
+        concurrently (throttled by the shared rate limiter) and yielded in page order."""
+        first_url = f"{url}?limit={self.page_limit}&page={page}"
+        response = self.stc_http_request(method=method,url=first_url,**kwargs)
+        #(An error isn't an empty result - e.g. a rate limited first page mustn't look like "no records")
+        if not self.response_ok(response): raise Exception(response)
+        if not response['http_data']['data']:
+            return
+        yield(response)
+
+        page_urls = self.get_page_urls(url,response,page)
+        if page_urls is None:
+            #No total given - fall back to walking pages until an empty one is returned:
+            yield from self.__walk_pages(method,url,page + 1,**kwargs)
+            return
+
+        #Bounded window of in-flight pages, so that results don't pile up in memory when the caller
+        #is slower than the API:
+        window = self.page_workers * 2
+        with ThreadPoolExecutor(max_workers=self.page_workers) as pool:
+            pending = deque()
+            try:
+                for num,page_url in enumerate(page_urls, start=page + 1):
+                    #Copying context so that pages are requested at the caller's priority:
+                    request = partial(self.stc_http_request,method=method,url=page_url,**kwargs)
+                    pending.append((num,pool.submit(copy_context().run,request)))
+                    if len(pending) >= window:
+                        yield self.__get_page_result(*pending.popleft())
+                while pending:
+                    yield self.__get_page_result(*pending.popleft())
+            finally:
+                #If the caller stops early (or a page fails), don't request the remaining pages:
+                for _,future in pending:
+                    future.cancel()
+
+    #----------
+    def __get_page_result(self,page:int,future:Future) -> SpaceTraderResp:
+        try:
+            return future.result()
+        except Exception as e:
+            #If system fails mid-cache, return page (shows progress for re-trying):
+            print(page)
+            raise e
+
+    #----------
+    def __walk_pages(self,method:str,url:str,page:int,**kwargs) -> Generator[SpaceTraderResp,None,None]:
+        """Request pages one after another until the API returns an empty page"""
         while True:
             try:
-                new_url = url + f"&page={page}"
+                new_url = f"{url}?limit={self.page_limit}&page={page}"
                 response = self.stc_http_request(method=method,url=new_url,**kwargs)
                 if len(response['http_data']['data']) == 0:
                     break
                 yield(response)
                 page += 1
-                #Sleeping to avoid over-drawing from API.
-                sleep(0.05)
             except Exception as e:
                 #If system fails mid-cache, return page (shows progress for re-trying):
                 print(page)
                 raise e
 
 
+#==========
+#Endpoint classes and CLI menus all share one connection for the current agent. Building a connection
+#decrypts the API key and loads the agent from the API, so it is only done once - on first use.
+_shared_connection:SpaceTraderConnection | None = None
+_shared_connection_lock = Lock()
+
+def get_shared_connection() -> SpaceTraderConnection:
+    """Returns the connection for the current agent, creating it on first use"""
+    global _shared_connection
+    with _shared_connection_lock:
+        if _shared_connection is None:
+            _shared_connection = SpaceTraderConnection()
+        return _shared_connection
+
+#----------
+def reset_shared_connection() -> None:
+    """Drop the shared connection (e.g., after switching agents) - the next use creates a new one"""
+    global _shared_connection
+    with _shared_connection_lock:
+        _shared_connection = None
+
+#==========
+class SharedConnection:
+    """
+    Descriptor for the 'stc' class attribute of endpoint classes. Looks up the shared connection when
+    the attribute is accessed instead of connecting at import time.
+    """
+    #----------
+    def __get__(self,instance,owner) -> SpaceTraderConnection:
+        return get_shared_connection()
+
+
 #==========
 class RegisterNewAgent:
     """
@@ -265,7 +691,7 @@ class RegisterNewAgent:
         headers = {"Accept": "application/json","Content-Type":"application/json"}
         url = self.base_url + "/register"
 
-        http_response = request("POST",url=url,data=json.dumps(data),headers=headers)
+        http_response = send_api_request("POST",url=url,data=json.dumps(data),headers=headers)
         data = http_response.json()
 
         if "error" in data.keys():
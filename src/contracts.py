@@ -2,7 +2,8 @@
 Data and functions related for interacting with the 'contracts' endpoint of the Spacetrader API
 """
 #==========
-from .base import SpaceTraderConnection
+from .base import SharedConnection
+from .async_base import awaitable_methods
 from .utilities.custom_types import SpaceTraderResp
 
 #==========
@@ -12,7 +13,7 @@ class Contracts:
     """
     #----------
     base_url:str
-    stc = SpaceTraderConnection()
+    stc = SharedConnection()
 
     #----------
     def __init__(self):
@@ -82,3 +83,12 @@ class Contracts:
         if not self.stc.response_ok(response): return {}
         data = self.mold_contract_dict(response)
         return data['contract']
+
+
+#==========
+@awaitable_methods("list_all_contracts","get_contract","accept_contract","deliver_contract"
+    ,"fulfill_contract","negotiate_new_contract")
+class AsyncContracts(Contracts):
+    """
+    asyncio counterpart of the Contracts class - every endpoint method is awaitable.
+    """
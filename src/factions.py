@@ -3,9 +3,10 @@ Data and functions related for interacting with the 'factions' endpoint of the S
 """
 #==========
 from typing import Callable
-from .base import SpaceTraderConnection
-from .utilities.basic_utilities import get_dict_from_file
-from .utilities.cache_utilities import dict_cache_wrapper,update_cache_dict
+from .base import SharedConnection,request_priority
+from .utilities.custom_types import RequestPriority
+from .utilities.cache_utilities import (dict_cache_wrapper,update_cache_dict,read_cache_file
+    ,batched_cache_writes)
 
 #==========
 class Factions():
@@ -13,7 +14,7 @@ class Factions():
     Class to query game data related to the in-game factions
     """
     #----------
-    stc = SpaceTraderConnection()
+    stc = SharedConnection()
     cache_path: str
     cache_file_name: str
 
@@ -40,19 +41,20 @@ class Factions():
     #----------
     def reload_factions_in_cache(self,page:int=1) -> None:
         """Updates factions data in cache with data from the API"""
-        for faction_list in self.stc.stc_get_paginated_data("GET",self.base_url,page):
-            for faction in faction_list["http_data"]["data"]:
-                transformed_faction = {faction['symbol']:faction}
-                update_cache_dict(transformed_faction,self.cache_path)
+        with request_priority(RequestPriority.BACKGROUND), batched_cache_writes():
+            for faction_list in self.stc.stc_get_paginated_data("GET",self.base_url,page):
+                for faction in faction_list["http_data"]["data"]:
+                    transformed_faction = {faction['symbol']:faction}
+                    update_cache_dict(transformed_faction,self.cache_path)
 
     #----------
     def list_all_factions(self) -> dict:
         """Get all contracts associated with the agent"""
-        try:
-            return get_dict_from_file(self.cache_path)
-        except FileNotFoundError:
+        factions = read_cache_file(self.cache_path)
+        if not factions:
             self.reload_factions_in_cache()
-            return get_dict_from_file(self.cache_path)
+            factions = read_cache_file(self.cache_path)
+        return factions
 
     #----------
     @cache_factions
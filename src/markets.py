@@ -3,11 +3,12 @@ Data and functions related for interacting with the 'systems' endpoint of the Sp
 """
 #==========
 from typing import Callable
-from .base import SpaceTraderConnection
-from .utilities.custom_types import SpaceTraderResp,PriceRecord,PriceObj,MarginObj
-from .utilities.cache_utilities import dict_cache_wrapper,update_cache_dict
-from .utilities.basic_utilities import (attempt_dict_retrieval,write_dict_to_file,get_files_in_dir
-    ,get_keys_in_file)
+from .base import SharedConnection,SpaceTraderConfigSetup
+from .async_base import awaitable_methods
+from .utilities.custom_types import SpaceTraderResp,MarginObj
+from .utilities.cache_utilities import (dict_cache_wrapper,update_cache_dict,read_cache_file
+    ,list_cache_files,get_shard_path)
+from .utilities.price_index import PriceIndex,get_price_index
 
 #==========
 class Markets:
@@ -15,20 +16,22 @@ class Markets:
     Class to query and edit game data related to systems.
     """
     #----------
-    stc = SpaceTraderConnection()
+    stc = SharedConnection()
     base_url: str
     cache_path: str
     price_chart_path: str
-
-    #For the price chart, how many values should we store per commodity (i.e., the best 5 prices).
-    #More prices gives flexibility in finding a good market, but there are diminishing returns.
-    price_chart_cutoff:int = 3
+    price_index: PriceIndex
 
     #----------
     def __init__(self):
         self.base_url = self.stc.base_url + "/systems"
         self.cache_path = self.stc.base_cache_path + "markets/"
         self.price_chart_path = self.stc.base_cache_path + "price_chart.json"
+        #Best prices per commodity, shared by all Markets instances. How many prices are kept per
+        #commodity ('depth' - more gives flexibility in finding a good market, but there are diminishing
+        #returns) and how often the chart is written are set in 'cache: price_chart' in gameinfo.yaml:
+        price_chart_config = SpaceTraderConfigSetup().get_cache_config().get("price_chart") or {}
+        self.price_index = get_price_index(self.price_chart_path,**price_chart_config)
 
     #----------
     def __mold_market_dict(self,response:SpaceTraderResp) -> dict:
@@ -48,9 +51,9 @@ class Markets:
 
     #----------
     def __create_cache_path(self,system:str) -> str:
-        """Create cache path from system string. To shard data, we're using the first 4
-        characters of the system string as the file path (only last character varies A-Z)"""
-        return self.cache_path + system[0:4] + ".json"
+        """Create cache path from system string. Which file (shard) a system goes to depends on the
+        configured sharding strategy (see cache_sharding)"""
+        return get_shard_path(self.cache_path,system)
 
     #----------
     def cache_market(func: Callable) -> Callable:
@@ -91,66 +94,21 @@ class Markets:
     #------------------------
     #--PRICE CHART CREATION--
     #------------------------
-    def __create_price_obj(self) -> PriceObj:
-        return {
-            "purchase_prices": {},
-            "sell_prices": {}
-        }
-
-    #----------
-    def __update_price_obj(self,price_obj:PriceObj,new_record:PriceRecord,waypoint:str) -> PriceObj:
-        new_purchase = {waypoint:new_record["purchasePrice"]}
-        price_obj["purchase_prices"] = self.__add_to_price_records(
-            price_obj['purchase_prices']
-            ,new_purchase
-            ,low_best=True)
-
-        new_sell = {waypoint:new_record["sellPrice"]}
-        price_obj["sell_prices"] = self.__add_to_price_records(
-            price_obj["sell_prices"]
-            ,new_sell
-            ,low_best=False)
-
-        return price_obj
-
-    #----------
-    def __add_to_price_records(self,prev_records:PriceRecord,new_record:PriceRecord,low_best:bool) -> PriceRecord:
-        """Add price_record to price_obj so that price_obj has the best X values, where X is
-        the value given by 'cutoff'. """
-        prev_records.update(new_record)
-
-        if len(prev_records.items()) > self.price_chart_cutoff:
-            #Each run of this function should at most increment the number of items by 1.
-            #If we exceed our cutoff, remove the record with the worst value.
-            worst_price_record = self.__get_worst_price_record(prev_records,low_best)
-            worst_price_key = list(worst_price_record.keys())[0]
-            del prev_records[worst_price_key]
-        return prev_records
-
-    #----------
     def update_price_chart(self,market_dict:dict) -> None:
-        """Updates cached price chart with provided market data"""
-        path = self.price_chart_path
-        price_chart = attempt_dict_retrieval(path)
-        waypoint = market_dict['symbol']
+        """Updates the price index (and, in batches, the cached price chart) with provided market data"""
         if 'tradeGoods' not in market_dict.keys(): #If market data doesn't have pricing information
             return None
-        for item in market_dict['tradeGoods']:
-            sym = item['symbol']
-            #If the commodity is already listed in the chart:
-            if sym not in price_chart.keys():
-                price_chart[sym] = self.__create_price_obj()
-            price_chart[sym] = self.__update_price_obj(price_chart[sym],item,waypoint)
-        write_dict_to_file(path,price_chart)
-
+        self.price_index.update_market(market_dict['symbol'],market_dict['tradeGoods'])
 
     #----------
     def reload_price_chart_from_cache(self) -> None:
         """Recreate price chart from all market data from the cache."""
-        for file_path in get_files_in_dir(self.cache_path):
-            markets_obj = attempt_dict_retrieval(file_path)
+        self.price_index.clear()
+        for file_path in list_cache_files(self.cache_path):
+            markets_obj = read_cache_file(file_path)
             for key in markets_obj.keys():
                 self.update_price_chart(markets_obj[key])
+        self.price_index.flush()
 
 
     #-----------------
@@ -158,10 +116,7 @@ class Markets:
     #-----------------
     def find_margin(self,item:str) -> MarginObj:
         """Find optimal margins for buying + selling a particular commodity."""
-        price_chart = attempt_dict_retrieval(self.price_chart_path)
-        price_obj = price_chart[item]
-        best_sell_obj = self.__get_best_price_record(price_obj['sell_prices'],low_best=False)
-        best_buy_obj = self.__get_best_price_record(price_obj['purchase_prices'],low_best=True)
+        best_buy_obj,best_sell_obj = self.price_index.get_best_prices(item)
         margin = list(best_sell_obj.values())[0] - list(best_buy_obj.values())[0]
         return {
             "item":item,
@@ -173,21 +128,15 @@ class Markets:
     #----------
     def find_best_margins(self,limit:int=3) -> list[MarginObj]:
         """Find the best margins across all commodity groups"""
-        commodities = get_keys_in_file(self.price_chart_path)
+        commodities = self.price_index.get_commodities()
         margins = [self.find_margin(item) for item in commodities]
         margins.sort(key=lambda obj: obj['margin'],reverse=True)
         return margins[0:limit]
 
-    #----------
-    def __get_best_price_record(self,price_records:PriceRecord,low_best:bool) -> PriceRecord:
-        """For getting the record in a price object that is highest / lowest"""
-        if low_best:
-            best_price_key = min(price_records,key=price_records.get)
-        else:
-            best_price_key = max(price_records,key=price_records.get)
-        return {best_price_key:price_records[best_price_key]}
-
-    #----------
-    def __get_worst_price_record(self,price_records:PriceRecord,low_best:bool) -> PriceRecord:
-        low_best_reversed = not low_best
-        return self.__get_best_price_record(price_records,low_best_reversed)
\ No newline at end of file
+#==========
+@awaitable_methods("get_market","update_market")
+class AsyncMarkets(Markets):
+    """
+    asyncio counterpart of the Markets class - endpoint methods are awaitable. Cache handling and
+    the price chart are those of Markets.
+    """
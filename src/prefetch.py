@@ -0,0 +1,178 @@
+"""
+Warm-up of caches on game startup: data the first ship command needs is fetched in the background
+while the player is still looking at the main menu.
+"""
+#==========
+import logging
+from time import monotonic
+from threading import Lock,Thread
+from concurrent.futures import Future
+from .base import SharedConnection,SpaceTraderConfigSetup,get_shared_connection,request_priority
+from .ships import Ships
+from .systems import Systems
+from .markets import Markets
+from .factions import Factions
+from .contracts import Contracts
+from .utilities.custom_types import RequestPriority
+
+#==========
+class CacheWarmer:
+    """
+    Fetches 'prefetch sets' ('cache: prefetch' in gameinfo.yaml) in a background thread, at
+    background request priority:
+    - 'ships': the agent's ships (kept for pick_ship) and the systems they are in
+    - 'contracts': the agent's contracts (kept for the first ShipOperator)
+    - 'hq_system': the system of the agent's headquarters
+    - 'markets': markets at the marketplaces of the systems above
+    - 'factions': all factions
+    Systems, markets and factions go through the cache as usual, so they are on disk and in memory
+    when needed. Ship and contract lists aren't cached - they are kept here and handed out once by
+    take(), if not older than 'max_age' seconds.
+    """
+    #----------
+    stc = SharedConnection()
+    #In the order they are fetched - markets are found through the systems of the other sets:
+    sets = ("ships","contracts","hq_system","factions","markets")
+
+    #----------
+    def __init__(self,max_age:float=120.0):
+        self.max_age = max_age
+        self.__futures:dict[str,Future] = {}
+        self.__fetched_at:dict[str,float] = {}
+        self.__systems:list[str] = []
+        self.__thread:Thread | None = None
+        self.__lock = Lock()
+        self.__stats = {"sets":{},"time_to_hud":None,"taken":0,"expired":0}
+
+    #----------
+    def start(self,sets:list[str]) -> bool:
+        """Starts warming up the given sets. Returns False if a warm-up already ran (or there's nothing to do)."""
+        unknown = set(sets) - set(self.sets)
+        if unknown:
+            raise ValueError(f"Unknown prefetch sets: {sorted(unknown)}")
+        with self.__lock:
+            if self.__thread is not None or not sets:
+                return False
+            self.__futures = {name:Future() for name in self.sets if name in sets}
+            self.__thread = Thread(target=self.__work,name="cache-warmer",daemon=True)
+            self.__thread.start()
+        return True
+
+    #----------
+    def __work(self) -> None:
+        with request_priority(RequestPriority.BACKGROUND):
+            #(A copy - take() removes sets while they are worked on)
+            for name,future in list(self.__futures.items()):
+                #A set the game already fetched itself (see take) is skipped:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                start = monotonic()
+                try:
+                    result = getattr(self,f"_fetch_{name}")()
+                    #(Before the result is set - take() reads it as soon as the result is there)
+                    self.__fetched_at[name] = monotonic()
+                    future.set_result(result)
+                    status = "ok"
+                except BaseException as e:
+                    #Also SystemExit etc. - a waiting take() must get an answer, never hang:
+                    logging.warning(f"Prefetching '{name}' failed: {e!r}")
+                    future.set_exception(e)
+                    status = "failed"
+                with self.__lock:
+                    self.__stats["sets"][name] = {"status":status,"seconds":round(monotonic() - start,3)}
+
+    #----------
+    def _fetch_ships(self) -> dict:
+        ships = Ships().list_all_ships()
+        self.__systems.extend(ship["nav"]["systemSymbol"] for ship in ships.values())
+        self.__warm_systems()
+        return ships
+
+    #----------
+    def _fetch_contracts(self) -> list[dict]:
+        return Contracts().list_all_contracts()
+
+    #----------
+    def _fetch_hq_system(self) -> None:
+        self.__systems.append(self.stc.get_system_from_waypoint(self.stc.get_agent()["headquarters"]))
+        self.__warm_systems()
+
+    #----------
+    def _fetch_factions(self) -> None:
+        Factions().list_all_factions()
+
+    #----------
+    def _fetch_markets(self) -> None:
+        systems = Systems()
+        markets = Markets()
+        for system in dict.fromkeys(self.__systems):
+            for waypoint in systems.get_system(system)[system].get("waypoints",[]):
+                #Traits are only known for scanned waypoints - as dicts from the API, or names once simplified:
+                traits = [trait["symbol"] if isinstance(trait,dict) else trait for trait in waypoint.get("traits",[])]
+                if "MARKETPLACE" in traits:
+                    markets.get_market(waypoint["symbol"])
+
+    #----------
+    def __warm_systems(self) -> None:
+        systems = Systems()
+        for system in dict.fromkeys(self.__systems):
+            systems.get_system(system)
+
+    #----------
+    def take(self,name:str):
+        """
+        The prefetched result of a set (ships or contracts) - handed out only once, so later calls
+        get fresh data. Waits if the set is being fetched right now. Returns None if the set wasn't
+        prefetched, failed or is too old - and stops it from being fetched if it hasn't started yet,
+        as the caller will fetch it anyway.
+        """
+        with self.__lock:
+            future = self.__futures.pop(name,None)
+        if future is None or future.cancel():
+            return None
+        try:
+            result = future.result()
+        except Exception:
+            #(SystemExit etc. are raised here, as if the caller had fetched the set itself)
+            return None
+        if monotonic() - self.__fetched_at[name] > self.max_age:
+            with self.__lock:
+                self.__stats["expired"] += 1
+            return None
+        with self.__lock:
+            self.__stats["taken"] += 1
+        return result
+
+    #----------
+    def wait(self) -> None:
+        """Blocks until the warm-up is done"""
+        if self.__thread is not None:
+            self.__thread.join()
+
+    #----------
+    def record_time_to_hud(self,seconds:float) -> None:
+        """Records how long the first HUD of the session took to load (only the first is kept)"""
+        with self.__lock:
+            if self.__stats["time_to_hud"] is not None:
+                return
+            self.__stats["time_to_hud"] = round(seconds,3)
+        logging.info(f"Time to first HUD: {seconds:.2f}s (prefetch {'on' if self.__thread else 'off'})")
+
+    #----------
+    def get_stats(self) -> dict:
+        """Per set: status and seconds taken. Also: prefetched results taken / expired, time to first HUD."""
+        with self.__lock:
+            return {**self.__stats,"sets":dict(self.__stats["sets"]),"prefetching":self.__thread is not None}
+
+
+#----------
+cache_warmer = CacheWarmer()
+
+#----------
+def start_cache_warmup() -> bool:
+    """Starts warming up the prefetch sets in the config ('cache: prefetch'). The shared connection
+    is built first, on the calling thread - it may have to ask for the password."""
+    sets = SpaceTraderConfigSetup().get_cache_config().get("prefetch") or []
+    if sets:
+        get_shared_connection()
+    return cache_warmer.start(sets)
@@ -9,20 +9,42 @@ from .ships import Ships
 from .markets import Markets
 from .systems import Systems
 from .contracts import Contracts
+from .prefetch import cache_warmer
 from .utilities.custom_types import RefinableProduct, NavSpeed, MarginObj
 from .utilities.cache_utilities import update_cache_dict
 from .utilities.basic_utilities import time_diff_seconds
 
+#==========
+class SharedEndpoint:
+    """
+    Descriptor for the endpoint class attributes of ShipOperator. The endpoint is created on first
+    access and then replaces the descriptor - so importing this module doesn't connect (see prefetch).
+    """
+    #----------
+    def __init__(self,endpoint_class:type):
+        self.endpoint_class = endpoint_class
+
+    #----------
+    def __set_name__(self,owner,name:str):
+        self.name = name
+
+    #----------
+    def __get__(self,instance,owner):
+        endpoint = self.endpoint_class()
+        setattr(owner,self.name,endpoint)
+        return endpoint
+
+
 #==========
 class ShipOperator():
     """
     Class to operate a ship
     """
     #----------
-    ships = Ships()
-    systems = Systems()
-    markets = Markets()
-    contracts = Contracts()
+    ships = SharedEndpoint(Ships)
+    systems = SharedEndpoint(Systems)
+    markets = SharedEndpoint(Markets)
+    contracts = SharedEndpoint(Contracts)
 
     #----------
     #Name
@@ -100,7 +122,10 @@ class ShipOperator():
     def reload_pursuedContractId(self) -> None:
         """Reload data on the currently pursuedContract. If none is set,
         set the pursuedContract attribute to the first accepted contract in the list."""
-        contract_list = self.contracts.list_all_contracts()
+        #The first ship operator of a session can use contracts listed by the cache warm-up:
+        contract_list = cache_warmer.take("contracts")
+        if contract_list is None:
+            contract_list = self.contracts.list_all_contracts()
         accepted_contracts = [con for con in contract_list if con['accepted'] == True]
         if len(accepted_contracts) > 0:
             #In lieu of a better way, selecting the first accepted contract, if any exist:
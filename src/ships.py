@@ -2,7 +2,8 @@
 Data and functions related for interacting with the 'ships' endpoint of the Spacetrader API
 """
 #==========
-from .base import SpaceTraderConnection
+from .base import SharedConnection
+from .async_base import awaitable_methods
 from .utilities.custom_types import RefinableProduct, SpaceTraderResp, NavSpeed
 
 #==========
@@ -11,7 +12,7 @@ class Ships:
     Class to query and edit game data related to ships.
     """
     #----------
-    stc = SpaceTraderConnection()
+    stc = SharedConnection()
 
     #----------
     def __init__(self):
@@ -209,4 +210,17 @@ class Ships:
             'symbol':item
             ,'units':quantity
         }
-        return self.stc.stc_http_request(method="POST",url=url,json=body)
\ No newline at end of file
+        return self.stc.stc_http_request(method="POST",url=url,json=body)
+
+#==========
+@awaitable_methods("get_ship","list_all_ships"
+    ,"orbit_ship","dock_ship","jump_ship_to_system","nav_to_waypoint","get_nav_details","warp_ship"
+    ,"chart_current_waypoint","survey_current_waypoint","scan_systems","scan_waypoints","scan_for_ships"
+    ,"get_cooldown","refuel_ship","set_ship_speed","extract_resources","refine_product"
+    ,"get_ship_mounts","install_ship_mount","remove_ship_mount"
+    ,"get_current_cargo","transfer_cargo_to_ship","purchase_cargo","sell_cargo","jettison_cargo")
+class AsyncShips(Ships):
+    """
+    asyncio counterpart of the Ships class - every endpoint method is awaitable, so requests for
+    different ships can run concurrently (within the shared rate limit).
+    """
@@ -0,0 +1,137 @@
+"""
+Long-running jobs that copy paginated API data into the cache, with a persisted checkpoint so an
+interrupted sync (crash, network failure, Ctrl-C) can resume from the last completed page.
+"""
+#==========
+import os
+from time import monotonic
+from datetime import datetime, timezone
+from typing import Callable
+from .base import SpaceTraderConnection,request_priority
+from .utilities.custom_types import SpaceTraderResp,RequestPriority
+from .utilities.basic_utilities import attempt_dict_retrieval, write_dict_to_file
+from .utilities.cache_utilities import batched_cache_writes,CacheWriteBatch
+
+#==========
+class CacheSyncJob:
+    """
+    Walks all pages of a paginated endpoint and hands each page to 'write_page'.
+    After every page, a checkpoint is written to the cache (last completed page, time, reset date),
+    which run(resume=True) uses to skip pages that were already stored.
+    Checkpoints from a previous server reset are ignored, since that data no longer exists.
+    Requests are sent at BACKGROUND priority so the sync doesn't slow down interactive play.
+    Cache writes are batched; the checkpoint is only saved once all completed pages are flushed.
+    A page with an error response stops the sync (it is requested again on resume).
+    """
+    #----------
+    name:str
+    url:str
+    checkpoint_path:str
+
+    #----------
+    def __init__(self,stc:SpaceTraderConnection,name:str,url:str
+                 ,write_page:Callable[[SpaceTraderResp],None]):
+        self.stc = stc
+        self.name = name
+        self.url = url
+        self.write_page = write_page
+        checkpoint_dir = self.stc.base_cache_path + "sync/"
+        os.makedirs(checkpoint_dir,exist_ok=True)
+        self.checkpoint_path = checkpoint_dir + f"{name}.json"
+
+    #----------
+    def get_checkpoint(self) -> dict:
+        return attempt_dict_retrieval(self.checkpoint_path)
+
+    #----------
+    def __save_checkpoint(self,checkpoint:dict) -> None:
+        checkpoint['updated'] = datetime.now(timezone.utc).isoformat()
+        write_dict_to_file(self.checkpoint_path,checkpoint
+                           ,self.stc.config_setup.get_cache_config().get("durable",True))
+
+    #----------
+    def get_start_page(self,reset_date:str,resume:bool) -> int:
+        """Page to start from: 1, unless resuming an unfinished sync from the current reset"""
+        checkpoint = self.get_checkpoint()
+        if not resume or not checkpoint:
+            return 1
+        if checkpoint.get('reset_date') != reset_date:
+            print(f"Checkpoint for '{self.name}' is from a previous server reset - starting over.")
+            return 1
+        if checkpoint.get('completed'):
+            print(f"Sync '{self.name}' already completed at {checkpoint['updated']} - starting over.")
+            return 1
+        return checkpoint['last_page'] + 1
+
+    #----------
+    def run(self,resume:bool=False,page:int|None=None) -> dict:
+        """Run the sync. An explicit 'page' overrides the checkpoint. Returns the final checkpoint."""
+        with request_priority(RequestPriority.BACKGROUND), batched_cache_writes() as batch:
+            return self.__run(resume,page,batch)
+
+    #----------
+    def __run(self,resume:bool,page:int|None,batch:CacheWriteBatch) -> dict:
+        reset_date = self.stc.get_reset_date()
+        start_page = page if page else self.get_start_page(reset_date,resume)
+        checkpoint = self.get_checkpoint() if start_page > 1 else {}
+        checkpoint.update({'job':self.name,'reset_date':reset_date,'completed':False})
+        checkpoint.setdefault('records',0)
+
+        if start_page > 1:
+            print(f"Resuming sync '{self.name}' from page {start_page}")
+        start_time = monotonic()
+        records = 0
+        current_page = start_page
+        try:
+            for response in self.stc.stc_get_paginated_data("GET",self.url,start_page):
+                #(e.g. a rate limited page - stop here, so a resumed sync requests it again)
+                if not self.stc.response_ok(response): raise Exception(response)
+                self.write_page(response)
+                records += len(response['http_data']['data'])
+                checkpoint['last_page'] = current_page
+                checkpoint['records'] += len(response['http_data']['data'])
+                checkpoint['total_pages'] = self.__get_total_pages(response,checkpoint)
+                batch.flush_if_due()
+                #Only checkpoint pages whose records are actually written:
+                if batch.pending_records == 0:
+                    self.__save_checkpoint(checkpoint)
+                self.report_progress(checkpoint,records,monotonic() - start_time)
+                current_page += 1
+        except (Exception,KeyboardInterrupt) as e:
+            print(f"\nSync '{self.name}' stopped at page {current_page}. Run again with 'resume' to continue.")
+            raise e
+
+        batch.flush()
+        #Complete only once the last page (per 'meta.total') is written, not just when pages run out:
+        total_pages = checkpoint.get('total_pages')
+        checkpoint['completed'] = total_pages is None or checkpoint.get('last_page',0) >= total_pages
+        self.__save_checkpoint(checkpoint)
+        if not checkpoint['completed']:
+            print(f"\nSync '{self.name}' stopped at page {current_page} of {total_pages}."
+                  ,"Run again with 'resume' to continue.")
+            return checkpoint
+        stats = batch.get_stats()
+        print(f"\nSync '{self.name}' complete: {checkpoint['records']} records."
+              ,f"Cache: {stats['bytes'] / 1024:.0f} KiB written in {stats['flushes']} flushes"
+              ,f"({stats['shard_writes']} shard writes).")
+        return checkpoint
+
+    #----------
+    def __get_total_pages(self,response:SpaceTraderResp,checkpoint:dict) -> int | None:
+        meta = response['http_data'].get('meta')
+        if meta and 'total' in meta:
+            return -(-meta['total'] // self.stc.page_limit) #Ceiling division
+        return checkpoint.get('total_pages')
+
+    #----------
+    def report_progress(self,checkpoint:dict,records:int,elapsed:float) -> None:
+        """Print progress of the sync on a single, updating line"""
+        rate = records / elapsed if elapsed > 0 else 0.0
+        total_pages = checkpoint.get('total_pages')
+        progress = f"page {checkpoint['last_page']}/{total_pages}" if total_pages else f"page {checkpoint['last_page']}"
+        eta = ""
+        if total_pages and rate > 0:
+            remaining_records = (total_pages - checkpoint['last_page']) * self.stc.page_limit
+            eta = f", ~{int(remaining_records / rate)}s remaining"
+        print(f"\r[{self.name}] {progress}, {checkpoint['records']} records, {rate:.1f} records/s{eta}   "
+              ,end="",flush=True)
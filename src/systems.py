@@ -3,10 +3,12 @@ Data and functions related for interacting with the 'systems' endpoint of the Sp
 """
 #==========
 from typing import Callable
-from .base import SpaceTraderConnection
+from .base import SharedConnection
+from .async_base import awaitable_methods
 from .utilities.custom_types import SpaceTraderResp
-from .utilities.basic_utilities import count_keys_in_dir
-from .utilities.cache_utilities import dict_cache_wrapper,update_cache_dict
+from .utilities.cache_utilities import (dict_cache_wrapper,update_cache_dict,count_cached_keys
+    ,get_shard_path)
+from .sync_jobs import CacheSyncJob
 
 #==========
 class Systems:
@@ -14,7 +16,7 @@ class Systems:
     Class to query and edit game data related to systems.
     """
     #----------
-    stc = SpaceTraderConnection()
+    stc = SharedConnection()
     base_url: str
     cache_path: str
 
@@ -47,9 +49,9 @@ class Systems:
 
     #----------
     def create_cache_path(self,system:str) -> str:
-        """Create cache path from system string. To shard data, we're using the first 4
-        characters of the system string as the file path (only last character varies A-Z)"""
-        return self.cache_path + system[0:4] + ".json"
+        """Create cache path from system string. Which file (shard) a system goes to depends on the
+        configured sharding strategy (see cache_sharding)"""
+        return get_shard_path(self.cache_path,system)
 
     #----------
     def cache_system(func: Callable) -> Callable:
@@ -66,18 +68,23 @@ class Systems:
         return wrapper
 
     #----------
-    def reload_systems_in_cache(self,page:int=1) -> None:
-        """Force-updates all systems data in cache with data from the API"""
-        for system_list in self.stc.stc_get_paginated_data("GET",self.base_url,page):
-            for sys in system_list['http_data']['data']:
-                transformed_sys = {sys['symbol']:sys}
-                #Using first 4 characters of the system symbol as file name:
-                file_path = self.create_cache_path(sys['symbol'])
-                update_cache_dict(transformed_sys,file_path)
+    def cache_systems_page(self,system_list:SpaceTraderResp) -> None:
+        """Stores one page of systems data from the API in the cache"""
+        for sys in system_list['http_data']['data']:
+            transformed_sys = {sys['symbol']:sys}
+            file_path = self.create_cache_path(sys['symbol'])
+            update_cache_dict(transformed_sys,file_path)
+
+    #----------
+    def reload_systems_in_cache(self,page:int|None=None,resume:bool=False) -> dict:
+        """Force-updates all systems data in cache with data from the API.
+        Progress is checkpointed after each page - 'resume' continues an interrupted reload."""
+        job = CacheSyncJob(self.stc,"systems",self.base_url,self.cache_systems_page)
+        return job.run(resume=resume,page=page)
 
     #----------
     def count_systems_in_cache(self) -> int:
-        return count_keys_in_dir(self.cache_path)
+        return count_cached_keys(self.cache_path)
 
     #----------
     @cache_system
@@ -105,3 +112,12 @@ class Systems:
         response = self.stc.stc_http_request(method="GET",url=url)
         if not self.stc.response_ok(response): return {}
         return response['http_data']['data']
+
+
+#==========
+@awaitable_methods("reload_systems_in_cache","get_system","get_shipyard","get_jump_gate")
+class AsyncSystems(Systems):
+    """
+    asyncio counterpart of the Systems class - endpoint methods are awaitable. Cache handling,
+    data formatting and the checkpoints of reload_systems_in_cache are those of Systems.
+    """
@@ -10,6 +10,7 @@ from math import floor, ceil
 from datetime import datetime,timedelta
 from typing import Iterator
 from os import listdir, remove, fsdecode, getenv, environ, path
+from .cache_backends import write_file_atomic
 
 
 # ==========
@@ -144,10 +145,9 @@ def get_dict_from_file(file_path: str) -> dict:
 
 
 # ==========
-def write_dict_to_file(file_path: str, data: dict) -> None:
-    """Writes provided dict to file"""
-    with open(file_path, "w") as file:
-        file.write(json.dumps(data, indent=3))
+def write_dict_to_file(file_path: str, data: dict, durable: bool=True) -> None:
+    """Writes provided dict to file - atomically, and flushed to disk if 'durable' (see write_file_atomic)"""
+    write_file_atomic(file_path, json.dumps(data, indent=3).encode("utf-8"), durable)
 
 
 # ==========
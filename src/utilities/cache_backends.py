@@ -0,0 +1,1328 @@
+"""
+Storage backends for the local cache. Cached data is organised as dictionaries of records stored in
+'shards', which are identified by file paths (e.g., './gameData/systems/X1-A.json'). Backends decide
+how these shards are actually stored: as individual files, or as rows in an SQLite database.
+"""
+
+#==========
+import os
+import json
+import mmap
+import sqlite3
+import tempfile
+from copy import deepcopy
+from threading import Lock
+from time import time
+from uuid import uuid4
+from typing import Callable,Iterable
+from collections import OrderedDict
+from contextlib import contextmanager,nullcontext,ExitStack
+from datetime import datetime, timezone
+from .cache_formats import (ShardFormat,JsonFormat,get_shard_format,get_format_for_file
+    ,strip_shard_extension)
+
+try:
+    import fcntl
+except ImportError:
+    #No advisory locks (e.g., on Windows) - the file cache is then only safe for one process:
+    fcntl = None
+
+
+#==========
+def get_namespace(root:str,file_path:str) -> str:
+    """
+    Namespace of a shard: its directory relative to the cache root (e.g., 'systems'), or the file
+    name without extension for files directly in the cache root (e.g., 'price_chart').
+    """
+    relative = os.path.relpath(os.path.abspath(file_path),root)
+    directory,shard = os.path.split(relative)
+    if directory:
+        return directory.replace(os.sep,"/")
+    return os.path.splitext(shard)[0]
+
+
+#==========
+class ShardLRU:
+    """
+    Bounded in-memory LRU of parsed cache files ("shards"), so that looking up one record doesn't
+    mean reading and parsing a whole file from disk every time.
+    Entries are validated against the file's modification time, size and inode on every lookup, so
+    changes made to the file by another process are picked up. Writes through the cache layer replace the
+    cached shard directly.
+    The bound is on the total number of records held across all cached shards.
+    NOTE: The parsed data is shared - callers must copy records before modifying them.
+    """
+    #----------
+    def __init__(self,max_entries:int=20_000):
+        self.max_entries = max_entries
+        self.__shards:OrderedDict[str,tuple] = OrderedDict()
+        self.__entries = 0
+        self.__lock = Lock()
+        self.__stats = {"hits":0,"misses":0,"evictions":0,"invalidations":0}
+
+    #----------
+    @staticmethod
+    def get_file_identity(file_path:str) -> tuple:
+        """(mtime_ns,size,inode) of the file. Shards are replaced rather than modified, so the inode
+        changes on every write - even one by another process within the same mtime tick."""
+        try:
+            return get_stat_identity(os.stat(file_path))
+        except FileNotFoundError:
+            return (None,None,None)
+
+    #----------
+    def get(self,file_path:str) -> dict | None:
+        """Returns the parsed shard if cached and still up to date - otherwise None"""
+        stamp = self.get_file_identity(file_path)
+        with self.__lock:
+            cached = self.__shards.get(file_path)
+            if cached is None:
+                self.__stats["misses"] += 1
+                return None
+            if cached[0] != stamp:
+                self.__remove(file_path)
+                self.__stats["invalidations"] += 1
+                self.__stats["misses"] += 1
+                return None
+            self.__shards.move_to_end(file_path)
+            self.__stats["hits"] += 1
+            return cached[1]
+
+    #----------
+    def put(self,file_path:str,data:dict,stamp:tuple|None=None) -> None:
+        """Cache parsed shard data. Must be called right after writing the file - or, when reading,
+        with the file's identity taken before it was read."""
+        stamp = stamp or self.get_file_identity(file_path)
+        with self.__lock:
+            self.__remove(file_path)
+            self.__shards[file_path] = (stamp,data)
+            self.__entries += len(data)
+            #Evict least recently used shards until under the bound (but always keep the newest):
+            while self.__entries > self.max_entries and len(self.__shards) > 1:
+                oldest = next(iter(self.__shards))
+                self.__remove(oldest)
+                self.__stats["evictions"] += 1
+
+    #----------
+    def invalidate(self,file_path:str) -> None:
+        with self.__lock:
+            if self.__remove(file_path):
+                self.__stats["invalidations"] += 1
+
+    #----------
+    def clear(self) -> None:
+        with self.__lock:
+            self.__shards.clear()
+            self.__entries = 0
+
+    #----------
+    def __remove(self,file_path:str) -> bool:
+        cached = self.__shards.pop(file_path,None)
+        if cached is None:
+            return False
+        self.__entries -= len(cached[1])
+        return True
+
+    #----------
+    def get_stats(self) -> dict:
+        """Hit/miss/eviction counters, plus the current number of cached shards and records"""
+        with self.__lock:
+            return {**self.__stats,"shards":len(self.__shards),"entries":self.__entries}
+
+
+#==========
+class CacheBackend:
+    """
+    Interface for cache storage. Every method identifies a shard by its file path - whether or not
+    the backend actually stores a file at that path.
+    """
+    #----------
+    def read_shard(self,file_path:str) -> dict:
+        """All records in a shard. NOTE: may be shared with an in-memory cache - do not modify."""
+        raise NotImplementedError
+
+    #----------
+    def get(self,file_path:str,key:str) -> dict | None:
+        """A single record (as a copy the caller may modify) - or None if it isn't cached"""
+        raise NotImplementedError
+
+    #----------
+    def upsert(self,file_path:str,data:dict) -> int:
+        """Insert or replace the given records in a shard. Returns the number of bytes written."""
+        raise NotImplementedError
+
+    #----------
+    def bulk_upsert(self,shards:dict[str,dict]) -> int:
+        """upsert() for several shards at once: {file_path: records}. Returns bytes written."""
+        return sum(self.upsert(file_path,data) for file_path,data in shards.items())
+
+    #----------
+    def write_shard(self,file_path:str,data:dict) -> int:
+        """Replace the entire contents of a shard. Returns the number of bytes written."""
+        raise NotImplementedError
+
+    #----------
+    def delete(self,file_path:str,key:str) -> None:
+        raise NotImplementedError
+
+    #----------
+    def delete_shard(self,file_path:str) -> None:
+        """Removes a shard with all its records"""
+        raise NotImplementedError
+
+    #----------
+    def list_shards(self,dir_path:str) -> list[str]:
+        """File paths of all shards in a cache directory"""
+        raise NotImplementedError
+
+    #----------
+    def get_shard_sizes(self,dir_path:str) -> dict[str,tuple[int,int]]:
+        """{shard file path: (records, bytes stored)} for all shards in a cache directory"""
+        raise NotImplementedError
+
+    #----------
+    def get_keys(self,file_path:str) -> list[str]:
+        return list(self.read_shard(file_path).keys())
+
+    #----------
+    def get_fetched_at(self,file_path:str,key:str) -> float | None:
+        """When a record was last written from fresh data (epoch seconds) - None if unknown"""
+        return None
+
+    #----------
+    def count_keys(self,dir_path:str) -> int:
+        return sum(len(self.get_keys(file_path)) for file_path in self.list_shards(dir_path))
+
+    #----------
+    def get_stats(self) -> dict:
+        return {}
+
+    #----------
+    def close(self) -> None:
+        pass
+
+
+#==========
+class ShardIndex:
+    """
+    On-disk index of where each record sits in its shard file, so one record can be read without
+    parsing the whole shard. Every shard has a small sidecar file in its directory's '.index/'
+    sub-directory (e.g., 'systems/.index/X1-A.json.idx'):
+    {"stamp": [mtime_ns, size, inode], "records": {key: [offset, length]}}
+    The stamp is the identity of the shard file the index was written for (see
+    ShardLRU.get_file_identity) - if the shard has changed since (e.g., replaced by another process
+    with a file of the same size, or edited by hand), the index is ignored. Loaded indexes are kept in memory.
+    Shards can be read through read-only memory maps instead of a file read per record.
+    """
+    #----------
+    def __init__(self):
+        self.__indexes:dict[str,tuple] = {}
+        self.__maps:dict[str,tuple] = {}
+        self.__lock = Lock()
+        self.__stats = {"indexed_reads":0,"mmap_reads":0,"stale_indexes":0}
+
+    #----------
+    @staticmethod
+    def get_index_path(storage_path:str) -> str:
+        dir_path,name = os.path.split(storage_path)
+        return os.path.join(dir_path,".index",name + ".idx")
+
+    #----------
+    def write(self,storage_path:str,stamp:tuple,records:dict[str,tuple[int,int]] | None) -> None:
+        """Stores the index of a shard file that was just written with the given (mtime_ns,size,inode)
+        stamp. 'records' is None for shards that can't be indexed."""
+        if records is None:
+            self.remove(storage_path)
+            return
+        index_path = self.get_index_path(storage_path)
+        os.makedirs(os.path.dirname(index_path),exist_ok=True)
+        #Not flushed to disk - an index cut short by a crash doesn't parse or match its shard, and is ignored:
+        write_file_atomic(index_path,json.dumps({"stamp":stamp,"records":records}).encode("utf-8"),durable=False)
+        with self.__lock:
+            self.__indexes[storage_path] = (stamp,records)
+
+    #----------
+    def remove(self,storage_path:str) -> None:
+        index_path = self.get_index_path(storage_path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        with self.__lock:
+            self.__indexes.pop(storage_path,None)
+            mapped = self.__maps.pop(storage_path,None)
+            if mapped:
+                mapped[1].close()
+
+    #----------
+    def get(self,storage_path:str) -> tuple[tuple,dict] | None:
+        """(stamp, {key: (offset, length)}) of a shard file - or None if it has no valid index"""
+        stamp = ShardLRU.get_file_identity(storage_path)
+        if stamp[0] is None:
+            return None
+        with self.__lock:
+            cached = self.__indexes.get(storage_path)
+        if cached and cached[0] == stamp:
+            return cached
+        try:
+            with open(self.get_index_path(storage_path),"rb") as file:
+                index = json.loads(file.read())
+        except (FileNotFoundError,ValueError):
+            return None
+        if tuple(index["stamp"]) != stamp:
+            with self.__lock:
+                self.__stats["stale_indexes"] += 1
+            return None
+        cached = (stamp,index["records"])
+        with self.__lock:
+            self.__indexes[storage_path] = cached
+        return cached
+
+    #----------
+    def read_range(self,storage_path:str,stamp:tuple,offset:int,length:int,use_mmap:bool=False) -> bytes | None:
+        """Bytes of one record - or None if the file no longer matches the index stamp"""
+        if use_mmap:
+            return self.__read_mapped(storage_path,stamp,offset,length)
+        try:
+            with open(storage_path,"rb") as file:
+                #Checking the opened file itself, in case the shard was replaced after the index lookup:
+                file_stat = os.fstat(file.fileno())
+                if get_stat_identity(file_stat) != stamp:
+                    return None
+                file.seek(offset)
+                raw = file.read(length)
+        except FileNotFoundError:
+            return None
+        with self.__lock:
+            self.__stats["indexed_reads"] += 1
+        return raw
+
+    #----------
+    def __read_mapped(self,storage_path:str,stamp:tuple,offset:int,length:int) -> bytes | None:
+        with self.__lock:
+            cached = self.__maps.get(storage_path)
+            if cached is None or cached[0] != stamp:
+                if cached:
+                    cached[1].close()
+                    del self.__maps[storage_path]
+                try:
+                    with open(storage_path,"rb") as file:
+                        file_stat = os.fstat(file.fileno())
+                        if get_stat_identity(file_stat) != stamp:
+                            return None
+                        #Shards are replaced, never modified in place, so the map stays valid:
+                        cached = (stamp,mmap.mmap(file.fileno(),0,access=mmap.ACCESS_READ))
+                except FileNotFoundError:
+                    return None
+                self.__maps[storage_path] = cached
+            self.__stats["mmap_reads"] += 1
+            return cached[1][offset:offset + length]
+
+    #----------
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return {**self.__stats,"indexes":len(self.__indexes),"maps":len(self.__maps)}
+
+    #----------
+    def close(self) -> None:
+        with self.__lock:
+            for _,mapped in self.__maps.values():
+                mapped.close()
+            self.__maps.clear()
+            self.__indexes.clear()
+
+
+#==========
+class ShardManifest:
+    """
+    Per-directory summary of the shards in a cache directory, kept in '{directory}/.manifest':
+    {"generation": id, "shards": {shard name: {"records","bytes","updated","stamp","keys"}}}
+    where "keys" maps every key in the shard to the time (epoch seconds) its record was fetched -
+    the shard file's modification time if not known.
+    It is updated whenever a shard is written, so counting records or listing keys doesn't read any
+    shard. Updates are appended to '{directory}/.manifest.log' (one line per changed shard, after a
+    header line with the generation of the manifest they apply to), so writing a shard doesn't
+    re-write the entries of all others. The log is compacted into the manifest once it has more lines
+    than the manifest has shards (or 'max_log_lines'). A log of another generation - left behind
+    when a process crashed while compacting - is ignored.
+    Loaded manifests are kept in memory together with their running record count; updates by other
+    processes are read from the log before a manifest is used.
+    check() compares a manifest with the shard files and can rebuild entries that don't match.
+    """
+    #----------
+    max_log_lines:int = 256
+
+    #----------
+    def __init__(self,get_stamp:Callable[[str],tuple],read_keys:Callable[[str],list[str]],durable:bool=True):
+        """'get_stamp' and 'read_keys' take a shard path (as used by callers, i.e. '*.json') and
+        return the (mtime_ns,size,inode) of the stored file and the keys in it"""
+        self.get_stamp = get_stamp
+        self.read_keys = read_keys
+        self.durable = durable
+        self.__manifests:dict[str,dict] = {}
+        self.__lock = Lock()
+
+    #----------
+    @staticmethod
+    def get_manifest_path(dir_path:str) -> str:
+        return os.path.join(os.path.abspath(dir_path),".manifest")
+
+    #----------
+    @staticmethod
+    def get_log_path(dir_path:str) -> str:
+        return os.path.join(os.path.abspath(dir_path),".manifest.log")
+
+    #----------
+    def __load(self,dir_path:str) -> dict:
+        """The manifest of a directory (must hold the lock). Built from the shard files if missing."""
+        dir_path = os.path.abspath(dir_path)
+        manifest_path = self.get_manifest_path(dir_path)
+        stamp = ShardLRU.get_file_identity(manifest_path)
+        log_stamp = ShardLRU.get_file_identity(self.get_log_path(dir_path))
+        cached = self.__manifests.get(dir_path)
+        if cached and cached["file_stamp"] == stamp:
+            if cached["log_stamp"] == log_stamp:
+                return cached
+            if log_stamp[1] is not None and log_stamp[1] >= cached["log_offset"] and (
+                    cached["log_offset"] == 0 or log_stamp[2] == cached["log_stamp"][2]):
+                #Appended to since (by another process) - only the new lines are read:
+                self.__replay(dir_path,cached)
+                return cached
+        if stamp[0] is None:
+            cached = self.__new_manifest(stamp,None,{})
+            self.__manifests[dir_path] = cached
+            if os.path.isdir(dir_path):
+                self.__rebuild(dir_path,cached)
+            return cached
+        with open(manifest_path,"rb") as file:
+            stored = json.loads(file.read())
+        shards = stored["shards"]
+        for shard in shards.values():
+            if isinstance(shard["keys"],list):
+                #Manifest from before fetch times were recorded - using the file's time instead:
+                shard["keys"] = dict.fromkeys(shard["keys"],round(shard["stamp"][0] / 1e9,3))
+        cached = self.__new_manifest(stamp,stored.get("generation"),shards)
+        self.__manifests[dir_path] = cached
+        self.__replay(dir_path,cached)
+        return cached
+
+    #----------
+    @staticmethod
+    def __new_manifest(stamp:tuple,generation:str|None,shards:dict) -> dict:
+        return {"file_stamp":stamp,"generation":generation,"shards":shards
+                ,"records":sum(shard["records"] for shard in shards.values())
+                ,"log_stamp":(None,None,None),"log_offset":0,"log_lines":0,"log_stale":False}
+
+    #----------
+    def __replay(self,dir_path:str,manifest:dict) -> None:
+        """Applies the log lines not read yet. A line still being written (or left unfinished by a
+        crashed process) is read on a later call, once complete."""
+        try:
+            with open(self.get_log_path(dir_path),"rb") as file:
+                file.seek(manifest["log_offset"])
+                raw = file.read()
+                log_stamp = get_stat_identity(os.fstat(file.fileno()))
+        except FileNotFoundError:
+            manifest.update(log_stamp=(None,None,None),log_offset=0,log_lines=0,log_stale=False)
+            return
+        lines = raw[:raw.rfind(b"\n") + 1].splitlines(keepends=True)
+        if lines and manifest["log_offset"] == 0:
+            header = lines.pop(0)
+            manifest["log_offset"] += len(header)
+            manifest["log_stale"] = json.loads(header).get("generation") != manifest["generation"]
+        if not manifest["log_stale"]:
+            for line in lines:
+                update = json.loads(line)
+                self.__apply(manifest,update["name"],update["entry"])
+        manifest["log_offset"] += sum(len(line) for line in lines)
+        manifest["log_lines"] += len(lines)
+        manifest["log_stamp"] = log_stamp
+
+    #----------
+    def __rebuild(self,dir_path:str,manifest:dict) -> None:
+        for name in os.listdir(dir_path):
+            shard_name = strip_shard_extension(name)
+            if shard_name and not name.startswith(".") and os.path.isfile(os.path.join(dir_path,name)):
+                file_path = os.path.join(dir_path,shard_name + ".json")
+                self.__set_entry(manifest,file_path,self.read_keys(file_path),None,self.get_stamp(file_path),())
+        self.__persist(dir_path,manifest)
+
+    #----------
+    def __set_entry(self,manifest:dict,file_path:str,keys:list[str],size:int|None,stamp:tuple
+                    ,fetched_keys:Iterable[str]) -> tuple[str,dict | None]:
+        """'fetched_keys': keys whose records were just fetched - others keep their fetch time.
+        Returns the shard's name and new entry (None if removed)."""
+        name = os.path.basename(file_path)
+        if stamp[0] is None:
+            self.__apply(manifest,name,None)
+            return (name,None)
+        now = round(time(),3)
+        fetched_keys = set(fetched_keys)
+        previous = manifest["shards"].get(name)
+        previous_fetched = previous["keys"] if previous else {}
+        unknown = round(stamp[0] / 1e9,3)
+        entry = {
+            "records":len(keys)
+            ,"bytes":size if size is not None else stamp[1]
+            ,"updated":datetime.now(timezone.utc).isoformat()
+            ,"stamp":list(stamp)
+            ,"keys":{key:now if key in fetched_keys else previous_fetched.get(key,unknown) for key in keys}
+        }
+        self.__apply(manifest,name,entry)
+        return (name,entry)
+
+    #----------
+    @staticmethod
+    def __apply(manifest:dict,name:str,entry:dict | None) -> None:
+        previous = manifest["shards"].pop(name,None)
+        manifest["records"] -= previous["records"] if previous else 0
+        if entry is not None:
+            manifest["shards"][name] = entry
+            manifest["records"] += entry["records"]
+
+    #----------
+    def __persist(self,dir_path:str,manifest:dict) -> None:
+        """Writes the whole manifest under a new generation, and drops the log it replaces"""
+        manifest_path = self.get_manifest_path(dir_path)
+        os.makedirs(dir_path,exist_ok=True)
+        generation = uuid4().hex
+        raw = json.dumps({"generation":generation,"shards":manifest["shards"]}).encode("utf-8")
+        write_file_atomic(manifest_path,raw,self.durable)
+        #(If this is lost in a crash, the log is ignored - its generation doesn't match)
+        try:
+            os.remove(self.get_log_path(dir_path))
+        except FileNotFoundError:
+            pass
+        manifest.update(file_stamp=ShardLRU.get_file_identity(manifest_path),generation=generation
+                        ,log_stamp=(None,None,None),log_offset=0,log_lines=0,log_stale=False)
+
+    #----------
+    def __append(self,dir_path:str,manifest:dict,updates:list[tuple[str,dict | None]]) -> None:
+        """Appends updates to the log (writers hold the directory's lock, so there is one at a time)"""
+        log_path = self.get_log_path(dir_path)
+        raw = b"".join(json.dumps({"name":name,"entry":entry}).encode("utf-8") + b"\n" for name,entry in updates)
+        new_log = manifest["log_offset"] == 0 or manifest["log_stale"]
+        if new_log:
+            header = json.dumps({"generation":manifest["generation"]}).encode("utf-8") + b"\n"
+            raw = header + raw
+        with open(log_path,"wb" if new_log else "ab") as file:
+            if not new_log and os.fstat(file.fileno()).st_size > manifest["log_offset"]:
+                #Dropping the unfinished line of a crashed writer:
+                file.truncate(manifest["log_offset"])
+            file.write(raw)
+            file.flush()
+            if self.durable:
+                os.fsync(file.fileno())
+            log_stamp = get_stat_identity(os.fstat(file.fileno()))
+        if new_log and self.durable:
+            fsync_dir(dir_path)
+        manifest.update(log_stamp=log_stamp,log_offset=manifest["log_offset"] + len(raw)
+                        ,log_lines=manifest["log_lines"] + len(updates) + new_log,log_stale=False)
+
+    #----------
+    def update(self,file_paths:dict[str,tuple[list[str],int|None,tuple,Iterable[str]]]) -> None:
+        """Records shards that were just written or deleted:
+        {shard path: (keys, bytes, stamp, keys of records just fetched)}.
+        A stamp of (None,None,None) removes the shard. All shards must be in the same directory."""
+        if not file_paths:
+            return
+        dir_path = os.path.dirname(os.path.abspath(next(iter(file_paths))))
+        with self.__lock:
+            manifest = self.__load(dir_path)
+            updates = [self.__set_entry(manifest,file_path,keys,size,stamp,fetched_keys)
+                       for file_path,(keys,size,stamp,fetched_keys) in file_paths.items()]
+            if manifest["log_lines"] + len(updates) > max(self.max_log_lines,len(manifest["shards"])):
+                self.__persist(dir_path,manifest)
+            else:
+                self.__append(dir_path,manifest,updates)
+
+    #----------
+    def get_entry(self,file_path:str) -> dict | None:
+        """The manifest entry of a shard, if it matches the shard file currently stored"""
+        with self.__lock:
+            entry = self.__load(os.path.dirname(os.path.abspath(file_path)))["shards"].get(os.path.basename(file_path))
+        if entry and tuple(entry["stamp"]) == self.get_stamp(file_path):
+            return entry
+        return None
+
+    #----------
+    def count(self,dir_path:str) -> int:
+        """Records in all shards of a directory, without reading any shard"""
+        with self.__lock:
+            return self.__load(dir_path)["records"]
+
+    #----------
+    def get_shards(self,dir_path:str) -> dict[str,dict]:
+        """Copy of the manifest entries of all shards in a directory"""
+        with self.__lock:
+            return deepcopy(self.__load(dir_path)["shards"])
+
+    #----------
+    def check(self,dir_path:str,repair:bool=False) -> dict:
+        """
+        Compares the manifest with the shard files of a directory. Returns shard names that are
+        'missing' (file without manifest entry), 'orphaned' (entry without file) or 'stale' (file
+        changed since the entry was written, or different keys). With 'repair', those entries are
+        rebuilt from the files.
+        """
+        dir_path = os.path.abspath(dir_path)
+        with self.__lock:
+            manifest = self.__load(dir_path)
+            on_disk = set()
+            if os.path.isdir(dir_path):
+                for name in os.listdir(dir_path):
+                    shard_name = strip_shard_extension(name)
+                    if shard_name and not name.startswith(".") and os.path.isfile(os.path.join(dir_path,name)):
+                        on_disk.add(shard_name + ".json")
+            listed = set(manifest["shards"])
+            report = {"missing":sorted(on_disk - listed),"orphaned":sorted(listed - on_disk),"stale":[]}
+            for name in sorted(on_disk & listed):
+                file_path = os.path.join(dir_path,name)
+                entry = manifest["shards"][name]
+                if (tuple(entry["stamp"]) != self.get_stamp(file_path)
+                        or sorted(entry["keys"]) != sorted(self.read_keys(file_path))):
+                    report["stale"].append(name)
+            report["ok"] = not (report["missing"] or report["orphaned"] or report["stale"])
+            if repair and not report["ok"]:
+                for name in report["missing"] + report["orphaned"] + report["stale"]:
+                    file_path = os.path.join(dir_path,name)
+                    keys = self.read_keys(file_path) if name in on_disk else []
+                    self.__set_entry(manifest,file_path,keys,None,self.get_stamp(file_path),())
+                self.__persist(dir_path,manifest)
+            return report
+
+    #----------
+    def forget(self) -> None:
+        """Drops manifests held in memory (they are re-loaded from disk when needed)"""
+        with self.__lock:
+            self.__manifests.clear()
+
+
+#==========
+class FileShardBackend(CacheBackend):
+    """
+    The original cache layout: every shard is a file. Shards are pretty-printed JSON, unless another
+    format is set for their namespace (see cache_formats) - e.g., {'systems':'msgpack+zstd'}.
+    Shard paths given by callers always end in '.json'; the file actually written gets the extension
+    of its format. Legacy JSON files are still read after a namespace's format changes, and are
+    replaced by the new format on the next write.
+    Parsed files are kept in an in-memory LRU (ShardLRU), so repeated lookups don't re-read the file.
+    Single records of shards not in memory are read through the shard's offset index (ShardIndex),
+    using memory maps for the namespaces in 'mmap_namespaces'. Record counts and key listings come
+    from the directory's manifest (ShardManifest).
+    Several processes can share one cache: writers lock the directories they write to (DirectoryLock),
+    and shards are replaced atomically - flushed to disk first if 'durable'. With a root, writes are
+    journaled (WriteJournal), and manifests left inconsistent by a crashed process are repaired
+    when the backend is created.
+    """
+    #----------
+    #Marker for "the shard has no usable index" (None means "the record isn't in the shard"):
+    __not_indexed = object()
+
+    #----------
+    def __init__(self,root:str|None=None,formats:dict[str,str]|None=None
+                 ,mmap_namespaces:list[str]|None=None,max_memory_entries:int=20_000,durable:bool=True):
+        self.root = os.path.abspath(root) if root else None
+        self.formats = dict(formats or {})
+        self.mmap_namespaces = list(mmap_namespaces or [])
+        self.durable = durable
+        self.__formats = {namespace:get_shard_format(name) for namespace,name in self.formats.items()}
+        self.__json = JsonFormat()
+        self.shard_cache = ShardLRU(max_memory_entries)
+        self.index = ShardIndex()
+        self.manifest = ShardManifest(self.get_stamp,self.__read_keys,durable)
+        self.journal = None
+        self.recovered = {"journals":0,"directories":[]}
+        if self.root is not None:
+            self.journal = WriteJournal(os.path.join(self.root,".journal"),self.__repair_dir)
+            self.recovered = self.journal.recover()
+
+    #----------
+    def get_stamp(self,file_path:str) -> tuple:
+        """(mtime_ns,size,inode) of the file currently storing a shard"""
+        return ShardLRU.get_file_identity(self.get_existing_path(file_path))
+
+    #----------
+    def get_format(self,file_path:str) -> ShardFormat:
+        """Format that shards of the file's namespace are written in"""
+        if self.root is None or not self.__formats:
+            return self.__json
+        return self.__formats.get(get_namespace(self.root,file_path),self.__json)
+
+    #----------
+    def get_storage_path(self,file_path:str) -> str:
+        """Path of the file storing a shard in its namespace's format"""
+        return os.path.splitext(file_path)[0] + self.get_format(file_path).extension
+
+    #----------
+    def get_existing_path(self,file_path:str) -> str:
+        """Like get_storage_path, but falls back to a legacy JSON shard not yet re-written in the
+        namespace's format"""
+        storage_path = self.get_storage_path(file_path)
+        if storage_path != file_path and not os.path.exists(storage_path) and os.path.exists(file_path):
+            return file_path
+        return storage_path
+
+    #----------
+    def load_file(self,storage_path:str) -> dict:
+        """Reads and decodes a shard file of any format - {} if it doesn't exist"""
+        try:
+            with open(storage_path,"rb") as file:
+                raw = file.read()
+        except FileNotFoundError:
+            return {}
+        return get_format_for_file(storage_path).loads(raw)
+
+    #----------
+    def read_shard(self,file_path:str) -> dict:
+        storage_path = self.get_existing_path(file_path)
+        data = self.shard_cache.get(storage_path)
+        if data is None:
+            #If the file is replaced while being read, the entry is stale and dropped on next use:
+            identity = ShardLRU.get_file_identity(storage_path)
+            data = self.load_file(storage_path)
+            self.shard_cache.put(storage_path,data,identity)
+        return data
+
+    #----------
+    def get(self,file_path:str,key:str) -> dict | None:
+        storage_path = self.get_existing_path(file_path)
+        data = self.shard_cache.get(storage_path)
+        if data is None:
+            record = self.__get_indexed(file_path,storage_path,key)
+            if record is not self.__not_indexed:
+                return record
+            data = self.read_shard(file_path)
+        return deepcopy(data[key]) if key in data else None
+
+    #----------
+    def __get_indexed(self,file_path:str,storage_path:str,key:str):
+        """A record read through the shard's index - None if it isn't in the shard, or __not_indexed
+        if the shard has no valid index"""
+        index = self.index.get(storage_path)
+        if index is None:
+            return self.__not_indexed
+        stamp,records = index
+        if key not in records:
+            return None
+        use_mmap = self.root is not None and get_namespace(self.root,file_path) in self.mmap_namespaces
+        raw = self.index.read_range(storage_path,stamp,*records[key],use_mmap=use_mmap)
+        if raw is None:
+            return self.__not_indexed
+        return get_format_for_file(storage_path).loads_record(raw)
+
+    #----------
+    def upsert(self,file_path:str,data:dict) -> int:
+        return self.bulk_upsert({file_path:data})
+
+    #----------
+    def bulk_upsert(self,shards:dict[str,dict]) -> int:
+        """Writes every shard once, and each affected manifest once"""
+        written = 0
+        by_dir:dict[str,dict] = {}
+        with self.__writing(shards):
+            for file_path,data in shards.items():
+                existing_data = dict(self.read_shard(file_path))
+                existing_data.update(deepcopy(data))
+                size,stamp = self.__write(file_path,existing_data)
+                by_dir.setdefault(os.path.dirname(os.path.abspath(file_path)),{})[file_path] = (
+                    list(existing_data.keys()),size,stamp,data.keys())
+                written += size
+            for entries in by_dir.values():
+                self.manifest.update(entries)
+        return written
+
+    #----------
+    def write_shard(self,file_path:str,data:dict,fetched_keys:Iterable[str]|None=None) -> int:
+        """'fetched_keys': records that count as just fetched (default: all) - others keep their
+        previous fetch time"""
+        with self.__writing([file_path]):
+            return self.__replace_shard(file_path,data,fetched_keys)
+
+    #----------
+    def __replace_shard(self,file_path:str,data:dict,fetched_keys:Iterable[str]|None) -> int:
+        size,stamp = self.__write(file_path,data)
+        fetched_keys = data.keys() if fetched_keys is None else fetched_keys
+        self.manifest.update({file_path:(list(data.keys()),size,stamp,fetched_keys)})
+        return size
+
+    #----------
+    @contextmanager
+    def __writing(self,file_paths:Iterable[str]):
+        """Locks the directories of shards about to be written, and journals the write"""
+        file_paths = list(file_paths)
+        with lock_directories(file_paths):
+            if self.journal is None:
+                yield
+            else:
+                with self.journal.record(file_paths):
+                    yield
+
+    #----------
+    def __write(self,file_path:str,data:dict) -> tuple[int,tuple]:
+        """Writes a shard file and its index. Returns (bytes written, stamp of the file)."""
+        storage_path = self.get_storage_path(file_path)
+        raw,records = self.get_format(file_path).dumps_indexed(data)
+        os.makedirs(os.path.dirname(storage_path) or ".",exist_ok=True)
+        stamp = write_file_atomic(storage_path,raw,self.durable)
+        self.shard_cache.put(storage_path,data)
+        self.index.write(storage_path,stamp,records)
+        if storage_path != file_path and os.path.exists(file_path):
+            #Legacy JSON shard is superseded by the file just written:
+            os.remove(file_path)
+            self.shard_cache.invalidate(file_path)
+            self.index.remove(file_path)
+        return (len(raw),stamp)
+
+    #----------
+    def delete(self,file_path:str,key:str) -> None:
+        with self.__writing([file_path]):
+            data = self.read_shard(file_path)
+            if key in data:
+                data = dict(data)
+                del data[key]
+                self.__replace_shard(file_path,data,fetched_keys=())
+
+    #----------
+    def delete_shard(self,file_path:str) -> None:
+        with self.__writing([file_path]):
+            for path in {self.get_storage_path(file_path),file_path}:
+                if os.path.exists(path):
+                    os.remove(path)
+                self.shard_cache.invalidate(path)
+                self.index.remove(path)
+            self.manifest.update({file_path:([],None,(None,None,None),())})
+
+    #----------
+    def list_shards(self,dir_path:str) -> list[str]:
+        if not os.path.isdir(dir_path):
+            return []
+        dir_path = dir_path.rstrip("/")
+        shard_names = set()
+        for name in os.listdir(dir_path):
+            shard_name = strip_shard_extension(name)
+            if shard_name and not name.startswith(".") and os.path.isfile(f"{dir_path}/{name}"):
+                shard_names.add(shard_name)
+        return [f"{dir_path}/{name}.json" for name in sorted(shard_names)]
+
+    #----------
+    def get_keys(self,file_path:str) -> list[str]:
+        entry = self.manifest.get_entry(file_path)
+        if entry is not None:
+            return list(entry["keys"])
+        return self.__read_keys(file_path)
+
+    #----------
+    def __read_keys(self,file_path:str) -> list[str]:
+        """Keys of a shard from its offset index, or by parsing it"""
+        index = self.index.get(self.get_existing_path(file_path))
+        if index is not None:
+            return list(index[1].keys())
+        return list(self.read_shard(file_path).keys())
+
+    #----------
+    def count_keys(self,dir_path:str) -> int:
+        return self.manifest.count(dir_path)
+
+    #----------
+    def get_fetched_at(self,file_path:str,key:str) -> float | None:
+        entry = self.manifest.get_entry(file_path)
+        if entry is not None and key in entry["keys"]:
+            return entry["keys"][key]
+        stamp = self.get_stamp(file_path)
+        return stamp[0] / 1e9 if stamp[0] is not None else None
+
+    #----------
+    def check_manifest(self,dir_path:str,repair:bool=False) -> dict:
+        """See ShardManifest.check"""
+        if not repair:
+            return self.manifest.check(dir_path)
+        with DirectoryLock(dir_path):
+            return self.manifest.check(dir_path,repair=True)
+
+    #----------
+    def __repair_dir(self,dir_path:str) -> None:
+        self.check_manifest(dir_path,repair=True)
+
+    #----------
+    def reindex(self,dir_path:str) -> int:
+        """Re-writes all shards of a cache directory, so every shard has an up-to-date index (and is
+        in its namespace's current format). Returns the number of shards re-written."""
+        with DirectoryLock(dir_path):
+            shards = self.list_shards(dir_path)
+            with self.journal.record(shards) if self.journal else nullcontext():
+                for file_path in shards:
+                    self.__replace_shard(file_path,dict(self.read_shard(file_path)),None)
+        return len(shards)
+
+    #----------
+    def get_shard_sizes(self,dir_path:str) -> dict[str,tuple[int,int]]:
+        dir_path = dir_path.rstrip("/")
+        return {f"{dir_path}/{name}":(entry["records"],entry["bytes"])
+                for name,entry in sorted(self.manifest.get_shards(dir_path).items())}
+
+    #----------
+    def get_stats(self) -> dict:
+        return {"backend":"files","formats":self.formats,"memory":self.shard_cache.get_stats()
+                ,"index":self.index.get_stats(),"lock_waits":DirectoryLock.waits
+                ,"journal":self.journal.get_stats() if self.journal else None}
+
+    #----------
+    def close(self) -> None:
+        self.index.close()
+        if self.journal is not None:
+            self.journal.close()
+
+
+#==========
+def write_file_atomic(file_path:str,raw:bytes,durable:bool=True) -> tuple[int,int,int]:
+    """
+    Writes a file by replacing it with a completely written temporary file, so readers (and memory
+    maps) never see a partially written file. Returns the (mtime_ns,size,inode) of the new file.
+    'durable' files are flushed to disk (fsync) before they replace the old file, and the rename is
+    flushed too - so after a crash or power loss the file is either the old or the new version.
+    Temporary files are named '.tmp-{pid}-*', so leftovers of a crashed process can be told apart.
+    """
+    dir_path = os.path.dirname(file_path) or "."
+    mode = os.stat(file_path).st_mode & 0o777 if os.path.exists(file_path) else 0o644
+    handle,tmp_path = tempfile.mkstemp(dir=dir_path,prefix=f".tmp-{os.getpid()}-")
+    try:
+        with os.fdopen(handle,"wb") as file:
+            file.write(raw)
+            file.flush()
+            if durable:
+                os.fsync(file.fileno())
+            os.fchmod(file.fileno(),mode)
+            file_stat = os.fstat(file.fileno())
+        #Renaming keeps the modification time and inode, so the stamp is that of the file at 'file_path':
+        os.replace(tmp_path,file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if durable:
+        fsync_dir(dir_path)
+    return get_stat_identity(file_stat)
+
+#----------
+def get_stat_identity(file_stat:os.stat_result) -> tuple[int,int,int]:
+    """(mtime_ns,size,inode) - see ShardLRU.get_file_identity"""
+    return (file_stat.st_mtime_ns,file_stat.st_size,file_stat.st_ino)
+
+#----------
+def fsync_dir(dir_path:str) -> None:
+    """Flushes a directory's entries (e.g., a rename) to disk - where the platform allows it"""
+    try:
+        handle = os.open(dir_path,os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(handle)
+    except OSError:
+        pass
+    finally:
+        os.close(handle)
+
+
+#==========
+class DirectoryLock:
+    """
+    Exclusive advisory lock (flock) on a cache directory, through its '.lock' file. Held by writers
+    while they read, modify and write shards of the directory and its manifest, so processes sharing
+    one cache don't overwrite each other's records. Readers never lock: files are only ever replaced
+    whole. Locks are per directory, so writers of different namespaces don't wait for each other.
+    Without fcntl (Windows), locking is a no-op.
+    """
+    #----------
+    #Times a lock was already held by someone else, and had to be waited for:
+    waits = 0
+
+    #----------
+    def __init__(self,dir_path:str):
+        self.dir_path = os.path.abspath(dir_path)
+        self.__file = None
+
+    #----------
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        os.makedirs(self.dir_path,exist_ok=True)
+        self.__file = open(os.path.join(self.dir_path,".lock"),"a+b")
+        try:
+            fcntl.flock(self.__file.fileno(),fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            DirectoryLock.waits += 1
+            fcntl.flock(self.__file.fileno(),fcntl.LOCK_EX)
+        except BaseException:
+            self.__file.close()
+            raise
+        return self
+
+    #----------
+    def __exit__(self,exc_type,exc,traceback):
+        if self.__file is not None:
+            fcntl.flock(self.__file.fileno(),fcntl.LOCK_UN)
+            self.__file.close()
+            self.__file = None
+        return False
+
+#----------
+@contextmanager
+def lock_directories(file_paths:Iterable[str]):
+    """Locks the directories of the given shard paths - always in the same (sorted) order, so two
+    processes writing to several directories can't deadlock"""
+    dir_paths = sorted({os.path.dirname(os.path.abspath(file_path)) for file_path in file_paths})
+    with ExitStack() as stack:
+        for dir_path in dir_paths:
+            stack.enter_context(DirectoryLock(dir_path))
+        yield
+
+
+#==========
+class WriteJournal:
+    """
+    Small write-ahead journal of the shards this process is about to write: '{journal dir}/{pid}.wal',
+    with one JSON line per entry. Before shards are written, a 'begin' entry listing them is appended
+    and flushed to disk; a 'commit' entry follows once the shards and their manifest are written.
+    Shard files are replaced atomically, so after a crash every shard is either its old or its new
+    version - but the directory's manifest may not match the shards. recover() looks for journals
+    of processes that have died (a live process holds a lock on its journal), and repairs the
+    manifests of the directories with uncommitted writes - rather than the whole cache needing a
+    re-sync. The journal only holds paths, never records, so it stays small.
+    """
+    #----------
+    def __init__(self,journal_dir:str,repair:Callable[[str],None],max_bytes:int=64_000):
+        """'repair' takes a directory and brings its manifest in line with its shard files.
+        The journal is emptied whenever it is over 'max_bytes' with no write in progress."""
+        self.journal_dir = journal_dir
+        self.repair = repair
+        self.max_bytes = max_bytes
+        self.__file = None
+        self.__pid = None
+        self.__next_id = 1
+        self.__open_entries:set[int] = set()
+        self.__lock = Lock()
+        self.__stats = {"entries":0,"recovered_journals":0,"repaired_dirs":0}
+
+    #----------
+    def get_journal_path(self,pid:int) -> str:
+        return os.path.join(self.journal_dir,f"{pid}.wal")
+
+    #----------
+    def begin(self,file_paths:Iterable[str]) -> int:
+        """Records shards that are about to be written. Returns the id of the entry to commit."""
+        with self.__lock:
+            entry_id = self.__next_id
+            self.__next_id += 1
+            self.__append({"begin":entry_id,"shards":sorted(os.path.abspath(path) for path in file_paths)},sync=True)
+            self.__open_entries.add(entry_id)
+            self.__stats["entries"] += 1
+            return entry_id
+
+    #----------
+    def commit(self,entry_id:int) -> None:
+        """Marks a write as complete. Not flushed to disk - a lost commit only means a needless repair."""
+        with self.__lock:
+            self.__append({"commit":entry_id},sync=False)
+            self.__open_entries.discard(entry_id)
+            if not self.__open_entries and self.__file.tell() > self.max_bytes:
+                self.__file.truncate(0)
+                self.__file.seek(0)
+
+    #----------
+    @contextmanager
+    def record(self,file_paths:Iterable[str]):
+        """Journals the writes to shards made within the context. Writes that fail are left
+        uncommitted, and repaired by the next process to start."""
+        entry_id = self.begin(file_paths)
+        yield
+        self.commit(entry_id)
+
+    #----------
+    def __append(self,entry:dict,sync:bool) -> None:
+        if self.__file is None or self.__pid != os.getpid():
+            #First write of this process (or of a forked child, which needs its own journal):
+            self.__pid = os.getpid()
+            os.makedirs(self.journal_dir,exist_ok=True)
+            self.__file = open(self.get_journal_path(self.__pid),"ab")
+            if fcntl is not None:
+                fcntl.flock(self.__file.fileno(),fcntl.LOCK_EX)
+            fsync_dir(self.journal_dir)
+        self.__file.write(json.dumps(entry).encode("utf-8") + b"\n")
+        self.__file.flush()
+        if sync:
+            os.fsync(self.__file.fileno())
+
+    #----------
+    def recover(self) -> dict:
+        """
+        Repairs what crashed processes left behind: for every journal that isn't locked by a live
+        process, the directories of uncommitted writes get their manifest repaired and the process's
+        temporary files removed. The journal is then deleted.
+        Returns {"journals": journals recovered, "directories": directories repaired}.
+        """
+        report = {"journals":0,"directories":[]}
+        if not os.path.isdir(self.journal_dir):
+            return report
+        for name in sorted(os.listdir(self.journal_dir)):
+            pid = name[:-len(".wal")]
+            if not name.endswith(".wal") or (self.__file is not None and pid == str(self.__pid)):
+                continue
+            journal_path = os.path.join(self.journal_dir,name)
+            try:
+                file = open(journal_path,"r+b")
+            except FileNotFoundError:
+                continue
+            with file:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(file.fileno(),fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        #The process writing this journal is still running:
+                        continue
+                dir_paths = sorted({os.path.dirname(path) for path in self.__get_uncommitted(file.read())})
+                for dir_path in dir_paths:
+                    if os.path.isdir(dir_path):
+                        self.__remove_tmp_files(dir_path,pid)
+                        self.repair(dir_path)
+                os.remove(journal_path)
+            report["journals"] += 1
+            report["directories"].extend(dir_paths)
+        with self.__lock:
+            self.__stats["recovered_journals"] += report["journals"]
+            self.__stats["repaired_dirs"] += len(report["directories"])
+        return report
+
+    #----------
+    @staticmethod
+    def __get_uncommitted(raw:bytes) -> set[str]:
+        """Shards of the 'begin' entries without a 'commit' in a journal"""
+        begun = {}
+        committed = set()
+        for line in raw.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                #A line cut short by the crash - written before any shard was touched:
+                continue
+            if "begin" in entry:
+                begun[entry["begin"]] = entry["shards"]
+            elif "commit" in entry:
+                committed.add(entry["commit"])
+        return {path for entry_id,paths in begun.items() if entry_id not in committed for path in paths}
+
+    #----------
+    @staticmethod
+    def __remove_tmp_files(dir_path:str,pid:str) -> None:
+        for sub_dir in (dir_path,os.path.join(dir_path,".index")):
+            if os.path.isdir(sub_dir):
+                for name in os.listdir(sub_dir):
+                    if name.startswith(f".tmp-{pid}-"):
+                        os.remove(os.path.join(sub_dir,name))
+
+    #----------
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return dict(self.__stats)
+
+    #----------
+    def close(self) -> None:
+        with self.__lock:
+            if self.__file is not None and not self.__open_entries and self.__pid == os.getpid():
+                self.__file.close()
+                self.__file = None
+                #Without fcntl, another process may have taken it for a crashed one's journal:
+                if os.path.exists(self.get_journal_path(self.__pid)):
+                    os.remove(self.get_journal_path(self.__pid))
+
+
+#==========
+class SqliteBackend(CacheBackend):
+    """
+    Stores all cached records in a single SQLite database (WAL mode), one row per record keyed by
+    (namespace, key). Writing a record no longer means rewriting a whole shard file.
+    The namespace is the cache sub-directory of a shard (e.g., 'systems'), or the file name for files
+    directly in the cache root (e.g., 'price_chart'). The shard name is kept so shard-based listing
+    still works.
+    """
+    #----------
+    def __init__(self,root:str,db_name:str="cache.sqlite3"):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root,exist_ok=True)
+        self.db_path = os.path.join(self.root,db_name)
+        self.__lock = Lock()
+        self.__connection = sqlite3.connect(self.db_path,check_same_thread=False,isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL
+                ,key TEXT NOT NULL
+                ,shard TEXT NOT NULL
+                ,value TEXT NOT NULL
+                ,updated TEXT NOT NULL
+                ,PRIMARY KEY (namespace,key)
+            )""")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS entries_shard ON entries (namespace,shard)")
+
+    #----------
+    def get_location(self,file_path:str) -> tuple[str,str]:
+        """(namespace, shard) for a shard file path"""
+        return (get_namespace(self.root,file_path),os.path.basename(file_path))
+
+    #----------
+    def read_shard(self,file_path:str) -> dict:
+        namespace,shard = self.get_location(file_path)
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT key,value FROM entries WHERE namespace=? AND shard=?",(namespace,shard)).fetchall()
+        return {key:json.loads(value) for key,value in rows}
+
+    #----------
+    def get(self,file_path:str,key:str) -> dict | None:
+        namespace,_ = self.get_location(file_path)
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT value FROM entries WHERE namespace=? AND key=?",(namespace,key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    #----------
+    def upsert(self,file_path:str,data:dict) -> int:
+        return self.bulk_upsert({file_path:data})
+
+    #----------
+    def bulk_upsert(self,shards:dict[str,dict]) -> int:
+        """All records are written in a single transaction"""
+        rows = self.__get_rows(shards)
+        with self.__lock, self.__transaction():
+            self.__insert_rows(rows)
+        return sum(len(row[1]) + len(row[3]) for row in rows)
+
+    #----------
+    def write_shard(self,file_path:str,data:dict) -> int:
+        """Old records are deleted and new ones written in one transaction - readers never see an empty shard"""
+        namespace,shard = self.get_location(file_path)
+        rows = self.__get_rows({file_path:data})
+        with self.__lock, self.__transaction():
+            self.__connection.execute("DELETE FROM entries WHERE namespace=? AND shard=?",(namespace,shard))
+            self.__insert_rows(rows)
+        return sum(len(row[1]) + len(row[3]) for row in rows)
+
+    #----------
+    def __get_rows(self,shards:dict[str,dict]) -> list[tuple]:
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for file_path,data in shards.items():
+            namespace,shard = self.get_location(file_path)
+            rows.extend((namespace,key,shard,json.dumps(value),now) for key,value in data.items())
+        return rows
+
+    #----------
+    def __insert_rows(self,rows:list[tuple]) -> None:
+        self.__connection.executemany(
+            "INSERT OR REPLACE INTO entries (namespace,key,shard,value,updated) VALUES (?,?,?,?,?)",rows)
+
+    #----------
+    def delete(self,file_path:str,key:str) -> None:
+        namespace,_ = self.get_location(file_path)
+        with self.__lock:
+            self.__connection.execute("DELETE FROM entries WHERE namespace=? AND key=?",(namespace,key))
+
+    #----------
+    def delete_shard(self,file_path:str) -> None:
+        namespace,shard = self.get_location(file_path)
+        with self.__lock:
+            self.__connection.execute("DELETE FROM entries WHERE namespace=? AND shard=?",(namespace,shard))
+
+    #----------
+    def list_shards(self,dir_path:str) -> list[str]:
+        namespace = os.path.relpath(os.path.abspath(dir_path),self.root).replace(os.sep,"/")
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT DISTINCT shard FROM entries WHERE namespace=? ORDER BY shard",(namespace,)).fetchall()
+        return [os.path.join(dir_path,shard) for (shard,) in rows]
+
+    #----------
+    def get_keys(self,file_path:str) -> list[str]:
+        namespace,shard = self.get_location(file_path)
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT key FROM entries WHERE namespace=? AND shard=?",(namespace,shard)).fetchall()
+        return [key for (key,) in rows]
+
+    #----------
+    def get_fetched_at(self,file_path:str,key:str) -> float | None:
+        namespace,_ = self.get_location(file_path)
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT updated FROM entries WHERE namespace=? AND key=?",(namespace,key)).fetchone()
+        return datetime.fromisoformat(row[0]).timestamp() if row else None
+
+    #----------
+    def get_shard_sizes(self,dir_path:str) -> dict[str,tuple[int,int]]:
+        namespace = os.path.relpath(os.path.abspath(dir_path),self.root).replace(os.sep,"/")
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT shard,COUNT(*),SUM(LENGTH(key) + LENGTH(value)) FROM entries WHERE namespace=? GROUP BY shard"
+                ,(namespace,)).fetchall()
+        return {os.path.join(dir_path,shard):(records,size) for shard,records,size in rows}
+
+    #----------
+    def count_keys(self,dir_path:str) -> int:
+        namespace = os.path.relpath(os.path.abspath(dir_path),self.root).replace(os.sep,"/")
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COUNT(*) FROM entries WHERE namespace=?",(namespace,)).fetchone()[0]
+
+    #----------
+    def get_stats(self) -> dict:
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT namespace,COUNT(*),SUM(LENGTH(value)) FROM entries GROUP BY namespace").fetchall()
+        return {"backend":"sqlite","namespaces":{ns:{"entries":n,"bytes":b} for ns,n,b in rows}}
+
+    #----------
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+    #----------
+    def __transaction(self):
+        """Context manager running the statements inside it as one transaction"""
+        return _SqliteTransaction(self.__connection)
+
+
+#==========
+class _SqliteTransaction:
+    """BEGIN ... COMMIT (or ROLLBACK on error) for a connection in autocommit mode"""
+    def __init__(self,connection:sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self,exc_type,exc,traceback):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+#==========
+def migrate_files_to_backend(root:str,target:CacheBackend,skip_dirs:tuple[str]=("sync",)) -> dict:
+    """
+    Copies every cache file below 'root' (the existing gameData/ layout, in any shard format) into
+    another backend, one bulk transaction per directory. Files are left in place.
+    Returns {namespace dir: records}.
+    """
+    source = FileShardBackend()
+    migrated = {}
+    for dir_path,dir_names,file_names in os.walk(root):
+        dir_names[:] = [name for name in dir_names if name not in skip_dirs and not name.startswith(".")]
+        shards = {}
+        for name in file_names:
+            shard_name = strip_shard_extension(name)
+            if not shard_name or name.startswith("."):
+                continue
+            file_path = os.path.join(dir_path,shard_name + ".json")
+            shards[file_path] = source.load_file(os.path.join(dir_path,name))
+        if shards:
+            target.bulk_upsert(shards)
+            migrated[os.path.relpath(dir_path,root)] = sum(len(data) for data in shards.values())
+    return migrated
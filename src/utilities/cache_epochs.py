@@ -0,0 +1,141 @@
+"""
+Reset epochs of the cache. The server wipes the game universe on every reset, so cached data is only
+valid for the reset it was fetched in. Every reset (identified by its date) gets its own cache
+directory, '{cache path}epochs/{reset date}/', and the file '{cache path}CURRENT' names the one in use.
+Switching to a new reset only re-writes that pointer - directories of earlier resets are moved out of
+the way and deleted in the background.
+"""
+
+#==========
+import os
+import re
+import shutil
+from uuid import uuid4
+from threading import Lock,Thread
+from .cache_backends import write_file_atomic,DirectoryLock
+
+
+#==========
+class CacheEpochs:
+    """
+    The epoch directories below one cache path. Directories to delete are first renamed into
+    'epochs/.trash/' (instant, and they are never read again), then removed by a background thread.
+    Removal interrupted by the end of the process is picked up by the next one.
+    """
+    #----------
+    pointer_name = "CURRENT"
+    trash_name = ".trash"
+
+    #----------
+    def __init__(self,cache_path:str):
+        self.cache_path = cache_path if cache_path.endswith("/") else cache_path + "/"
+        self.epochs_path = self.cache_path + "epochs/"
+        self.pointer_path = self.cache_path + self.pointer_name
+        self.trash_path = self.epochs_path + self.trash_name + "/"
+        self.__cleanup:Thread | None = None
+        self.__lock = Lock()
+        self.__stats = {"switches":0,"adopted":0,"retired":0,"removed":0}
+
+    #----------
+    def get_current(self) -> str | None:
+        """The epoch in use (as last switched to - no API call), or None before the first switch"""
+        try:
+            with open(self.pointer_path,"r") as file:
+                return file.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    #----------
+    def get_epoch_path(self,epoch:str) -> str:
+        return f"{self.epochs_path}{epoch}/"
+
+    #----------
+    def switch(self,epoch:str,since:float | None = None) -> bool:
+        """
+        Makes 'epoch' (a reset date) the current one. Returns False if it already was.
+        On the first switch, cache data of the layout from before epochs (directly in the cache path)
+        is moved into the new epoch if it was written since the reset ('since', epoch seconds) -
+        anything older is from an earlier universe and is retired instead.
+        """
+        if not re.fullmatch(r"[\w.-]+",epoch) or epoch.startswith("."):
+            raise ValueError(f"Invalid cache epoch '{epoch}'")
+        #Locked, so processes starting at the same time don't both adopt the old layout:
+        with DirectoryLock(self.cache_path):
+            current = self.get_current()
+            if current == epoch:
+                return False
+            os.makedirs(self.get_epoch_path(epoch),exist_ok=True)
+            if current is None:
+                self.__adopt_legacy(epoch,since)
+            write_file_atomic(self.pointer_path,epoch.encode("utf-8"))
+        with self.__lock:
+            self.__stats["switches"] += 1
+        return True
+
+    #----------
+    def __adopt_legacy(self,epoch:str,since:float | None) -> None:
+        epoch_path = self.get_epoch_path(epoch)
+        for name in os.listdir(self.cache_path):
+            if name in ("epochs",self.pointer_name) or name.startswith("."):
+                continue
+            path = self.cache_path + name
+            if (since is None or os.stat(path).st_mtime >= since) and not os.path.exists(epoch_path + name):
+                os.rename(path,epoch_path + name)
+                self.__count("adopted")
+            else:
+                self.__retire(path)
+
+    #----------
+    def __retire(self,path:str) -> None:
+        """Moves a file or directory into the trash, to be deleted in the background"""
+        os.makedirs(self.trash_path,exist_ok=True)
+        os.rename(path,f"{self.trash_path}{os.path.basename(path.rstrip('/'))}-{uuid4().hex[0:8]}")
+        self.__count("retired")
+
+    #----------
+    def __count(self,stat:str,num:int=1) -> None:
+        with self.__lock:
+            self.__stats[stat] += num
+
+    #----------
+    def remove_stale(self,wait:bool=False) -> int:
+        """
+        Retires the directories of all epochs but the current one, and starts deleting the trash in
+        a background thread ('wait' for it to finish). Returns the number of directories retired.
+        """
+        current = self.get_current()
+        retired = 0
+        if os.path.isdir(self.epochs_path):
+            with DirectoryLock(self.cache_path):
+                for name in os.listdir(self.epochs_path):
+                    if name != current and not name.startswith(".") and os.path.isdir(self.epochs_path + name):
+                        self.__retire(self.epochs_path + name)
+                        retired += 1
+        with self.__lock:
+            if os.path.isdir(self.trash_path) and (self.__cleanup is None or not self.__cleanup.is_alive()):
+                self.__cleanup = Thread(target=self.__empty_trash,name="cache-epoch-cleanup",daemon=True)
+                self.__cleanup.start()
+            cleanup = self.__cleanup
+        if wait and cleanup is not None:
+            cleanup.join()
+        return retired
+
+    #----------
+    def __empty_trash(self) -> None:
+        for name in os.listdir(self.trash_path):
+            path = self.trash_path + name
+            #Another process may be deleting the same trash:
+            if os.path.isdir(path):
+                shutil.rmtree(path,ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.__count("removed")
+
+    #----------
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return {"current":self.get_current(),**self.__stats
+                    ,"cleaning_up":self.__cleanup is not None and self.__cleanup.is_alive()}
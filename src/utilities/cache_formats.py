@@ -0,0 +1,186 @@
+"""
+Serialization formats for cache shard files. 'json' is the original, human-readable format; the
+binary formats need the optional 'msgpack' (and 'zstandard') packages.
+"""
+
+#==========
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+#==========
+class ShardFormat:
+    """
+    Encodes / decodes the records of one shard. 'extension' replaces '.json' in shard file names.
+    'Indexable' formats encode every record as a separate, contiguous byte range of the file, so a
+    single record can be decoded from its (offset, length) without parsing the rest of the file.
+    """
+    #----------
+    name:str
+    extension:str
+    indexable:bool = True
+
+    #----------
+    def dumps(self,data:dict) -> bytes:
+        return self.dumps_indexed(data)[0]
+
+    #----------
+    def dumps_indexed(self,data:dict) -> tuple[bytes,dict[str,tuple[int,int]] | None]:
+        """Encoded shard, plus {key: (offset, length)} of every record (None if not indexable)"""
+        raise NotImplementedError
+
+    #----------
+    def loads(self,raw:bytes) -> dict:
+        raise NotImplementedError
+
+    #----------
+    def loads_record(self,raw:bytes) -> dict:
+        """Decodes one record from its byte range in an indexable shard"""
+        raise NotImplementedError
+
+
+#==========
+class JsonFormat(ShardFormat):
+    """Pretty-printed JSON (indent=3), exactly as written by write_dict_to_file"""
+    name = "json"
+    extension = ".json"
+
+    #Pieces around records, giving the same output as json.dumps(data,indent=3):
+    opening = b"{\n   "
+    separator = b",\n   "
+    closing = b"\n}"
+    colon = b": "
+
+    #----------
+    def dump_record(self,record) -> bytes:
+        return json.dumps(record,indent=3).replace("\n","\n   ").encode("utf-8")
+
+    #----------
+    def dumps_indexed(self,data:dict) -> tuple[bytes,dict[str,tuple[int,int]]]:
+        if not data:
+            return (b"{}",{})
+        pieces = [self.opening]
+        offset = len(self.opening)
+        index = {}
+        for num,(key,record) in enumerate(data.items()):
+            if num:
+                pieces.append(self.separator)
+                offset += len(self.separator)
+            prefix = json.dumps(key).encode("utf-8") + self.colon
+            encoded = self.dump_record(record)
+            pieces.extend((prefix,encoded))
+            index[key] = (offset + len(prefix),len(encoded))
+            offset += len(prefix) + len(encoded)
+        pieces.append(self.closing)
+        return (b"".join(pieces),index)
+
+    #----------
+    def loads(self,raw:bytes) -> dict:
+        return json.loads(raw) if raw else {}
+
+    #----------
+    def loads_record(self,raw:bytes) -> dict:
+        return json.loads(raw)
+
+
+#==========
+class CompactJsonFormat(JsonFormat):
+    """JSON without whitespace - still readable by any JSON tool, but much smaller"""
+    name = "json-compact"
+    opening = b"{"
+    separator = b","
+    closing = b"}"
+    colon = b":"
+
+    #----------
+    def dump_record(self,record) -> bytes:
+        return json.dumps(record,separators=(",",":")).encode("utf-8")
+
+
+#==========
+class MsgpackFormat(ShardFormat):
+    """msgpack, optionally compressed with zstd (level 1-22)"""
+    #----------
+    def __init__(self,compression_level:int|None=None):
+        if msgpack is None:
+            raise ImportError("The 'msgpack' cache format needs the msgpack package: 'pip install msgpack'")
+        if compression_level is not None and zstandard is None:
+            raise ImportError("The 'msgpack+zstd' cache format needs the zstandard package: 'pip install zstandard'")
+        self.compression_level = compression_level
+        self.name = "msgpack" if compression_level is None else "msgpack+zstd"
+        self.extension = ".msgpack" if compression_level is None else ".msgpack.zst"
+        #Offsets into a compressed file are meaningless:
+        self.indexable = compression_level is None
+
+    #----------
+    def dumps_indexed(self,data:dict) -> tuple[bytes,dict[str,tuple[int,int]] | None]:
+        if self.compression_level is not None:
+            raw = msgpack.packb(data,use_bin_type=True)
+            return (zstandard.ZstdCompressor(level=self.compression_level).compress(raw),None)
+        #A map header followed by key/value pairs is the same as packing the whole dict:
+        pieces = [msgpack.Packer().pack_map_header(len(data))]
+        offset = len(pieces[0])
+        index = {}
+        for key,record in data.items():
+            packed_key = msgpack.packb(key,use_bin_type=True)
+            packed_record = msgpack.packb(record,use_bin_type=True)
+            pieces.extend((packed_key,packed_record))
+            index[key] = (offset + len(packed_key),len(packed_record))
+            offset += len(packed_key) + len(packed_record)
+        return (b"".join(pieces),index)
+
+    #----------
+    def loads(self,raw:bytes) -> dict:
+        if not raw:
+            return {}
+        if self.compression_level is not None:
+            raw = zstandard.ZstdDecompressor().decompress(raw)
+        return msgpack.unpackb(raw,raw=False,strict_map_key=False)
+
+    #----------
+    def loads_record(self,raw:bytes) -> dict:
+        return msgpack.unpackb(raw,raw=False,strict_map_key=False)
+
+
+#==========
+#File extensions of all shard formats:
+shard_extensions = (".msgpack.zst",".msgpack",".json")
+
+#----------
+def get_shard_format(name:str) -> ShardFormat:
+    """Format by its name in gameinfo.yaml: 'json', 'json-compact', 'msgpack' or 'msgpack+zstd'"""
+    if name == "json":
+        return JsonFormat()
+    if name == "json-compact":
+        return CompactJsonFormat()
+    if name == "msgpack":
+        return MsgpackFormat()
+    if name == "msgpack+zstd":
+        return MsgpackFormat(compression_level=3)
+    raise ValueError(f"Unknown cache format '{name}'")
+
+#----------
+def get_format_for_file(file_path:str) -> ShardFormat:
+    """Format of an existing shard file, by its extension"""
+    if file_path.endswith(".msgpack.zst"):
+        return MsgpackFormat(compression_level=3)
+    if file_path.endswith(".msgpack"):
+        return MsgpackFormat()
+    return JsonFormat()
+
+#----------
+def strip_shard_extension(file_name:str) -> str | None:
+    """File name without its format extension - or None if it isn't a shard file"""
+    for extension in shard_extensions:
+        if file_name.endswith(extension):
+            return file_name[:-len(extension)]
+    return None
@@ -0,0 +1,78 @@
+"""
+Sharding strategies for the cache: which shard (file) of a cache directory a record's key goes to.
+"""
+
+#==========
+from zlib import crc32
+
+
+#==========
+class ShardingStrategy:
+    """Maps a record key to the name of its shard (without extension)"""
+    #----------
+    name:str
+
+    #----------
+    def get_shard_name(self,key:str) -> str:
+        raise NotImplementedError
+
+    #----------
+    def get_config(self) -> dict:
+        raise NotImplementedError
+
+
+#==========
+class PrefixSharding(ShardingStrategy):
+    """
+    The original scheme: the first characters of the key (e.g., 'X1-A' for 'X1-AB12').
+    Simple, but almost all systems start with 'X1-', so a few shards end up holding the galaxy.
+    """
+    name = "prefix"
+
+    #----------
+    def __init__(self,length:int=4):
+        self.length = length
+
+    #----------
+    def get_shard_name(self,key:str) -> str:
+        return key[0:self.length]
+
+    #----------
+    def get_config(self) -> dict:
+        return {"strategy":self.name,"length":self.length}
+
+
+#==========
+class HashSharding(ShardingStrategy):
+    """
+    Spreads keys evenly over a fixed number of buckets, using a hash that is stable across runs
+    and machines (CRC32 - Python's hash() is randomised per process).
+    """
+    name = "hash"
+
+    #----------
+    def __init__(self,buckets:int=64):
+        if buckets < 1:
+            raise ValueError("Hash sharding needs at least 1 bucket")
+        self.buckets = buckets
+        self.__width = len(str(buckets - 1))
+
+    #----------
+    def get_shard_name(self,key:str) -> str:
+        return f"{crc32(key.encode('utf-8')) % self.buckets:0{self.__width}d}"
+
+    #----------
+    def get_config(self) -> dict:
+        return {"strategy":self.name,"buckets":self.buckets}
+
+
+#==========
+def get_sharding_strategy(config:dict | None) -> ShardingStrategy:
+    """Strategy from the 'cache: sharding' config, e.g. {strategy: hash, buckets: 64}"""
+    config = dict(config or {})
+    name = config.pop("strategy","prefix")
+    if name == "prefix":
+        return PrefixSharding(**config)
+    if name == "hash":
+        return HashSharding(**config)
+    raise ValueError(f"Unknown sharding strategy '{name}'")
@@ -1,5 +1,693 @@
-from .basic_utilities import *
-from typing import Callable
+import os
+import json
+import atexit
+import logging
+from time import monotonic,time
+from copy import deepcopy
+from queue import Queue
+from functools import partial
+from threading import Lock,Thread
+from typing import Callable,Iterable
+from contextlib import contextmanager,nullcontext
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+from .cache_backends import (CacheBackend,FileShardBackend,DirectoryLock
+    ,get_namespace,write_file_atomic)
+from .cache_sharding import ShardingStrategy,PrefixSharding
+
+#==========
+#Storage backend shared by all endpoint classes (JSON shard files unless configured otherwise):
+cache_backend:CacheBackend = FileShardBackend()
+cache_backend_lock = Lock()
+
+#----------
+def get_cache_backend() -> CacheBackend:
+    return cache_backend
+
+#----------
+def set_cache_backend(backend:CacheBackend) -> CacheBackend:
+    """Replace the cache backend. The previous backend is closed and returned."""
+    global cache_backend
+    with cache_backend_lock:
+        previous,cache_backend = cache_backend,backend
+    if previous is not backend:
+        previous.close()
+    return previous
+
+#==========
+class CacheWriteBatch:
+    """
+    Write-behind buffer for bulk cache loads. Updates are collected per shard and written with one
+    upsert per shard when the buffer is flushed - instead of one shard rewrite per record.
+    A flush happens once 'max_records' records are buffered or the oldest buffered record is older
+    than 'max_seconds' (checked whenever records are added), and when the batch is closed.
+    """
+    #----------
+    def __init__(self,max_records:int=500,max_seconds:float=5.0):
+        self.max_records = max_records
+        self.max_seconds = max_seconds
+        self.__buffers:dict[str,dict] = {}
+        self.__pending = 0
+        self.__oldest:float | None = None
+        self.__lock = Lock()
+        self.__stats = {"records":0,"flushes":0,"shard_writes":0,"bytes":0}
+
+    #----------
+    @property
+    def pending_records(self) -> int:
+        return self.__pending
+
+    #----------
+    def add(self,data:dict,file_path:str) -> None:
+        with self.__lock:
+            buffer = self.__buffers.setdefault(file_path,{})
+            new_keys = sum(1 for key in data if key not in buffer)
+            buffer.update(deepcopy(data))
+            self.__pending += new_keys
+            if self.__oldest is None:
+                self.__oldest = monotonic()
+        self.flush_if_due()
+
+    #----------
+    def get(self,file_path:str,key:str) -> dict | None:
+        """A copy of a buffered (not yet written) record - or None"""
+        with self.__lock:
+            buffer = self.__buffers.get(file_path)
+            if buffer and key in buffer:
+                return deepcopy(buffer[key])
+        return None
+
+    #----------
+    def get_buffered(self,file_path:str) -> dict:
+        with self.__lock:
+            return dict(self.__buffers.get(file_path,{}))
+
+    #----------
+    def flush_if_due(self) -> bool:
+        """Flushes if the buffer is full or too old. Returns whether a flush happened."""
+        with self.__lock:
+            due = self.__pending >= self.max_records or (
+                self.__oldest is not None and monotonic() - self.__oldest >= self.max_seconds)
+        if due:
+            self.flush()
+        return due
+
+    #----------
+    def flush(self) -> None:
+        """Writes all buffered records, one write per shard"""
+        with self.__lock:
+            buffers,self.__buffers = self.__buffers,{}
+            pending,self.__pending = self.__pending,0
+            self.__oldest = None
+        if not buffers:
+            return
+        written = cache_backend.bulk_upsert(buffers)
+        cache_quotas.record_writes(buffers)
+        with self.__lock:
+            self.__stats["records"] += pending
+            self.__stats["flushes"] += 1
+            self.__stats["shard_writes"] += len(buffers)
+            self.__stats["bytes"] += written
+
+    #----------
+    def get_stats(self) -> dict:
+        """Records, flushes, shard writes and bytes written so far"""
+        with self.__lock:
+            return dict(self.__stats)
+
+
+#Batch that update_cache_dict currently writes to (if any):
+active_write_batch:ContextVar[CacheWriteBatch | None] = ContextVar("active_write_batch",default=None)
+
+#----------
+@contextmanager
+def batched_cache_writes(max_records:int=500,max_seconds:float=5.0):
+    """
+    Buffers all update_cache_dict calls inside the 'with' block in a CacheWriteBatch, which is
+    flushed on exit (also on errors - the buffered data itself is valid). Record and file reads
+    inside the block see buffered records. Nested blocks share the outer batch.
+    Usage: 'with batched_cache_writes() as batch: ...'
+    """
+    batch = active_write_batch.get()
+    if batch is not None:
+        yield batch
+        return
+    batch = CacheWriteBatch(max_records,max_seconds)
+    token = active_write_batch.set(batch)
+    try:
+        yield batch
+    finally:
+        active_write_batch.reset(token)
+        batch.flush()
+
+#==========
+#How records of sharded cache directories (systems, markets) are spread over files:
+cache_sharding:ShardingStrategy = PrefixSharding()
+
+#----------
+def get_cache_sharding() -> ShardingStrategy:
+    return cache_sharding
+
+#----------
+def set_cache_sharding(strategy:ShardingStrategy) -> None:
+    """NOTE: Records already cached under another strategy are only found again after re-sharding
+    (see reshard_cache_dir)"""
+    global cache_sharding
+    cache_sharding = strategy
+
+#----------
+def get_shard_path(dir_path:str,key:str) -> str:
+    """Path of the shard in a cache directory that holds the record with the given key"""
+    return dir_path + cache_sharding.get_shard_name(key) + ".json"
+
+#----------
+def reshard_cache_dir(dir_path:str,strategy:ShardingStrategy|None=None
+                      ,shard_key:Callable[[str],str]|None=None) -> dict:
+    """
+    Re-distributes all records in a cache directory over shards of the given (default: current)
+    strategy. 'shard_key' maps a record's key to the key its shard is chosen by, for directories
+    whose records aren't sharded by their own key (e.g. markets: waypoint -> system).
+    New shards are written before old ones are deleted, so an interruption can leave
+    duplicates but never loses records. Returns {"records","shards_before","shards_after"}.
+    """
+    strategy = strategy or cache_sharding
+    shard_key = shard_key or (lambda key: key)
+    old_paths = cache_backend.list_shards(dir_path)
+    new_shards:dict[str,dict] = {}
+    for file_path in old_paths:
+        for key,record in read_cache_file(file_path).items():
+            new_path = dir_path + strategy.get_shard_name(shard_key(key)) + ".json"
+            new_shards.setdefault(new_path,{})[key] = record
+    for file_path,data in new_shards.items():
+        cache_backend.write_shard(file_path,data)
+    for file_path in old_paths:
+        if file_path not in new_shards:
+            cache_backend.delete_shard(file_path)
+    return {"records":sum(len(data) for data in new_shards.values())
+            ,"shards_before":len(old_paths),"shards_after":len(new_shards)}
+
+#----------
+def get_shard_load_report(dir_path:str) -> dict:
+    """Records and bytes per shard of a cache directory, plus a summary of how evenly they're spread
+    ('skew' is the largest shard's records relative to the mean)"""
+    sizes = cache_backend.get_shard_sizes(dir_path)
+    records = [size[0] for size in sizes.values()]
+    mean = sum(records) / len(records) if records else 0
+    return {
+        "shards":{file_path:{"records":size[0],"bytes":size[1]} for file_path,size in sizes.items()}
+        ,"summary":{
+            "shards":len(sizes)
+            ,"records":sum(records)
+            ,"bytes":sum(size[1] for size in sizes.values())
+            ,"min_records":min(records,default=0)
+            ,"max_records":max(records,default=0)
+            ,"mean_records":round(mean,1)
+            ,"skew":round(max(records) / mean,2) if mean else 0.0
+        }
+    }
+
+#==========
+class TtlPolicy:
+    """
+    How long cached records of each namespace stay fresh ('cache: ttl' in gameinfo.yaml), e.g.
+    {markets: 300, systems: reset, factions: null}:
+    - seconds: stale that long after being fetched
+    - 'reset': fresh until the next server reset (needs 'reset_time' - otherwise never stale)
+    - null / not listed: never stale
+    """
+    #----------
+    def __init__(self,root:str|None=None,ttls:dict|None=None):
+        self.root = root
+        self.ttls = dict(ttls or {})
+        #Start of the current server reset (epoch seconds), once known:
+        self.reset_time:float | None = None
+
+    #----------
+    def is_stale(self,file_path:str,fetched_at:float|None) -> bool:
+        if not self.ttls or self.root is None or fetched_at is None:
+            return False
+        ttl = self.ttls.get(get_namespace(self.root,file_path))
+        if ttl is None:
+            return False
+        if ttl == "reset":
+            return self.reset_time is not None and fetched_at < self.reset_time
+        return time() - fetched_at > ttl
+
+
+#----------
+ttl_policy = TtlPolicy()
+
+#----------
+def get_ttl_policy() -> TtlPolicy:
+    return ttl_policy
+
+#----------
+def set_ttl_policy(policy:TtlPolicy) -> None:
+    global ttl_policy
+    ttl_policy = policy
+
+#----------
+def is_record_stale(file_path:str,key:str) -> bool:
+    """Whether a cached record is older than its namespace's TTL. Records still buffered in a
+    write batch were just fetched, so they are fresh."""
+    batch = active_write_batch.get()
+    if batch and batch.get(file_path,key) is not None:
+        return False
+    return ttl_policy.is_stale(file_path,cache_backend.get_fetched_at(file_path,key))
+
+
+#==========
+class CacheRefresher:
+    """
+    Re-fetches stale records in the background (stale-while-revalidate): the stale record is
+    returned right away, and a refresh is queued here. A single daemon thread works through the
+    queue; a record already queued is not queued again.
+    'context_factory' returns the context manager refreshes run in (set by the client, so refreshes
+    are sent at background priority).
+    """
+    #----------
+    def __init__(self):
+        self.context_factory:Callable = nullcontext
+        self.__queue = Queue()
+        self.__queued:set[tuple[str,str]] = set()
+        self.__thread:Thread | None = None
+        self.__lock = Lock()
+        self.__stats = {"queued":0,"refreshed":0,"failed":0,"duplicates":0}
+
+    #----------
+    def submit(self,file_path:str,key:str,fetch:Callable) -> bool:
+        """Queues 'fetch' (returning {key:record}) to refresh a record.
+        Returns False if a refresh of the record is already queued."""
+        with self.__lock:
+            if (file_path,key) in self.__queued:
+                self.__stats["duplicates"] += 1
+                return False
+            self.__queued.add((file_path,key))
+            self.__stats["queued"] += 1
+            if self.__thread is None or not self.__thread.is_alive():
+                self.__thread = Thread(target=self.__work,name="cache-refresher",daemon=True)
+                self.__thread.start()
+        self.__queue.put((file_path,key,fetch))
+        return True
+
+    #----------
+    def __work(self) -> None:
+        while True:
+            file_path,key,fetch = self.__queue.get()
+            try:
+                with self.context_factory():
+                    data = fetch()
+                if data:
+                    update_cache_dict(data,file_path)
+                with self.__lock:
+                    self.__stats["refreshed"] += 1
+            except Exception as e:
+                logging.warning(f"Refreshing cached record '{key}' failed: {e}")
+                with self.__lock:
+                    self.__stats["failed"] += 1
+            finally:
+                with self.__lock:
+                    self.__queued.discard((file_path,key))
+                self.__queue.task_done()
+
+    #----------
+    def wait(self) -> None:
+        """Blocks until all queued refreshes are done"""
+        self.__queue.join()
+
+    #----------
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return {**self.__stats,"pending":len(self.__queued)}
+
+
+#Refreshes stale records for all endpoint classes:
+cache_refresher = CacheRefresher()
+
+
+#==========
+class NegativeCache:
+    """
+    Remembers GET requests that legitimately returned nothing - e.g., the market of a waypoint that
+    has no market - so they aren't sent again for 'ttl' seconds. Only endpoints whose last path
+    segment is listed in 'endpoints' (e.g., 'market', 'shipyard', 'jump-gate') are cached, and only
+    'not found'-type answers (400/404, or an empty 'data'), never throttling or server errors.
+    Entries are keyed by symbol and endpoint (e.g., 'X1-AB12-3C:market') and stored in the cache
+    directory 'dir_path', so they survive restarts. Disabled while 'dir_path' is None.
+    """
+    #----------
+    statuses = (400,404)
+
+    #----------
+    def __init__(self,dir_path:str|None=None,ttl:float=3600,endpoints:list[str]|None=None):
+        self.dir_path = dir_path
+        self.ttl = ttl
+        self.endpoints = list(endpoints or [])
+        self.__lock = Lock()
+        self.__stats:dict[str,dict] = {}
+
+    #----------
+    def get_key(self,method:str,url:str) -> str | None:
+        """Cache key of a request - None if the request isn't negatively cached"""
+        if self.dir_path is None or method.upper() != "GET":
+            return None
+        segments = urlsplit(url).path.rstrip("/").split("/")
+        if len(segments) < 2 or segments[-1] not in self.endpoints:
+            return None
+        return f"{segments[-2]}:{segments[-1]}"
+
+    #----------
+    def get(self,method:str,url:str) -> dict | None:
+        """The stored (empty) response for a request, if it was negatively cached and hasn't expired"""
+        key = self.get_key(method,url)
+        if key is None:
+            return None
+        file_path = get_shard_path(self.dir_path,key)
+        cached = get_cached_record(file_path,key)
+        if cached is None:
+            return None
+        endpoint = key.split(":")[-1]
+        fetched_at = cache_backend.get_fetched_at(file_path,key)
+        if fetched_at is None or time() - fetched_at > self.ttl:
+            self.__count(endpoint,"expired")
+            return None
+        self.__count(endpoint,"avoided")
+        return cached[key]["response"]
+
+    #----------
+    def put(self,method:str,url:str,response:dict) -> bool:
+        """Stores a response if it is a 'nothing here' answer for a cached endpoint"""
+        key = self.get_key(method,url)
+        if key is None:
+            return False
+        status = response.get("http_status")
+        empty = status == 200 and not response.get("http_data",{}).get("data")
+        if status not in self.statuses and not empty:
+            return False
+        update_cache_dict({key:{"response":response}},get_shard_path(self.dir_path,key))
+        self.__count(key.split(":")[-1],"stored")
+        return True
+
+    #----------
+    def __count(self,endpoint:str,counter:str) -> None:
+        with self.__lock:
+            counts = self.__stats.setdefault(endpoint,{"stored":0,"avoided":0,"expired":0})
+            counts[counter] += 1
+
+    #----------
+    def get_stats(self) -> dict[str,dict]:
+        """Per endpoint: negative results stored, requests avoided by them, and expired entries"""
+        with self.__lock:
+            return deepcopy(self.__stats)
+
+
+#----------
+negative_cache = NegativeCache()
+
+#----------
+def get_negative_cache() -> NegativeCache:
+    return negative_cache
+
+#----------
+def set_negative_cache(cache:NegativeCache) -> None:
+    global negative_cache
+    negative_cache = cache
+
+#==========
+class CacheQuotas:
+    """
+    Per-namespace disk quotas ('cache: quotas' in gameinfo.yaml), e.g.
+    {markets: {max_mb: 100, policy: lru}, systems: {max_mb: 500, policy: lfu}}.
+    The cache layer records every read and write of a shard: when it was last used and how often.
+    After writes, a namespace over its quota has whole shards evicted - least recently used ('lru')
+    or least frequently used ('lfu') first - until it is back under 'low_watermark' of the quota.
+    Quotas are checked at most every 'check_seconds' per namespace.
+    Access metadata and hit/miss/eviction counts are saved to '{root}/.access' whenever a namespace is
+    checked, merged with those of other processes sharing the cache. Hits and misses are counted for
+    every namespace, access metadata only for namespaces with a quota.
+    """
+    #----------
+    policies = ("lru","lfu")
+    low_watermark = 0.9
+
+    #----------
+    def __init__(self,root:str|None=None,quotas:dict|None=None,check_seconds:float=30.0):
+        self.root = os.path.abspath(root) if root else None
+        self.quotas:dict[str,dict] = {}
+        for namespace,quota in (quotas or {}).items():
+            policy = quota.get("policy","lru")
+            if policy not in self.policies:
+                raise ValueError(f"Unknown eviction policy '{policy}' for cache namespace '{namespace}'")
+            self.quotas[namespace] = {"max_bytes":int(quota["max_mb"] * 1024 * 1024),"policy":policy}
+        self.check_seconds = check_seconds
+        #{shard path relative to root: [last access (epoch seconds), accesses]}, as last saved/loaded:
+        self.__access:dict[str,list] | None = None
+        self.__stats:dict[str,dict] = {}
+        #Changes not saved yet:
+        self.__pending_access:dict[str,list] = {}
+        self.__pending_stats:dict[str,dict] = {}
+        self.__evicted:set[str] = set()
+        self.__last_check:dict[str,float] = {}
+        self.__lock = Lock()
+
+    #----------
+    def get_access_path(self) -> str:
+        return os.path.join(self.root,".access")
+
+    #----------
+    def __get_shard(self,file_path:str) -> tuple[str,str] | None:
+        """(namespace, shard path relative to root) - None for files outside the root"""
+        if self.root is None:
+            return None
+        shard = os.path.relpath(os.path.abspath(file_path),self.root)
+        if shard.startswith(".."):
+            return None
+        return (get_namespace(self.root,file_path),shard)
+
+    #----------
+    def record_read(self,file_path:str,hit:bool) -> None:
+        located = self.__get_shard(file_path)
+        if located is None:
+            return
+        namespace,shard = located
+        with self.__lock:
+            self.__count(namespace,"hits" if hit else "misses")
+            if hit and namespace in self.quotas:
+                self.__touch(shard)
+
+    #----------
+    def record_writes(self,file_paths:Iterable[str]) -> None:
+        """Records shards that were just written, and enforces the quotas of their namespaces"""
+        namespaces = {}
+        with self.__lock:
+            for file_path in file_paths:
+                located = self.__get_shard(file_path)
+                if located and located[0] in self.quotas:
+                    self.__touch(located[1])
+                    namespaces.setdefault(located[0],set()).add(file_path)
+        for namespace,written in namespaces.items():
+            if monotonic() - self.__last_check.get(namespace,float("-inf")) >= self.check_seconds:
+                self.enforce(namespace,keep=written)
+
+    #----------
+    def __touch(self,shard:str) -> None:
+        pending = self.__pending_access.setdefault(shard,[0.0,0])
+        pending[0] = time()
+        pending[1] += 1
+
+    #----------
+    def __count(self,namespace:str,counter:str,num:int=1) -> None:
+        pending = self.__pending_stats.setdefault(namespace,{})
+        pending[counter] = pending.get(counter,0) + num
+
+    #----------
+    def enforce(self,namespace:str,keep:Iterable[str]=()) -> list[str]:
+        """
+        Evicts shards of a namespace until it is within its quota, never evicting the shards in
+        'keep' (e.g., the ones just written). Returns the evicted shard paths.
+        """
+        self.__last_check[namespace] = monotonic()
+        quota = self.quotas.get(namespace)
+        if quota is None:
+            return []
+        dir_path = os.path.join(self.root,namespace) + "/"
+        sizes = cache_backend.get_shard_sizes(dir_path)
+        total = sum(size[1] for size in sizes.values())
+        evicted = []
+        if total > quota["max_bytes"]:
+            access = self.get_access()
+            keep = {os.path.abspath(file_path) for file_path in keep}
+            candidates = [file_path for file_path in sizes if os.path.abspath(file_path) not in keep]
+            candidates.sort(key=lambda file_path: self.__get_rank(access,file_path,quota["policy"]))
+            for file_path in candidates:
+                if total <= quota["max_bytes"] * self.low_watermark:
+                    break
+                cache_backend.delete_shard(file_path)
+                total -= sizes[file_path][1]
+                evicted.append(file_path)
+                with self.__lock:
+                    self.__count(namespace,"evictions")
+                    self.__count(namespace,"evicted_bytes",sizes[file_path][1])
+                    shard = self.__get_shard(file_path)[1]
+                    self.__pending_access.pop(shard,None)
+                    self.__evicted.add(shard)
+            if evicted:
+                logging.info(f"Cache quota of '{namespace}': evicted {len(evicted)} shards")
+        self.save()
+        return evicted
+
+    #----------
+    def __get_rank(self,access:dict[str,list],file_path:str,policy:str) -> tuple:
+        """Sort key of a shard - shards that sort first are evicted first"""
+        last_access,accesses = access.get(self.__get_shard(file_path)[1],(0.0,0))
+        return (last_access,accesses,file_path) if policy == "lru" else (accesses,last_access,file_path)
+
+    #----------
+    def get_access(self) -> dict[str,list]:
+        """Access metadata of all shards: {shard path relative to root: [last access, accesses]}"""
+        with self.__lock:
+            if self.__access is None:
+                self.__access,self.__stats = self.__load()
+            access = {shard:list(entry) for shard,entry in self.__access.items()}
+            for shard,(last_access,accesses) in self.__pending_access.items():
+                entry = access.setdefault(shard,[0.0,0])
+                entry[0] = max(entry[0],last_access)
+                entry[1] += accesses
+            return access
+
+    #----------
+    def __load(self) -> tuple[dict,dict]:
+        try:
+            with open(self.get_access_path(),"rb") as file:
+                saved = json.loads(file.read())
+            return (saved["shards"],saved["stats"])
+        except (FileNotFoundError,ValueError,KeyError):
+            return ({},{})
+
+    #----------
+    def save(self) -> None:
+        """Merges access metadata and counts since the last save into '{root}/.access'"""
+        if self.root is None or not os.path.isdir(self.root):
+            return
+        with self.__lock:
+            pending_access,self.__pending_access = self.__pending_access,{}
+            pending_stats,self.__pending_stats = self.__pending_stats,{}
+            evicted,self.__evicted = self.__evicted,set()
+        if not pending_access and not pending_stats:
+            return
+        with DirectoryLock(self.root):
+            access,stats = self.__load()
+            for shard,(last_access,accesses) in pending_access.items():
+                entry = access.setdefault(shard,[0.0,0])
+                entry[0] = max(entry[0],last_access)
+                entry[1] += accesses
+            for namespace,counts in pending_stats.items():
+                saved = stats.setdefault(namespace,{})
+                for counter,num in counts.items():
+                    saved[counter] = saved.get(counter,0) + num
+            #Evicted shards that haven't been used again since don't need metadata:
+            for shard in evicted - set(pending_access):
+                access.pop(shard,None)
+            raw = json.dumps({"shards":access,"stats":stats}).encode("utf-8")
+            #Metadata only - not worth flushing to disk:
+            write_file_atomic(self.get_access_path(),raw,durable=False)
+        with self.__lock:
+            self.__access,self.__stats = access,stats
+
+    #----------
+    def get_stats(self) -> dict[str,dict]:
+        """Per namespace: hits, misses, hit rate, evictions and bytes evicted - as saved by all
+        processes, plus this process's counts not saved yet"""
+        self.get_access()
+        with self.__lock:
+            stats = deepcopy(self.__stats)
+            for namespace,counts in self.__pending_stats.items():
+                saved = stats.setdefault(namespace,{})
+                for counter,num in counts.items():
+                    saved[counter] = saved.get(counter,0) + num
+        for counts in stats.values():
+            for counter in ("hits","misses","evictions","evicted_bytes"):
+                counts.setdefault(counter,0)
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / lookups,3) if lookups else None
+        return stats
+
+
+#----------
+cache_quotas = CacheQuotas()
+
+#----------
+def get_cache_quotas() -> CacheQuotas:
+    return cache_quotas
+
+#----------
+def set_cache_quotas(quotas:CacheQuotas) -> None:
+    """Replaces the quotas - saving what the previous ones recorded"""
+    global cache_quotas
+    previous,cache_quotas = cache_quotas,quotas
+    if previous is not quotas:
+        previous.save()
+
+#----------
+@atexit.register
+def save_cache_quotas() -> None:
+    """Saves access metadata and counts not saved yet (also run automatically when the process exits)"""
+    cache_quotas.save()
+
+#----------
+def get_cache_namespace_report(root:str) -> dict[str,dict]:
+    """
+    Per namespace (cache directory below 'root'): shards, records and bytes stored, its quota,
+    hit rate and eviction counts (see CacheQuotas.get_stats)
+    """
+    root = os.path.abspath(root)
+    stats = cache_quotas.get_stats() if cache_quotas.root == root else {}
+    namespaces = set(stats) | set(cache_quotas.quotas)
+    if os.path.isdir(root):
+        namespaces |= {name for name in os.listdir(root)
+                       if not name.startswith(".") and name != "sync" and os.path.isdir(os.path.join(root,name))}
+    report = {}
+    for namespace in sorted(namespaces):
+        sizes = cache_backend.get_shard_sizes(os.path.join(root,namespace) + "/")
+        quota = cache_quotas.quotas.get(namespace) if cache_quotas.root == root else None
+        report[namespace] = {
+            "shards":len(sizes)
+            ,"records":sum(size[0] for size in sizes.values())
+            ,"bytes":sum(size[1] for size in sizes.values())
+            ,"quota":quota
+            ,**stats.get(namespace,{"hits":0,"misses":0,"hit_rate":None,"evictions":0,"evicted_bytes":0})
+        }
+    return report
+
+#----------
+def read_cache_file(file_path:str) -> dict:
+    """Returns all records of a cache file (shard), including records buffered by a write batch.
+    The records are a copy - the backend's in-memory cache isn't changed by modifying them."""
+    data = cache_backend.read_shard(file_path)
+    batch = active_write_batch.get()
+    buffered = batch.get_buffered(file_path) if batch else None
+    cache_quotas.record_read(file_path,hit=bool(data or buffered))
+    return deepcopy({**data,**buffered} if buffered else data)
+
+#----------
+def write_cache_file(file_path:str,data:dict) -> None:
+    """Replaces all records of a cache file (shard) with the given data"""
+    cache_backend.write_shard(file_path,data)
+    cache_quotas.record_writes([file_path])
+
+#----------
+def list_cache_files(dir_path:str) -> list[str]:
+    """File paths of all cache files (shards) in a cache directory"""
+    return cache_backend.list_shards(dir_path)
+
+#----------
+def get_cached_keys(file_path:str) -> list[str]:
+    return cache_backend.get_keys(file_path)
+
+#----------
+def count_cached_keys(dir_path:str) -> int:
+    """Counts records across all cache files (shards) in a cache directory"""
+    return cache_backend.count_keys(dir_path)
 
 #----------
 def dict_cache_wrapper(file_path,key):
@@ -9,28 +697,48 @@ def dict_cache_wrapper(file_path,key):
     found, the user_function is called and the data returned is used to update the cache.
     Note that updating the cache is kept as a separate function to allow force-updating the cache
     by calling this update function directly.
+    A record older than its namespace's TTL is still returned immediately, but a refresh through
+    the user_function is queued in the background (see CacheRefresher).
     """
     def decorator(user_function):
         def wrapper(*args, **kwargs):
-            existing_data = attempt_dict_retrieval(file_path)
-            if key in existing_data:
-                #Wrapping result in new dict to be consistent with result of user_function:
-                return {key:existing_data[key]}
-            else:
-                data = user_function(*args,**kwargs)
+            cached = get_cached_record(file_path,key)
+            if cached is not None:
+                if is_record_stale(file_path,key):
+                    cache_refresher.submit(file_path,key,partial(user_function,*args,**kwargs))
+                return cached
+            data = user_function(*args,**kwargs)
+            if data:
                 update_cache_dict(data,file_path)
-                return data
+            return data
+
         return wrapper
     return decorator
 
 #----------
-def update_cache_dict(data:dict,file_path:str) -> dict:
+def get_cached_record(file_path:str,key:str) -> dict | None:
+    """Returns {key:record} if the key exists in the cache file - otherwise None"""
+    batch = active_write_batch.get()
+    record = batch.get(file_path,key) if batch else None
+    if record is None:
+        record = cache_backend.get(file_path,key)
+    cache_quotas.record_read(file_path,hit=record is not None)
+    if record is not None:
+        #Wrapping result in new dict to be consistent with result of user_function:
+        return {key:record}
+    return None
+
+#----------
+def update_cache_dict(data:dict,file_path:str) -> None:
     """
-    This function updates a local cache file with a given dictionary. If the file exists,
-    we load the file data, update it with the given data, and re-write it. If the file
-    doesn't exist, we make a new file with the provided data as the sole entry.
-    Works specifically with dictionary data & .JSON files, but could be adapted for other formats.
+    This function updates a local cache file with a given dictionary: records with the same keys
+    are replaced, new keys are added. If the file doesn't exist yet, it is created.
+    How the records are actually stored (JSON files, SQLite) is up to the cache backend.
+    Inside 'batched_cache_writes', the update is buffered instead of written immediately.
     """
-    existing_data = attempt_dict_retrieval(file_path)
-    existing_data.update(data)
-    write_dict_to_file(file_path,existing_data)
\ No newline at end of file
+    batch = active_write_batch.get()
+    if batch is not None:
+        batch.add(data,file_path)
+    else:
+        cache_backend.upsert(file_path,data)
+        cache_quotas.record_writes([file_path])
@@ -6,7 +6,12 @@
 #-Kevin, May 11, 2023
 
 
+import atexit
+import ctypes
+import ctypes.util
 import secrets
+from typing import Callable
+from threading import Lock
 from base64 import urlsafe_b64encode as b64e, urlsafe_b64decode as b64d
 
 from cryptography.fernet import *
@@ -26,6 +31,50 @@ def _derive_key(password: bytes, salt: bytes, iterations: int = iterations) -> b
         iterations=iterations, backend=backend)
     return b64e(kdf.derive(password))
 
+#Deriving a key takes 100k PBKDF2 rounds, so decrypted messages (the API keys) are kept in memory for
+#the lifetime of the process: {token: message}. Nothing derived from the password is kept - a cached
+#message is found by its token alone, and a wrong password is caught by Fernet (InvalidToken) when a
+#token is decrypted for the first time.
+_key_cache: dict[bytes,bytearray] = {}
+_key_cache_lock = Lock()
+_libc = ctypes.CDLL(ctypes.util.find_library("c"),use_errno=True) if ctypes.util.find_library("c") else None
+
+def _lock_memory(buffer: bytearray) -> bool:
+    """Best effort: ask the OS not to swap the buffer to disk (mlock). Returns True if successful."""
+    if _libc is None or not hasattr(_libc,"mlock"):
+        return False
+    address = ctypes.addressof((ctypes.c_char * len(buffer)).from_buffer(buffer))
+    return _libc.mlock(ctypes.c_void_p(address),ctypes.c_size_t(len(buffer))) == 0
+
+def _unlock_memory(buffer: bytearray) -> None:
+    if _libc is None or not hasattr(_libc,"munlock"):
+        return
+    address = ctypes.addressof((ctypes.c_char * len(buffer)).from_buffer(buffer))
+    _libc.munlock(ctypes.c_void_p(address),ctypes.c_size_t(len(buffer)))
+
+def password_decrypt_cached(token: bytes, get_password: Callable[[], str]) -> bytes:
+    """Same as password_decrypt, but re-uses the result of an earlier decryption of the same token in
+    this process. 'get_password' is only called if the token wasn't decrypted yet."""
+    with _key_cache_lock:
+        cached = _key_cache.get(token)
+        if cached is not None:
+            return bytes(cached)
+    message = password_decrypt(token, get_password())
+    buffer = bytearray(message)
+    _lock_memory(buffer)
+    with _key_cache_lock:
+        _key_cache[token] = buffer
+    return message
+
+@atexit.register
+def clear_key_cache() -> None:
+    """Overwrite and forget all cached messages (also run automatically when the process exits)"""
+    with _key_cache_lock:
+        for buffer in _key_cache.values():
+            buffer[:] = bytes(len(buffer))
+            _unlock_memory(buffer)
+        _key_cache.clear()
+
 def password_encrypt(message: bytes, password: str, iterations: int = iterations) -> bytes:
     salt = secrets.token_bytes(16)
     key = _derive_key(password.encode(), salt, iterations)
@@ -49,6 +49,13 @@ class NavSpeed(Enum):
     CRUISE = 3
     BURN = 4
 
+#==========
+class RequestPriority(Enum):
+    '''Priority classes for API requests when the rate limit is contended. Lower values go first.'''
+    INTERACTIVE = 1 #A player is waiting at the terminal
+    SHIP_ACTION = 2 #Automated ship operations (e.g., scripted mining loops)
+    BACKGROUND = 3 #Bulk cache refreshes and syncs
+
 #==========
 class SpaceTraderResp(TypedDict):
     '''Responses from the SpaceTrader API are transformed into this standard dictionary upon retrieval
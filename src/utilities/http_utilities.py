@@ -0,0 +1,487 @@
+"""
+HTTP utilities portable across applications: pooled keep-alive sessions, connection statistics,
+client-side rate limiting and priority scheduling, retrying of throttled / failed requests and
+coalescing of identical in-flight requests.
+"""
+
+#==========
+import re
+import heapq
+import random
+from copy import deepcopy
+from itertools import count
+from time import monotonic, sleep
+from threading import Lock, Event, Condition
+from typing import Any, Callable, Hashable
+from urllib.parse import urlsplit
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+
+
+#==========
+class SessionManager:
+    """
+    Owns a single requests.Session whose connection pools are shared by every caller.
+    Re-using the session means TCP + TLS handshakes are only paid when a pooled connection
+    is not available (i.e., the first request to a host, or when all pooled connections are busy).
+    """
+    #----------
+    session:Session
+    adapter:HTTPAdapter
+    keep_alive:bool
+
+    #----------
+    def __init__(self,pool_connections:int=4,pool_maxsize:int=10,pool_block:bool=False
+                 ,keep_alive:bool=True,timeout:float|None=30):
+        """
+        pool_connections: number of hosts to keep connection pools for.
+        pool_maxsize: maximum number of connections kept alive per host.
+        pool_block: if True, wait for a free connection instead of opening extra (non-pooled) ones.
+        keep_alive: if False, connections are closed after each request (useful for debugging).
+        timeout: default timeout (seconds) for each request, unless the caller provides one.
+        """
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.adapter = HTTPAdapter(pool_connections=pool_connections
+                                   ,pool_maxsize=pool_maxsize
+                                   ,pool_block=pool_block)
+        self.session = Session()
+        self.session.mount("https://",self.adapter)
+        self.session.mount("http://",self.adapter)
+        if not keep_alive:
+            self.session.headers.update({"Connection":"close"})
+        self.__lock = Lock()
+        self.__requests_sent = 0
+        self.__retired_connections = 0
+        self.__retired_requests = 0
+
+    #----------
+    def request(self,method:str,url:str,**kwargs) -> Response:
+        """Send a request through the pooled session"""
+        kwargs.setdefault("timeout",self.timeout)
+        with self.__lock:
+            self.__requests_sent += 1
+        return self.session.request(method=method,url=url,**kwargs)
+
+    #----------
+    def get_stats(self) -> dict:
+        """
+        Reports how well pooled connections are being re-used.
+        'connections_opened' counts new TCP connections; every other request re-used an open one.
+        """
+        opened = self.__retired_connections
+        pooled_requests = self.__retired_requests
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            pooled_requests += pool.num_requests
+        reused = max(pooled_requests - opened,0)
+        return {
+            "requests_sent":self.__requests_sent
+            ,"connections_opened":opened
+            ,"connections_reused":reused
+            ,"reuse_ratio":round(reused / pooled_requests,3) if pooled_requests else 0.0
+        }
+
+    #----------
+    def close(self) -> None:
+        """Close all pooled connections. The session can still be used afterwards."""
+        stats = self.get_stats()
+        with self.__lock:
+            self.__retired_connections = stats["connections_opened"]
+            self.__retired_requests = stats["connections_opened"] + stats["connections_reused"]
+        self.session.close()
+
+
+#==========
+class TokenBucket:
+    """
+    Classic token bucket: tokens refill continuously at 'rate' per second up to 'capacity'.
+    Not thread-safe by itself - RateLimiter guards access with its own lock.
+    """
+    #----------
+    rate:float
+    capacity:float
+    tokens:float
+
+    #----------
+    def __init__(self,rate:float,capacity:float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.__last_refill = monotonic()
+
+    #----------
+    def refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.__last_refill) * self.rate)
+        self.__last_refill = now
+
+    #----------
+    def try_take(self,tokens:float=1) -> bool:
+        self.refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    #----------
+    def seconds_until_available(self,tokens:float=1) -> float:
+        self.refill()
+        missing = tokens - self.tokens
+        return max(missing / self.rate, 0.0) if self.rate > 0 else float("inf")
+
+    #----------
+    def drain(self) -> None:
+        """Empty the bucket (e.g., after the server has told us we are over the limit)"""
+        self.refill()
+        self.tokens = 0
+
+
+#==========
+class RateLimiter:
+    """
+    Models a server rate limit made of a steady rate plus a separate burst pool:
+    requests first draw from the steady bucket, and only draw from the burst pool once the steady
+    bucket is empty. acquire() blocks exactly as long as needed for one of them to have a token.
+    """
+    #----------
+    def __init__(self,rate:float=2,burst:float=10,burst_seconds:float=10):
+        """
+        rate: steady requests per second.
+        burst: size of the burst pool, which refills completely over 'burst_seconds'.
+        """
+        self.steady = TokenBucket(rate=rate,capacity=max(rate,1))
+        self.burst = TokenBucket(rate=burst / burst_seconds,capacity=burst)
+        self.__lock = Lock()
+        self.__waited_seconds = 0.0
+        self.__acquired = 0
+
+    #----------
+    def try_acquire(self) -> bool:
+        """Take a token without waiting. Returns False if the budget is currently spent."""
+        with self.__lock:
+            if self.steady.try_take() or self.burst.try_take():
+                self.__acquired += 1
+                return True
+            return False
+
+    #----------
+    def acquire(self) -> float:
+        """Block until a request may be sent. Returns the number of seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.__lock:
+                if self.steady.try_take() or self.burst.try_take():
+                    self.__acquired += 1
+                    self.__waited_seconds += waited
+                    return waited
+                delay = min(self.steady.seconds_until_available(),self.burst.seconds_until_available())
+            sleep(delay)
+            waited += delay
+
+    #----------
+    def seconds_until_available(self) -> float:
+        """How long until the next token is available (0 if one is available now)"""
+        with self.__lock:
+            return min(self.steady.seconds_until_available(),self.burst.seconds_until_available())
+
+    #----------
+    def drain(self) -> None:
+        """Spend all remaining budget, e.g. after the server rejected a request as rate-limited"""
+        with self.__lock:
+            self.steady.drain()
+            self.burst.drain()
+
+    #----------
+    def get_budget(self) -> dict:
+        """How much request budget is left right now, and how long callers have waited for it"""
+        with self.__lock:
+            self.steady.refill()
+            self.burst.refill()
+            return {
+                "steady_remaining":round(self.steady.tokens,2)
+                ,"burst_remaining":round(self.burst.tokens,2)
+                ,"requests_acquired":self.__acquired
+                ,"seconds_waited":round(self.__waited_seconds,3)
+            }
+
+
+#==========
+class PriorityScheduler:
+    """
+    Queue in front of a RateLimiter which hands out rate-limit tokens by priority class
+    (lower number = served first) instead of first-come-first-served. Within a class, callers are
+    served round-robin by 'owner' (e.g., a ship), so one busy owner cannot starve the others.
+    """
+    #Longest time (s) a caller behind the head of the queue waits before checking again:
+    max_idle_wait:float = 1.0
+
+    #----------
+    def __init__(self,limiter:RateLimiter):
+        self.limiter = limiter
+        self.__condition = Condition()
+        self.__queue:list[tuple] = []
+        self.__sequence = count()
+        self.__class_round:dict[int,int] = {}
+        self.__owner_next_turn:dict[tuple,int] = {}
+        self.__stats:dict[int,dict] = {}
+
+    #----------
+    def acquire(self,priority:int,owner:Hashable=None) -> float:
+        """Block until this caller may send a request. Returns the number of seconds waited."""
+        enqueued = monotonic()
+        with self.__condition:
+            stats = self.__get_class_stats(priority)
+            class_round = self.__class_round.get(priority,0)
+            turn = max(self.__owner_next_turn.get((priority,owner),0),class_round)
+            self.__owner_next_turn[(priority,owner)] = turn + 1
+            ticket = (priority,turn,next(self.__sequence))
+            heapq.heappush(self.__queue,ticket)
+            stats["queue_depth"] += 1
+            stats["max_queue_depth"] = max(stats["max_queue_depth"],stats["queue_depth"])
+
+            try:
+                while True:
+                    if self.__queue[0] is ticket and self.limiter.try_acquire():
+                        heapq.heappop(self.__queue)
+                        self.__class_round[priority] = turn
+                        waited = monotonic() - enqueued
+                        stats["queue_depth"] -= 1
+                        stats["served"] += 1
+                        stats["total_wait"] += waited
+                        stats["max_wait"] = max(stats["max_wait"],waited)
+                        #Let the next caller in line check for a token:
+                        self.__condition.notify_all()
+                        return waited
+                    if self.__queue[0] is ticket:
+                        self.__condition.wait(timeout=self.limiter.seconds_until_available())
+                    else:
+                        #(A timeout, so a waiter is never stuck on a missed notification)
+                        self.__condition.wait(timeout=self.max_idle_wait)
+            except BaseException:
+                #Interrupted (e.g., KeyboardInterrupt) - a ticket left in the queue would block everyone behind it:
+                if ticket in self.__queue:
+                    self.__queue.remove(ticket)
+                    heapq.heapify(self.__queue)
+                    stats["queue_depth"] -= 1
+                self.__condition.notify_all()
+                raise
+
+    #----------
+    def __get_class_stats(self,priority:int) -> dict:
+        return self.__stats.setdefault(priority,{"queue_depth":0,"max_queue_depth":0,"served":0
+                                                 ,"total_wait":0.0,"max_wait":0.0})
+
+    #----------
+    def get_stats(self) -> dict[int,dict]:
+        """Per priority class: current and max queue depth, requests served, mean and max wait (s)"""
+        with self.__condition:
+            report = {}
+            for priority,stats in sorted(self.__stats.items()):
+                served = stats["served"]
+                report[priority] = {
+                    "queue_depth":stats["queue_depth"]
+                    ,"max_queue_depth":stats["max_queue_depth"]
+                    ,"served":served
+                    ,"mean_wait":round(stats["total_wait"] / served,3) if served else 0.0
+                    ,"max_wait":round(stats["max_wait"],3)
+                }
+            return report
+
+
+#==========
+class RetryPolicy:
+    """
+    Decides whether a failed request should be sent again, and how long to wait before doing so.
+    - Rate-limited responses (429) are always safe to retry: the server rejected them unprocessed.
+    - Server errors and connection failures are only retried for idempotent requests (GET, PUT, etc.)
+      or for POST / PATCH endpoints listed in 'safe_post_suffixes' (e.g., orbit/dock, or the PATCH
+      setting a ship's flight mode - repeating them is harmless).
+    Waits use the server's hint (Retry-After, rate-limit reset) if given, otherwise capped
+    exponential backoff with full jitter.
+    """
+    #----------
+    retry_statuses:set[int] = {429,500,502,503,504}
+    idempotent_methods:set[str] = {"GET","HEAD","OPTIONS","PUT","DELETE"}
+    #Not idempotent in general - only retried for endpoints known to be safe:
+    opt_in_methods:set[str] = {"POST","PATCH"}
+
+    #----------
+    def __init__(self,max_retries:int=3,backoff_base:float=0.5,backoff_max:float=10
+                 ,max_wait:float=60,safe_post_suffixes:list[str]|None=None):
+        """
+        max_retries: maximum number of re-sends per request.
+        backoff_base / backoff_max: bounds (seconds) for jittered exponential backoff.
+        max_wait: upper bound (seconds) on any single wait, even if the server asks for longer.
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+        self.safe_post_suffixes = tuple(safe_post_suffixes or [])
+        self.__lock = Lock()
+        self.__stats = {"retries":0,"retries_by_status":{},"seconds_waited":0.0,"gave_up":0}
+
+    #----------
+    def is_safe_to_repeat(self,method:str,url:str) -> bool:
+        method = method.upper()
+        if method in self.idempotent_methods:
+            return True
+        path = url.split("?")[0].rstrip("/")
+        return method in self.opt_in_methods and path.endswith(self.safe_post_suffixes)
+
+    #----------
+    def should_retry(self,method:str,url:str,status:int|None,attempt:int) -> bool:
+        """status=None means the request failed before any response (connection error/timeout)"""
+        if status is not None and status not in self.retry_statuses:
+            return False
+        if attempt >= self.max_retries:
+            with self.__lock:
+                self.__stats["gave_up"] += 1
+            return False
+        return status == 429 or self.is_safe_to_repeat(method,url)
+
+    #----------
+    def get_delay(self,attempt:int,response:Response|None=None) -> float:
+        """Seconds to wait before attempt number 'attempt + 1'"""
+        hint = self.get_server_hint(response) if response is not None else None
+        if hint is not None:
+            #Small jitter on top of the hint so that parallel callers don't all retry at once:
+            return min(hint + random.uniform(0,self.backoff_base),self.max_wait)
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(0,ceiling)
+
+    #----------
+    def get_server_hint(self,response:Response) -> float | None:
+        """Read how long the server wants us to wait: Retry-After header, 'retryAfter' in the error
+        body, or the rate-limit reset time if no budget remains."""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return max(float(retry_after),0.0)
+            except ValueError:
+                try:
+                    retry_date = parsedate_to_datetime(retry_after)
+                    return max((retry_date - datetime.now(timezone.utc)).total_seconds(),0.0)
+                except (TypeError,ValueError):
+                    pass
+        try:
+            return max(float(response.json()["error"]["data"]["retryAfter"]),0.0)
+        except Exception:
+            pass
+        if response.headers.get("x-ratelimit-remaining") == "0":
+            reset = response.headers.get("x-ratelimit-reset")
+            try:
+                reset_time = datetime.fromisoformat(reset.replace("Z","+00:00"))
+                return max((reset_time - datetime.now(timezone.utc)).total_seconds(),0.0)
+            except (AttributeError,ValueError):
+                pass
+        return None
+
+    #----------
+    def record_retry(self,status:int|None,delay:float) -> None:
+        with self.__lock:
+            self.__stats["retries"] += 1
+            self.__stats["seconds_waited"] += delay
+            key = str(status) if status is not None else "connection_error"
+            by_status = self.__stats["retries_by_status"]
+            by_status[key] = by_status.get(key,0) + 1
+
+    #----------
+    def get_stats(self) -> dict:
+        """Retry metrics: number of retries (total and by status), time spent waiting, give-ups"""
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["retries_by_status"] = dict(self.__stats["retries_by_status"])
+            stats["seconds_waited"] = round(stats["seconds_waited"],3)
+            return stats
+
+
+#==========
+def get_endpoint_label(url:str) -> str:
+    """Generalizes a URL into an endpoint label for metrics, replacing IDs and symbols (anything
+    containing a digit) with '{id}'. E.g., '/v2/systems/X1-AB12/market' -> '/v2/systems/{id}/market'"""
+    path = urlsplit(url).path
+    return "/".join("{id}" if re.search(r"\d",segment) and segment != "v2" else segment
+                    for segment in path.split("/"))
+
+
+#==========
+class RequestCoalescer:
+    """
+    'Singleflight' for identical requests: while a request for a given key is in flight, other callers
+    asking for the same key wait for it and share its result instead of sending their own.
+    Only use this for requests without side effects (i.e., GETs).
+    Callers commonly modify returned data, so the result is copied once before it is shared (the
+    leader keeps the original), and every follower receives its own deep copy of that.
+    """
+    #----------
+    class Flight:
+        """One in-flight request and its eventual outcome"""
+        def __init__(self):
+            self.done = Event()
+            self.result = None
+            self.error = None
+            self.followers = 0
+
+    #----------
+    def __init__(self):
+        self.__lock = Lock()
+        self.__in_flight:dict[Hashable,RequestCoalescer.Flight] = {}
+        self.__stats:dict[str,dict] = {}
+
+    #----------
+    def run(self,key:Hashable,endpoint:str,func:Callable[[],Any]) -> Any:
+        """Return func() - or the result of an identical call (same key) that is already running"""
+        with self.__lock:
+            stats = self.__stats.setdefault(endpoint,{"requests":0,"coalesced":0})
+            stats["requests"] += 1
+            flight = self.__in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self.Flight()
+                self.__in_flight[key] = flight
+            else:
+                flight.followers += 1
+                stats["coalesced"] += 1
+
+        if not is_leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return deepcopy(flight.result)
+
+        try:
+            result = func()
+        except BaseException as e:
+            with self.__lock:
+                del self.__in_flight[key]
+            flight.error = e
+            flight.done.set()
+            raise
+        with self.__lock:
+            #No followers can join once the flight is removed:
+            del self.__in_flight[key]
+            followers = flight.followers
+        try:
+            #Published before the leader's caller can modify the result:
+            flight.result = deepcopy(result) if followers else None
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            flight.done.set()
+        return result
+
+    #----------
+    def get_stats(self) -> dict[str,dict]:
+        """Per-endpoint counts of requests made and how many of them were served by another's request"""
+        with self.__lock:
+            return {endpoint:dict(stats) for endpoint,stats in self.__stats.items()}
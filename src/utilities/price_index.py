@@ -0,0 +1,219 @@
+"""
+Resident index of the best known prices per commodity, persisted as the price chart
+('price_chart.json' in the cache - same format as before, see PriceObj in custom_types).
+Market refreshes update the index in memory; the chart is written back in batches instead of being
+read and re-written for every market.
+"""
+
+#==========
+import heapq
+import atexit
+from time import monotonic
+from threading import Lock
+from .custom_types import PriceObj,PriceRecord
+from .cache_utilities import read_cache_file,write_cache_file
+
+
+#==========
+class PriceHeap:
+    """
+    The 'depth' best prices of one commodity on one side (buying or selling), as a heap with the
+    worst kept price on top - so a new price is checked in O(1) and replaces the worst in O(log k).
+    'low_best': lower prices are better (purchase prices).
+    """
+    #----------
+    def __init__(self,depth:int,low_best:bool):
+        self.depth = depth
+        self.low_best = low_best
+        #(rank, waypoint) - rank is the price, negated if low prices are best, so the worst is the minimum:
+        self.__heap:list[tuple[int,str]] = []
+        self.__prices:PriceRecord = {}
+
+    #----------
+    def __rank(self,price:int) -> int:
+        return -price if self.low_best else price
+
+    #----------
+    def add(self,waypoint:str,price:int) -> bool:
+        """Records a price of a waypoint. Returns False if it isn't among the best 'depth' prices."""
+        if waypoint in self.__prices:
+            #A market already listed updates its price - rare enough to simply re-heapify the few entries:
+            self.__prices[waypoint] = price
+            self.__heap = [(self.__rank(wp_price),wp) for wp,wp_price in self.__prices.items()]
+            heapq.heapify(self.__heap)
+            return True
+        entry = (self.__rank(price),waypoint)
+        if len(self.__heap) < self.depth:
+            heapq.heappush(self.__heap,entry)
+        elif self.__heap and entry > self.__heap[0]:
+            _,dropped = heapq.heapreplace(self.__heap,entry)
+            del self.__prices[dropped]
+        else:
+            return False
+        self.__prices[waypoint] = price
+        return True
+
+    #----------
+    def get_best(self) -> PriceRecord:
+        """{waypoint: price} of the best price ({} if there is none)"""
+        if not self.__heap:
+            return {}
+        _,waypoint = max(self.__heap)
+        return {waypoint:self.__prices[waypoint]}
+
+    #----------
+    def get_prices(self) -> PriceRecord:
+        """All kept prices, best first"""
+        return {waypoint:self.__prices[waypoint] for _,waypoint in sorted(self.__heap,reverse=True)}
+
+
+#==========
+class PriceIndex:
+    """
+    Best purchase and sell prices of every commodity, kept in memory for one price chart file.
+    Changes are written to the chart at most every 'flush_seconds' (checked on updates), on flush()
+    and when the process exits. If another process wrote the chart in the meantime, the index
+    re-loads it and re-applies its own pending market updates before writing - so refreshes from
+    several processes are merged, as they were when every refresh read the file.
+    """
+    #----------
+    def __init__(self,file_path:str,depth:int=3,flush_seconds:float=30.0):
+        if depth < 1:
+            raise ValueError(f"Price chart depth must be at least 1, not {depth}")
+        self.file_path = file_path
+        self.depth = depth
+        self.flush_seconds = flush_seconds
+        self.__lock = Lock()
+        self.__commodities:dict[str,tuple[PriceHeap,PriceHeap]] | None = None
+        #Chart as last read / written, to notice writes by other processes:
+        self.__chart:dict | None = None
+        #Market updates not yet written, to replay onto a chart changed by another process:
+        self.__pending:list[tuple[str,list[dict]]] = []
+        #Cleared, so the next flush replaces the chart instead of merging with it:
+        self.__cleared = False
+        self.__last_flush = monotonic()
+        self.__stats = {"updates":0,"flushes":0,"merges":0}
+
+    #----------
+    def __load(self) -> None:
+        """Builds the index from the chart (once - the index is the chart's state from then on)"""
+        if self.__commodities is not None:
+            return
+        self.__commodities = {}
+        self.__chart = read_cache_file(self.file_path)
+        for sym,price_obj in self.__chart.items():
+            buy,sell = self.__get_heaps(sym)
+            for waypoint,price in price_obj.get("purchase_prices",{}).items():
+                buy.add(waypoint,price)
+            for waypoint,price in price_obj.get("sell_prices",{}).items():
+                sell.add(waypoint,price)
+
+    #----------
+    def __get_heaps(self,sym:str) -> tuple[PriceHeap,PriceHeap]:
+        if sym not in self.__commodities:
+            self.__commodities[sym] = (PriceHeap(self.depth,low_best=True),PriceHeap(self.depth,low_best=False))
+        return self.__commodities[sym]
+
+    #----------
+    def __apply(self,waypoint:str,trade_goods:list[dict]) -> None:
+        for item in trade_goods:
+            buy,sell = self.__get_heaps(item["symbol"])
+            buy.add(waypoint,item["purchasePrice"])
+            sell.add(waypoint,item["sellPrice"])
+
+    #----------
+    def update_market(self,waypoint:str,trade_goods:list[dict]) -> None:
+        """Adds the prices of a market's trade goods ('tradeGoods' of the market data)"""
+        with self.__lock:
+            self.__load()
+            self.__apply(waypoint,trade_goods)
+            self.__pending.append((waypoint,trade_goods))
+            self.__stats["updates"] += 1
+            due = monotonic() - self.__last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    #----------
+    def flush(self) -> bool:
+        """Writes pending changes to the price chart. Returns False if there were none."""
+        with self.__lock:
+            if not (self.__pending or self.__cleared):
+                return False
+            if not self.__cleared and read_cache_file(self.file_path) != self.__chart:
+                #Someone else wrote the chart - rebuilding from it, plus what only this process knows:
+                pending = self.__pending
+                self.__commodities = None
+                self.__load()
+                for waypoint,trade_goods in pending:
+                    self.__apply(waypoint,trade_goods)
+                self.__stats["merges"] += 1
+            chart = self.__to_chart()
+            write_cache_file(self.file_path,chart)
+            self.__chart = chart
+            self.__pending = []
+            self.__cleared = False
+            self.__last_flush = monotonic()
+            self.__stats["flushes"] += 1
+            return True
+
+    #----------
+    def clear(self) -> None:
+        """Forgets all prices - the next flush writes an empty chart, plus what was added since"""
+        with self.__lock:
+            self.__load()
+            self.__commodities = {}
+            self.__pending = []
+            self.__cleared = True
+
+    #----------
+    def __to_chart(self) -> dict[str,PriceObj]:
+        return {sym:{"purchase_prices":buy.get_prices(),"sell_prices":sell.get_prices()}
+                for sym,(buy,sell) in self.__commodities.items()}
+
+    #----------
+    def get_commodities(self) -> list[str]:
+        with self.__lock:
+            self.__load()
+            return list(self.__commodities)
+
+    #----------
+    def get_best_prices(self,sym:str) -> tuple[PriceRecord,PriceRecord]:
+        """{waypoint: price} of the best purchase and the best sell price of a commodity.
+        Raises KeyError for a commodity not in the index."""
+        with self.__lock:
+            self.__load()
+            buy,sell = self.__commodities[sym]
+            return buy.get_best(),sell.get_best()
+
+    #----------
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return {**self.__stats,"pending":len(self.__pending)
+                    ,"commodities":len(self.__commodities) if self.__commodities is not None else None}
+
+
+#==========
+#One index per price chart, shared by all Markets instances (and ships) of the process:
+price_indexes:dict[str,PriceIndex] = {}
+price_indexes_lock = Lock()
+
+#----------
+def get_price_index(file_path:str,depth:int=3,flush_seconds:float=30.0) -> PriceIndex:
+    """The index of a price chart. A changed depth replaces the index (pending changes are written first)."""
+    with price_indexes_lock:
+        index = price_indexes.get(file_path)
+        if index is None or index.depth != depth:
+            if index is not None:
+                index.flush()
+            index = price_indexes[file_path] = PriceIndex(file_path,depth,flush_seconds)
+        index.flush_seconds = flush_seconds
+        return index
+
+#----------
+@atexit.register
+def flush_price_indexes() -> None:
+    """Writes pending changes of all price indexes (also run automatically when the process exits)"""
+    with price_indexes_lock:
+        indexes = list(price_indexes.values())
+    for index in indexes:
+        index.flush()
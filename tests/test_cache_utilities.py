@@ -0,0 +1,759 @@
+"""
+Code for testing the generic caching utilities
+"""
+
+#==========
+import os
+import json
+import sqlite3
+import tempfile
+import unittest
+import multiprocessing
+from itertools import count
+from unittest import mock
+from time import time
+from src.utilities import cache_formats,cache_backends,cache_utilities,basic_utilities
+from src.utilities.cache_utilities import *
+from src.utilities.cache_backends import SqliteBackend,ShardLRU,migrate_files_to_backend,ShardManifest,WriteJournal
+from src.utilities.cache_sharding import HashSharding,get_sharding_strategy
+from src.utilities.cache_epochs import CacheEpochs
+from src.base import SpaceTraderConnection
+
+#==========
+class TestShardLRU(unittest.TestCase):
+    """Unit testing for the in-memory cache of parsed cache files"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name,"X1-A.json")
+        self.backend = FileShardBackend()
+        set_cache_backend(self.backend)
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def test_repeated_reads_parse_once(self):
+        update_cache_dict({"X1-AB":{"symbol":"X1-AB"}},self.file_path)
+        with mock.patch.object(self.backend,"load_file") as retrieval:
+            for _ in range(3):
+                self.assertEqual(get_cached_record(self.file_path,"X1-AB"),{"X1-AB":{"symbol":"X1-AB"}})
+            retrieval.assert_not_called()
+
+    #----------
+    def test_returned_records_are_copies(self):
+        update_cache_dict({"X1-AB":{"waypoints":[1,2]}},self.file_path)
+        get_cached_record(self.file_path,"X1-AB")["X1-AB"]["waypoints"].pop()
+        self.assertEqual(get_cached_record(self.file_path,"X1-AB")["X1-AB"]["waypoints"],[1,2])
+        read_cache_file(self.file_path)["X1-AB"]["waypoints"].pop()
+        self.assertEqual(read_cache_file(self.file_path),{"X1-AB":{"waypoints":[1,2]}})
+
+    #----------
+    def test_external_change_invalidates(self):
+        update_cache_dict({"X1-AB":{"v":1}},self.file_path)
+        get_cached_record(self.file_path,"X1-AB")
+        with open(self.file_path,"w") as file:
+            file.write(json.dumps({"X1-AB":{"v":2},"X1-AC":{"v":3}}))
+        self.assertEqual(get_cached_record(self.file_path,"X1-AB"),{"X1-AB":{"v":2}})
+        self.assertGreaterEqual(self.backend.shard_cache.get_stats()["invalidations"],1)
+
+    #----------
+    def test_eviction(self):
+        lru = ShardLRU(max_entries=2)
+        lru.put("a",{"1":1,"2":2})
+        lru.put("b",{"3":3})
+        self.assertIsNone(lru.get("a"))
+        self.assertEqual(lru.get("b"),{"3":3})
+        self.assertEqual(lru.get_stats()["evictions"],1)
+
+
+#==========
+class TestSqliteBackend(unittest.TestCase):
+    """Unit testing for the SQLite cache backend and the migration from JSON files"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name + "/"
+        self.backend = SqliteBackend(self.root)
+        set_cache_backend(self.backend)
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def test_upsert_and_point_read(self):
+        file_path = self.root + "systems/X1-A.json"
+        update_cache_dict({"X1-AB":{"v":1},"X1-AC":{"v":2}},file_path)
+        update_cache_dict({"X1-AB":{"v":3}},file_path)
+        self.assertEqual(get_cached_record(file_path,"X1-AB"),{"X1-AB":{"v":3}})
+        self.assertIsNone(get_cached_record(file_path,"X1-ZZ"))
+        self.assertEqual(read_cache_file(file_path),{"X1-AB":{"v":3},"X1-AC":{"v":2}})
+        self.assertFalse(os.path.exists(file_path))
+
+    #----------
+    def test_listing_and_counting(self):
+        self.backend.bulk_upsert({self.root + "systems/X1-A.json":{"X1-AB":{},"X1-AC":{}}
+                                  ,self.root + "systems/X1-B.json":{"X1-BA":{}}
+                                  ,self.root + "price_chart.json":{"IRON":{}}})
+        self.assertEqual(count_cached_keys(self.root + "systems"),3)
+        self.assertEqual(list_cache_files(self.root + "systems")
+                         ,[self.root + "systems/X1-A.json",self.root + "systems/X1-B.json"])
+        write_cache_file(self.root + "price_chart.json",{"COPPER":{}})
+        self.assertEqual(get_cached_keys(self.root + "price_chart.json"),["COPPER"])
+
+    #----------
+    def test_write_shard_is_atomic(self):
+        file_path = self.root + "price_chart.json"
+        write_cache_file(file_path,{"IRON":{"v":1}})
+        #Failing after the old records are deleted - the delete is rolled back with it:
+        with mock.patch.object(self.backend,"_SqliteBackend__insert_rows",side_effect=sqlite3.OperationalError):
+            self.assertRaises(sqlite3.OperationalError,write_cache_file,file_path,{"COPPER":{"v":2}})
+        self.assertEqual(read_cache_file(file_path),{"IRON":{"v":1}})
+
+    #----------
+    def test_migration_from_files(self):
+        os.makedirs(self.root + "systems")
+        os.makedirs(self.root + "sync")
+        with open(self.root + "systems/X1-A.json","w") as file:
+            file.write(json.dumps({"X1-AB":{"v":1},"X1-AC":{"v":2}}))
+        with open(self.root + "sync/systems.json","w") as file:
+            file.write(json.dumps({"last_page":3}))
+        migrated = migrate_files_to_backend(self.root,self.backend)
+        self.assertEqual(migrated,{"systems":2})
+        self.assertEqual(get_cached_record(self.root + "systems/X1-A.json","X1-AC"),{"X1-AC":{"v":2}})
+
+
+#==========
+class TestCacheWriteBatch(unittest.TestCase):
+    """Unit testing for write-behind batching of cache updates"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name,"X1-A.json")
+        self.backend = FileShardBackend()
+        set_cache_backend(self.backend)
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def test_one_write_per_shard(self):
+        with mock.patch.object(cache_backends,"write_file_atomic",wraps=cache_backends.write_file_atomic) as write:
+            with batched_cache_writes() as batch:
+                for num in range(20):
+                    update_cache_dict({f"X1-A{num}":{"v":num}},self.file_path)
+                self.assertFalse(os.path.exists(self.file_path))
+            shard_writes = [call for call in write.call_args_list if call.args[0] == self.file_path]
+            self.assertEqual(len(shard_writes),1)
+        self.assertEqual(len(read_cache_file(self.file_path)),20)
+        stats = batch.get_stats()
+        self.assertEqual((stats["records"],stats["flushes"],stats["shard_writes"]),(20,1,1))
+        self.assertGreater(stats["bytes"],0)
+
+    #----------
+    def test_reads_see_buffered_records(self):
+        update_cache_dict({"X1-AA":{"v":1}},self.file_path)
+        with batched_cache_writes():
+            update_cache_dict({"X1-AB":{"v":2}},self.file_path)
+            self.assertEqual(get_cached_record(self.file_path,"X1-AB"),{"X1-AB":{"v":2}})
+            self.assertEqual(set(read_cache_file(self.file_path)),{"X1-AA","X1-AB"})
+
+    #----------
+    def test_flush_by_count(self):
+        with batched_cache_writes(max_records=5) as batch:
+            for num in range(12):
+                update_cache_dict({f"X1-A{num}":{"v":num}},self.file_path)
+            self.assertEqual(batch.get_stats()["flushes"],2)
+            self.assertEqual(batch.pending_records,2)
+        self.assertEqual(batch.get_stats()["flushes"],3)
+
+
+#==========
+class TestShardFormats(unittest.TestCase):
+    """Unit testing for per-namespace shard formats and reading legacy JSON shards"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name + "/"
+        self.file_path = self.root + "systems/X1-A.json"
+        self.records = {"X1-AB":{"symbol":"X1-AB","x":-3,"waypoints":[{"symbol":"X1-AB-1"}]}}
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def round_trip(self,format_name:str) -> str:
+        set_cache_backend(FileShardBackend(self.root,{"systems":format_name}))
+        update_cache_dict(self.records,self.file_path)
+        set_cache_backend(FileShardBackend(self.root,{"systems":format_name}))
+        self.assertEqual(read_cache_file(self.file_path),self.records)
+        self.assertEqual(list_cache_files(self.root + "systems"),[self.file_path])
+        return get_cache_backend().get_storage_path(self.file_path)
+
+    #----------
+    def test_compact_json(self):
+        self.assertEqual(self.round_trip("json-compact"),self.file_path)
+
+    #----------
+    @unittest.skipIf(cache_formats.msgpack is None or cache_formats.zstandard is None,"msgpack/zstandard not installed")
+    def test_msgpack_zstd(self):
+        self.assertEqual(self.round_trip("msgpack+zstd"),self.root + "systems/X1-A.msgpack.zst")
+
+    #----------
+    @unittest.skipIf(cache_formats.msgpack is None,"msgpack not installed")
+    def test_legacy_json_is_read_and_replaced(self):
+        update_cache_dict(self.records,self.file_path)
+        set_cache_backend(FileShardBackend(self.root,{"systems":"msgpack"}))
+        self.assertEqual(get_cached_record(self.file_path,"X1-AB"),{"X1-AB":self.records["X1-AB"]})
+        update_cache_dict({"X1-AC":{}},self.file_path)
+        self.assertFalse(os.path.exists(self.file_path))
+        self.assertEqual(set(read_cache_file(self.file_path)),{"X1-AB","X1-AC"})
+
+    #----------
+    def test_unknown_format(self):
+        self.assertRaises(ValueError,FileShardBackend,self.root,{"systems":"xml"})
+
+
+#==========
+class TestSharding(unittest.TestCase):
+    """Unit testing for sharding strategies, re-sharding and the shard load report"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = self.tmp_dir.name + "/systems/"
+        set_cache_backend(FileShardBackend(self.tmp_dir.name))
+        self.symbols = [f"X1-{chr(65 + num % 26)}{num}" for num in range(200)]
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        set_cache_sharding(PrefixSharding())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def test_hash_sharding_is_stable_and_even(self):
+        strategy = HashSharding(buckets=8)
+        self.assertEqual(strategy.get_shard_name("X1-AB12"),HashSharding(buckets=8).get_shard_name("X1-AB12"))
+        counts = {}
+        for symbol in self.symbols:
+            counts[strategy.get_shard_name(symbol)] = counts.get(strategy.get_shard_name(symbol),0) + 1
+        self.assertEqual(len(counts),8)
+        self.assertLess(max(counts.values()),2 * len(self.symbols) / 8)
+
+    #----------
+    def test_reshard_keeps_all_records(self):
+        for symbol in self.symbols:
+            update_cache_dict({symbol:{"symbol":symbol}},get_shard_path(self.dir_path,symbol))
+        self.assertEqual(len(list_cache_files(self.dir_path)),26)
+
+        set_cache_sharding(HashSharding(buckets=4))
+        result = reshard_cache_dir(self.dir_path)
+        self.assertEqual(result,{"records":200,"shards_before":26,"shards_after":4})
+        self.assertEqual(count_cached_keys(self.dir_path),200)
+        for symbol in self.symbols:
+            self.assertIsNotNone(get_cached_record(get_shard_path(self.dir_path,symbol),symbol))
+
+    #----------
+    def test_reshard_keeps_markets_sharded_by_system(self):
+        system_from_waypoint = SpaceTraderConnection.get_system_from_waypoint
+        waypoints = [f"{symbol}-{num}X" for symbol in self.symbols[0:50] for num in range(3)]
+        for waypoint in waypoints:
+            update_cache_dict({waypoint:{"symbol":waypoint}}
+                              ,get_shard_path(self.dir_path,system_from_waypoint(waypoint)))
+
+        set_cache_sharding(HashSharding(buckets=4))
+        result = reshard_cache_dir(self.dir_path,shard_key=system_from_waypoint)
+        self.assertEqual(result["records"],150)
+        for waypoint in waypoints:
+            shard_path = get_shard_path(self.dir_path,system_from_waypoint(waypoint))
+            self.assertIsNotNone(get_cached_record(shard_path,waypoint))
+
+    #----------
+    def test_load_report(self):
+        update_cache_dict({"X1-A1":{},"X1-A2":{},"X1-A3":{}},self.dir_path + "X1-A.json")
+        update_cache_dict({"X1-B1":{}},self.dir_path + "X1-B.json")
+        summary = get_shard_load_report(self.dir_path)["summary"]
+        self.assertEqual((summary["shards"],summary["records"],summary["max_records"]),(2,4,3))
+        self.assertEqual(summary["skew"],1.5)
+
+    #----------
+    def test_unknown_strategy(self):
+        self.assertRaises(ValueError,get_sharding_strategy,{"strategy":"random"})
+
+
+#==========
+class TestShardIndex(unittest.TestCase):
+    """Unit testing for reading single records through the per-shard offset index"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name + "/"
+        self.file_path = self.root + "systems/X1-A.json"
+        self.records = {f"X1-A{num}":{"symbol":f"X1-A{num}","waypoints":[num,"é"]} for num in range(50)}
+        update_cache_dict(self.records,self.file_path)
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def fresh_backend(self,**kwargs) -> FileShardBackend:
+        """A backend with nothing in memory, like a newly started client"""
+        backend = FileShardBackend(self.root,**kwargs)
+        set_cache_backend(backend)
+        return backend
+
+    #----------
+    def test_file_unchanged_by_index(self):
+        with open(self.file_path) as file:
+            self.assertEqual(file.read(),json.dumps(self.records,indent=3))
+
+    #----------
+    def test_point_read_without_parsing_shard(self):
+        for kwargs in ({},{"mmap_namespaces":["systems"]}):
+            backend = self.fresh_backend(**kwargs)
+            with mock.patch.object(backend,"load_file") as load_file:
+                self.assertEqual(get_cached_record(self.file_path,"X1-A7"),{"X1-A7":self.records["X1-A7"]})
+                self.assertIsNone(get_cached_record(self.file_path,"X1-ZZ"))
+                self.assertEqual(len(get_cached_keys(self.file_path)),50)
+                load_file.assert_not_called()
+            stats = backend.index.get_stats()
+            self.assertEqual(stats["mmap_reads" if kwargs else "indexed_reads"],1)
+
+    #----------
+    def test_stale_index_is_ignored(self):
+        with open(self.file_path,"w") as file:
+            file.write(json.dumps({"X1-A7":{"edited":True}}))
+        self.fresh_backend()
+        self.assertEqual(get_cached_record(self.file_path,"X1-A7"),{"X1-A7":{"edited":True}})
+
+    #----------
+    def test_replaced_shard_with_same_size_and_mtime(self):
+        for kwargs in ({},{"mmap_namespaces":["systems"]}):
+            update_cache_dict(self.records,self.file_path)
+            backend = self.fresh_backend(**kwargs)
+            self.assertIsNotNone(get_cached_record(self.file_path,"X1-A7"))
+            #Another process replaces the shard within the same mtime tick, with a file of the same size:
+            file_stat = os.stat(self.file_path)
+            with open(self.file_path,"rb") as file:
+                raw = file.read().replace(b"X1-A7",b"X1-B7")
+            with open(self.root + "replacement","wb") as file:
+                file.write(raw)
+            os.utime(self.root + "replacement",ns=(file_stat.st_atime_ns,file_stat.st_mtime_ns))
+            os.replace(self.root + "replacement",self.file_path)
+            backend.shard_cache.invalidate(self.file_path)
+            self.assertIsNone(get_cached_record(self.file_path,"X1-A7"))
+            self.assertEqual(get_cached_record(self.file_path,"X1-B7")["X1-B7"]["symbol"],"X1-B7")
+
+    #----------
+    @unittest.skipIf(cache_formats.msgpack is None,"msgpack not installed")
+    def test_msgpack_index(self):
+        self.fresh_backend(formats={"systems":"msgpack"}).reindex(self.root + "systems")
+        backend = self.fresh_backend(formats={"systems":"msgpack"})
+        with mock.patch.object(backend,"load_file") as load_file:
+            self.assertEqual(get_cached_record(self.file_path,"X1-A9"),{"X1-A9":self.records["X1-A9"]})
+            load_file.assert_not_called()
+
+
+#==========
+class TestShardManifest(unittest.TestCase):
+    """Unit testing for counting and listing cached records through directory manifests"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = self.tmp_dir.name + "/systems/"
+        self.backend = FileShardBackend(self.tmp_dir.name)
+        set_cache_backend(self.backend)
+        update_cache_dict({"X1-A1":{},"X1-A2":{}},self.dir_path + "X1-A.json")
+        update_cache_dict({"X1-B1":{}},self.dir_path + "X1-B.json")
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def test_count_and_keys_without_reading_shards(self):
+        backend = FileShardBackend(self.tmp_dir.name)
+        set_cache_backend(backend)
+        with mock.patch.object(backend,"load_file") as load_file, \
+             mock.patch.object(backend.index,"get") as index_get:
+            self.assertEqual(count_cached_keys(self.dir_path),3)
+            self.assertEqual(get_cached_keys(self.dir_path + "X1-A.json"),["X1-A1","X1-A2"])
+            load_file.assert_not_called()
+            index_get.assert_not_called()
+
+    #----------
+    def test_manifest_follows_writes_and_deletes(self):
+        update_cache_dict({"X1-B2":{}},self.dir_path + "X1-B.json")
+        self.assertEqual(count_cached_keys(self.dir_path),4)
+        self.backend.delete_shard(self.dir_path + "X1-A.json")
+        self.assertEqual(count_cached_keys(self.dir_path),2)
+        self.assertTrue(self.backend.check_manifest(self.dir_path)["ok"])
+
+    #----------
+    def test_check_and_repair(self):
+        with open(self.dir_path + "X1-B.json","w") as file:
+            file.write(json.dumps({"X1-B1":{},"X1-B9":{}}))
+        with open(self.dir_path + "X1-C.json","w") as file:
+            file.write(json.dumps({"X1-C1":{}}))
+        report = self.backend.check_manifest(self.dir_path,repair=True)
+        self.assertEqual((report["missing"],report["stale"],report["ok"]),(["X1-C.json"],["X1-B.json"],False))
+        self.assertTrue(self.backend.check_manifest(self.dir_path)["ok"])
+        self.assertEqual(count_cached_keys(self.dir_path),5)
+
+    #----------
+    def test_updates_are_appended(self):
+        manifest_path = ShardManifest.get_manifest_path(self.dir_path)
+        stamp = ShardLRU.get_file_identity(manifest_path)
+        with batched_cache_writes():
+            for name in "CDE":
+                update_cache_dict({f"X1-{name}1":{}},self.dir_path + f"X1-{name}.json")
+        self.assertEqual(ShardLRU.get_file_identity(manifest_path),stamp)
+        with open(ShardManifest.get_log_path(self.dir_path)) as file:
+            #Header, the two shards of setUp and the three of the batch:
+            self.assertEqual(len(file.readlines()),1 + 2 + 3)
+        #Another process sees the updates:
+        other = FileShardBackend(self.tmp_dir.name)
+        self.assertEqual(other.count_keys(self.dir_path),6)
+        update_cache_dict({"X1-A3":{}},self.dir_path + "X1-A.json")
+        self.assertEqual(other.count_keys(self.dir_path),7)
+        self.assertEqual(other.get_keys(self.dir_path + "X1-A.json"),["X1-A1","X1-A2","X1-A3"])
+
+    #----------
+    def test_log_compacted(self):
+        manifest_path = ShardManifest.get_manifest_path(self.dir_path)
+        with mock.patch.object(ShardManifest,"max_log_lines",4) \
+            ,mock.patch.object(cache_backends,"write_file_atomic",wraps=cache_backends.write_file_atomic) as write:
+            for num in range(10):
+                update_cache_dict({f"X1-A{num}":{}},self.dir_path + "X1-A.json")
+        self.assertGreaterEqual(len([call for call in write.call_args_list if call.args[0] == manifest_path]),2)
+        set_cache_backend(FileShardBackend(self.tmp_dir.name))
+        self.assertEqual(count_cached_keys(self.dir_path),11)
+        self.assertTrue(get_cache_backend().check_manifest(self.dir_path)["ok"])
+
+    #----------
+    def test_log_of_replaced_manifest_ignored(self):
+        log_path = ShardManifest.get_log_path(self.dir_path)
+        with open(log_path,"rb") as file:
+            old_log = file.read()
+        #A crash after compacting, before the old log was removed:
+        with mock.patch.object(ShardManifest,"max_log_lines",0):
+            update_cache_dict({"X1-B2":{}},self.dir_path + "X1-B.json")
+        with open(log_path,"wb") as file:
+            file.write(old_log)
+        set_cache_backend(FileShardBackend(self.tmp_dir.name))
+        self.assertEqual(get_cached_keys(self.dir_path + "X1-B.json"),["X1-B1","X1-B2"])
+        update_cache_dict({"X1-B3":{}},self.dir_path + "X1-B.json")
+        #An unfinished line is left for later, and dropped by the next writer:
+        with open(log_path,"ab") as file:
+            file.write(b'{"name": "X1-B.js')
+        self.assertEqual(count_cached_keys(self.dir_path),5)
+        update_cache_dict({"X1-B4":{}},self.dir_path + "X1-B.json")
+        set_cache_backend(FileShardBackend(self.tmp_dir.name))
+        self.assertEqual(count_cached_keys(self.dir_path),6)
+        self.assertTrue(get_cache_backend().check_manifest(self.dir_path)["ok"])
+
+    #----------
+    def test_built_for_existing_cache(self):
+        os.remove(ShardManifest.get_manifest_path(self.dir_path))
+        set_cache_backend(FileShardBackend(self.tmp_dir.name))
+        self.assertEqual(count_cached_keys(self.dir_path),3)
+        self.assertTrue(os.path.exists(ShardManifest.get_manifest_path(self.dir_path)))
+
+
+#==========
+class TestTtl(unittest.TestCase):
+    """Unit testing for record TTLs and stale-while-revalidate refreshes"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name + "/"
+        self.file_path = self.root + "markets/X1-A.json"
+        set_cache_backend(FileShardBackend(self.root))
+        set_ttl_policy(TtlPolicy(self.root,{"markets":300,"systems":"reset"}))
+        self.fetches = []
+
+    #----------
+    def tearDown(self):
+        cache_refresher.wait()
+        set_cache_backend(FileShardBackend())
+        set_ttl_policy(TtlPolicy())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def get_market(self,waypoint:str) -> dict:
+        @dict_cache_wrapper(self.file_path,waypoint)
+        def fetch() -> dict:
+            self.fetches.append(waypoint)
+            return {waypoint:{"fetch":len(self.fetches)}}
+        return fetch()
+
+    #----------
+    def test_fresh_record_is_not_refreshed(self):
+        self.get_market("X1-A1")
+        self.assertEqual(self.get_market("X1-A1"),{"X1-A1":{"fetch":1}})
+        cache_refresher.wait()
+        self.assertEqual(self.fetches,["X1-A1"])
+
+    #----------
+    def test_stale_record_served_then_refreshed(self):
+        self.get_market("X1-A1")
+        self.get_market("X1-A2")
+        fetched_at = get_cache_backend().get_fetched_at(self.file_path,"X1-A2")
+        with mock.patch.object(cache_utilities,"time",return_value=time() + 301):
+            #Stale, but returned right away:
+            self.assertEqual(self.get_market("X1-A1"),{"X1-A1":{"fetch":1}})
+            cache_refresher.wait()
+        self.assertEqual(self.fetches,["X1-A1","X1-A2","X1-A1"])
+        self.assertEqual(get_cached_record(self.file_path,"X1-A1"),{"X1-A1":{"fetch":3}})
+        #Only the refreshed record counts as newly fetched:
+        self.assertEqual(get_cache_backend().get_fetched_at(self.file_path,"X1-A2"),fetched_at)
+
+    #----------
+    def test_reset_ttl(self):
+        file_path = self.root + "systems/X1-A.json"
+        update_cache_dict({"X1-AB":{}},file_path)
+        policy = get_ttl_policy()
+        self.assertFalse(is_record_stale(file_path,"X1-AB"))
+        policy.reset_time = time() + 60
+        self.assertTrue(is_record_stale(file_path,"X1-AB"))
+
+
+#==========
+class TestNegativeCache(unittest.TestCase):
+    """Unit testing for caching 'nothing here' API responses"""
+    #----------
+    url = "https://api.spacetraders.io/v2/systems/X1-AB12/waypoints/X1-AB12-3C/market"
+
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        set_cache_backend(FileShardBackend(self.tmp_dir.name))
+        self.cache = NegativeCache(self.tmp_dir.name + "/negative/",ttl=60,endpoints=["market","shipyard"])
+        self.not_found = {"http_status":404,"http_data":{"error":{"message":"Market not found"}}}
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def test_not_found_is_remembered(self):
+        self.assertIsNone(self.cache.get("GET",self.url))
+        self.assertTrue(self.cache.put("GET",self.url,self.not_found))
+        self.assertEqual(self.cache.get("GET",self.url),self.not_found)
+        self.assertEqual(self.cache.get_stats(),{"market":{"stored":1,"avoided":1,"expired":0}})
+
+    #----------
+    def test_only_definitive_answers_for_listed_endpoints(self):
+        self.assertFalse(self.cache.put("GET",self.url,{"http_status":429,"http_data":{}}))
+        self.assertFalse(self.cache.put("GET",self.url,{"http_status":200,"http_data":{"data":{"symbol":"X"}}}))
+        self.assertFalse(self.cache.put("GET",self.url.replace("/market","/jump-gate"),self.not_found))
+        self.assertFalse(self.cache.put("POST",self.url,self.not_found))
+        self.assertTrue(self.cache.put("GET",self.url,{"http_status":200,"http_data":{"data":[]}}))
+
+    #----------
+    def test_expiry(self):
+        self.cache.put("GET",self.url,self.not_found)
+        with mock.patch.object(cache_utilities,"time",return_value=time() + 61):
+            self.assertIsNone(self.cache.get("GET",self.url))
+        self.assertEqual(self.cache.get_stats()["market"]["expired"],1)
+
+    #----------
+    def test_disabled_without_directory(self):
+        cache = NegativeCache(endpoints=["market"])
+        self.assertFalse(cache.put("GET",self.url,self.not_found))
+        self.assertIsNone(cache.get("GET",self.url))
+
+
+#==========
+class TestCacheEpochs(unittest.TestCase):
+    """Unit testing for splitting the cache by server reset"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = self.tmp_dir.name + "/"
+        self.epochs = CacheEpochs(self.cache_path)
+
+    #----------
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    #----------
+    def test_first_switch_adopts_data_written_since_reset(self):
+        for name in ("systems","markets"):
+            os.makedirs(self.cache_path + name)
+        os.utime(self.cache_path + "markets",(time() - 3600,time() - 3600))
+        self.assertTrue(self.epochs.switch("2024-01-07",since=time() - 60))
+        self.assertFalse(self.epochs.switch("2024-01-07"))
+        self.assertEqual(self.epochs.get_current(),"2024-01-07")
+        self.assertEqual(os.listdir(self.epochs.get_epoch_path("2024-01-07")),["systems"])
+        self.epochs.remove_stale(wait=True)
+        self.assertEqual(sorted(os.listdir(self.cache_path)),[".lock","CURRENT","epochs"])
+
+    #----------
+    def test_old_epochs_removed_in_background(self):
+        self.epochs.switch("2024-01-07")
+        update_cache_dict({"X1-A1":{}},self.epochs.get_epoch_path("2024-01-07") + "systems/X1-A.json")
+        self.epochs.switch("2024-01-21")
+        self.assertEqual(self.epochs.remove_stale(wait=True),1)
+        self.assertEqual(sorted(os.listdir(self.epochs.epochs_path)),[".trash","2024-01-21"])
+        self.assertEqual(os.listdir(self.epochs.trash_path),[])
+        self.assertEqual(self.epochs.get_stats()["removed"],1)
+
+    #----------
+    def test_invalid_epoch(self):
+        self.assertRaises(ValueError,self.epochs.switch,"../systems")
+
+
+#==========
+class TestCacheQuotas(unittest.TestCase):
+    """Unit testing for per-namespace disk quotas with LRU / LFU eviction"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = self.tmp_dir.name + "/markets/"
+        set_cache_backend(FileShardBackend(self.tmp_dir.name))
+        #Strictly increasing access times:
+        self.clock = mock.patch.object(cache_utilities,"time",side_effect=count(1000))
+        self.clock.start()
+
+    #----------
+    def tearDown(self):
+        self.clock.stop()
+        set_cache_quotas(CacheQuotas())
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def use_quota(self,policy:str) -> CacheQuotas:
+        """Quota of 3.5 shards: writing a 4th evicts one (down to 90% = 3.15 shards)"""
+        update_cache_dict({"X1-A1":{"goods":"x" * 500}},self.dir_path + "X1-A.json")
+        shard_bytes = get_cache_backend().get_shard_sizes(self.dir_path)[self.dir_path + "X1-A.json"][1]
+        quotas = CacheQuotas(self.tmp_dir.name,{"markets":{"max_mb":3.5 * shard_bytes / 1024**2,"policy":policy}},check_seconds=0)
+        set_cache_quotas(quotas)
+        for name in ("A","B","C"):
+            update_cache_dict({f"X1-{name}1":{"goods":"x" * 500}},self.dir_path + f"X1-{name}.json")
+        return quotas
+
+    #----------
+    def test_lru_evicts_least_recently_used(self):
+        self.use_quota("lru")
+        get_cached_record(self.dir_path + "X1-A.json","X1-A1")
+        update_cache_dict({"X1-D1":{"goods":"x" * 500}},self.dir_path + "X1-D.json")
+        self.assertEqual([os.path.basename(path) for path in list_cache_files(self.dir_path)]
+                         ,["X1-A.json","X1-C.json","X1-D.json"])
+
+    #----------
+    def test_lfu_evicts_least_frequently_used(self):
+        self.use_quota("lfu")
+        for _ in range(2):
+            get_cached_record(self.dir_path + "X1-A.json","X1-A1")
+            get_cached_record(self.dir_path + "X1-B.json","X1-B1")
+        get_cached_record(self.dir_path + "X1-C.json","X1-C1")
+        update_cache_dict({"X1-D1":{"goods":"x" * 500}},self.dir_path + "X1-D.json")
+        self.assertEqual([os.path.basename(path) for path in list_cache_files(self.dir_path)]
+                         ,["X1-A.json","X1-B.json","X1-D.json"])
+
+    #----------
+    def test_stats_shared_through_access_file(self):
+        quotas = self.use_quota("lru")
+        get_cached_record(self.dir_path + "X1-A.json","X1-A1")
+        get_cached_record(self.dir_path + "X1-A.json","X1-A9")
+        update_cache_dict({"X1-D1":{"goods":"x" * 500}},self.dir_path + "X1-D.json")
+        quotas.save()
+        set_cache_quotas(CacheQuotas(self.tmp_dir.name,{"markets":{"max_mb":1}}))
+        report = get_cache_namespace_report(self.tmp_dir.name)["markets"]
+        self.assertEqual((report["shards"],report["hits"],report["misses"],report["hit_rate"],report["evictions"])
+                         ,(3,1,1,0.5,1))
+        self.assertEqual(report["quota"],{"max_bytes":1024**2,"policy":"lru"})
+
+    #----------
+    def test_unknown_policy(self):
+        self.assertRaises(ValueError,CacheQuotas,self.tmp_dir.name,{"markets":{"max_mb":1,"policy":"fifo"}})
+
+
+#==========
+class TestCrashSafety(unittest.TestCase):
+    """Unit testing for locked, journaled cache writes shared by several processes"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = self.tmp_dir.name + "/systems/"
+        set_cache_backend(FileShardBackend(self.tmp_dir.name))
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    @staticmethod
+    def write_records(root:str,dir_path:str,worker:int) -> None:
+        backend = FileShardBackend(root)
+        for num in range(25):
+            backend.upsert(dir_path + "X1-A.json",{f"X1-A{worker}-{num}":{"worker":worker}})
+        backend.close()
+
+    #----------
+    def test_concurrent_processes_keep_all_records(self):
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=self.write_records,args=(self.tmp_dir.name,self.dir_path,num))
+                   for num in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        backend = FileShardBackend(self.tmp_dir.name)
+        self.assertEqual(len(backend.read_shard(self.dir_path + "X1-A.json")),100)
+        self.assertEqual(backend.count_keys(self.dir_path),100)
+        self.assertTrue(backend.check_manifest(self.dir_path)["ok"])
+
+    #----------
+    def test_uncommitted_write_is_repaired(self):
+        update_cache_dict({"X1-A1":{}},self.dir_path + "X1-A.json")
+        #A process that died after replacing a shard, before updating the manifest:
+        with open(self.dir_path + "X1-A.json","w") as file:
+            file.write(json.dumps({"X1-A1":{},"X1-A2":{}}))
+        with open(self.dir_path + ".tmp-999999-abc","w") as file:
+            file.write("{")
+        journal_path = os.path.join(self.tmp_dir.name,".journal","999999.wal")
+        with open(journal_path,"w") as file:
+            file.write(json.dumps({"begin":1,"shards":[os.path.abspath(self.dir_path + "X1-A.json")]}) + "\n")
+            file.write('{"commit":')
+        backend = FileShardBackend(self.tmp_dir.name)
+        self.assertEqual(backend.recovered,{"journals":1,"directories":[os.path.abspath(self.dir_path)]})
+        self.assertEqual(backend.count_keys(self.dir_path),2)
+        self.assertFalse(os.path.exists(journal_path))
+        self.assertFalse(os.path.exists(self.dir_path + ".tmp-999999-abc"))
+
+    #----------
+    def test_committed_writes_need_no_repair(self):
+        update_cache_dict({"X1-A1":{}},self.dir_path + "X1-A.json")
+        journal = WriteJournal(os.path.join(self.tmp_dir.name,".journal"),mock.Mock())
+        self.assertEqual(journal.recover()["journals"],0)
+        get_cache_backend().close()
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir.name,".journal")),[])
+
+    #----------
+    def test_failed_write_keeps_old_file(self):
+        file_path = os.path.join(self.tmp_dir.name,"checkpoint.json")
+        basic_utilities.write_dict_to_file(file_path,{"page":1})
+        with mock.patch.object(cache_backends.os,"fsync",side_effect=OSError("disk full")):
+            self.assertRaises(OSError,basic_utilities.write_dict_to_file,file_path,{"page":2})
+        self.assertEqual(basic_utilities.get_dict_from_file(file_path),{"page":1})
+        self.assertEqual(os.listdir(self.tmp_dir.name),["checkpoint.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
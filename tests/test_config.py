@@ -0,0 +1,82 @@
+"""
+Code for testing the 'SpaceTraderConfigSetup' class
+"""
+
+#==========
+import os
+import yaml
+import tempfile
+import unittest
+from unittest import mock
+from src.base import *
+
+#==========
+class TestConfigSetup(unittest.TestCase):
+    """Unit testing for 'SpaceTraderConfigSetup' class, using a temporary config file"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name,"gameinfo.yaml")
+        config = {
+            "agents":{"all_agents":[{"callsign":"FIRST","key_encrypted":"abc"}],"current":"FIRST"}
+            ,"api":{"url":"https://api.spacetraders.io/v2"}
+            ,"cache":{"path":"./gameData/"}
+        }
+        with open(self.config_path,"w") as file:
+            yaml.dump(config,file)
+        self.path_patch = mock.patch.object(SpaceTraderConfigSetup,"config_path",self.config_path)
+        self.path_patch.start()
+        self.config_setup = SpaceTraderConfigSetup()
+
+    #----------
+    def tearDown(self):
+        self.path_patch.stop()
+        self.tmp_dir.cleanup()
+
+    #----------
+    def test_parsed_once(self):
+        with mock.patch("src.base.yaml.safe_load",wraps=yaml.safe_load) as safe_load:
+            self.config_setup.get_api_url()
+            self.config_setup.get_cache_path()
+            SpaceTraderConfigSetup().get_current_player()
+            self.assertEqual(safe_load.call_count,1)
+
+    #----------
+    def test_external_change_picked_up(self):
+        self.assertEqual(self.config_setup.get_current_player(),"FIRST")
+        with open(self.config_path) as file:
+            config = yaml.safe_load(file)
+        config['agents']['current'] = "SECOND-AGENT"
+        with open(self.config_path,"w") as file:
+            yaml.dump(config,file)
+        self.assertEqual(self.config_setup.get_current_player(),"SECOND-AGENT")
+
+    #----------
+    def test_returned_config_is_a_copy(self):
+        self.config_setup.get_config()['agents']['current'] = "CHANGED"
+        self.assertEqual(self.config_setup.get_current_player(),"FIRST")
+
+    #----------
+    def test_add_new_agent_single_write(self):
+        with mock.patch("src.base.yaml.dump",wraps=yaml.dump) as dump:
+            self.config_setup.add_new_agent("SECOND","def")
+            self.assertEqual(dump.call_count,1)
+        self.assertEqual(self.config_setup.get_current_player(),"SECOND")
+        self.assertEqual(self.config_setup.get_all_callsigns(),["FIRST","SECOND"])
+        #No temporary files left behind:
+        self.assertEqual(os.listdir(self.tmp_dir.name),["gameinfo.yaml"])
+
+    #----------
+    def test_write_follows_durable_setting(self):
+        with mock.patch("src.utilities.cache_backends.os.fsync") as fsync:
+            self.config_setup.set_new_current_agent("FIRST")
+            self.assertTrue(fsync.called)
+            config = self.config_setup.get_config()
+            config["cache"]["durable"] = False
+            fsync.reset_mock()
+            self.config_setup.write_to_file(config)
+            fsync.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+"""
+Code for testing the HTTP utilities (sessions, connection pooling, rate limiting, retries)
+"""
+
+#==========
+import json
+from copy import deepcopy
+from threading import Thread
+from time import sleep
+from unittest import mock
+from src.utilities import http_utilities
+from src.utilities.http_utilities import *
+import unittest
+
+#----------
+def make_response(status:int,headers:dict={},body:dict={}) -> Response:
+    response = Response()
+    response.status_code = status
+    response.headers.update(headers)
+    response._content = json.dumps(body).encode()
+    return response
+
+#==========
+class TestSessionManager(unittest.TestCase):
+    """Unit testing for 'SessionManager' class"""
+    #----------
+    stats_schema = ['requests_sent','connections_opened','connections_reused','reuse_ratio']
+
+    #----------
+    def test_pool_settings(self):
+        manager = SessionManager(pool_connections=2,pool_maxsize=7)
+        self.assertIs(manager.session.get_adapter("https://example.com"),manager.adapter)
+        self.assertEqual(manager.adapter._pool_maxsize,7)
+
+    #----------
+    def test_keep_alive_disabled(self):
+        manager = SessionManager(keep_alive=False)
+        self.assertEqual(manager.session.headers["Connection"],"close")
+
+    #----------
+    def test_stats_without_requests(self):
+        stats = SessionManager().get_stats()
+        self.assertEqual(set(stats.keys()),set(self.stats_schema))
+        self.assertEqual(stats['requests_sent'],0)
+        self.assertEqual(stats['reuse_ratio'],0.0)
+
+
+#==========
+class TestRateLimiter(unittest.TestCase):
+    """Unit testing for 'RateLimiter' and 'TokenBucket' classes"""
+    #----------
+    def test_burst_then_empty(self):
+        limiter = RateLimiter(rate=1,burst=3,burst_seconds=300)
+        results = [limiter.try_acquire() for _ in range(5)]
+        #1 token from the steady bucket + 3 from the burst pool:
+        self.assertEqual(results,[True,True,True,True,False])
+
+    #----------
+    def test_acquire_waits_for_refill(self):
+        limiter = RateLimiter(rate=20,burst=1,burst_seconds=100)
+        for _ in range(21):
+            limiter.try_acquire()
+        waited = limiter.acquire()
+        self.assertGreater(waited,0)
+        self.assertLess(waited,0.2)
+
+    #----------
+    def test_drain(self):
+        limiter = RateLimiter(rate=2,burst=10,burst_seconds=10)
+        limiter.drain()
+        self.assertFalse(limiter.try_acquire())
+        self.assertLess(limiter.get_budget()['burst_remaining'],1)
+
+
+#==========
+class TestPriorityScheduler(unittest.TestCase):
+    """Unit testing for 'PriorityScheduler' class"""
+    #----------
+    def run_queued(self,requests:list[tuple]) -> list:
+        """Queue (priority,owner,name) requests behind an empty rate limit; return serving order"""
+        limiter = RateLimiter(rate=20,burst=1,burst_seconds=1000)
+        while limiter.try_acquire(): pass
+        scheduler = PriorityScheduler(limiter)
+        order = []
+        def send(priority,owner,name):
+            scheduler.acquire(priority,owner)
+            order.append(name)
+        threads = []
+        for request in requests:
+            threads.append(Thread(target=send,args=request))
+            threads[-1].start()
+            sleep(0.005) #Keep enqueue order deterministic
+        for thread in threads: thread.join()
+        self.scheduler = scheduler
+        return order
+
+    #----------
+    def test_priority_order(self):
+        order = self.run_queued([(3,None,"bg1"),(3,None,"bg2"),(1,None,"player"),(2,"SHIP-1","ship")])
+        #bg1 is first in line before the others arrive and may already hold the head of the queue:
+        self.assertEqual(order[-1],"bg2")
+        self.assertLess(order.index("player"),order.index("ship"))
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats[3]["served"],2)
+        self.assertEqual(stats[1]["queue_depth"],0)
+
+    #----------
+    def test_interrupted_waiter_leaves_queue(self):
+        limiter = RateLimiter(rate=20,burst=1,burst_seconds=1000)
+        scheduler = PriorityScheduler(limiter)
+        with mock.patch.object(limiter,"try_acquire",side_effect=KeyboardInterrupt):
+            self.assertRaises(KeyboardInterrupt,scheduler.acquire,1)
+        served = []
+        thread = Thread(target=lambda: served.append(scheduler.acquire(2)),daemon=True)
+        thread.start()
+        thread.join(timeout=2)
+        self.assertEqual(len(served),1)
+        self.assertEqual(scheduler.get_stats()[1]["queue_depth"],0)
+
+    #----------
+    def test_fair_between_owners(self):
+        order = self.run_queued([(2,"A","a1"),(2,"A","a2"),(2,"A","a3"),(2,"B","b1")])
+        self.assertLess(order.index("b1"),order.index("a3"))
+
+
+#==========
+class TestRetryPolicy(unittest.TestCase):
+    """Unit testing for 'RetryPolicy' class"""
+    #----------
+    policy = RetryPolicy(max_retries=2,backoff_base=0.5,backoff_max=4,safe_post_suffixes=["/orbit"])
+    ship_url = "https://api.spacetraders.io/v2/my/ships/SHIP-1"
+
+    #----------
+    def test_which_requests_retry(self):
+        self.assertTrue(self.policy.should_retry("GET",self.ship_url,503,0))
+        self.assertTrue(self.policy.should_retry("POST",self.ship_url + "/orbit",503,0))
+        self.assertTrue(self.policy.should_retry("POST",self.ship_url + "/purchase",429,0))
+        self.assertFalse(self.policy.should_retry("POST",self.ship_url + "/purchase",503,0))
+        self.assertFalse(self.policy.should_retry("PATCH",self.ship_url + "/nav",503,0))
+        self.assertTrue(RetryPolicy(safe_post_suffixes=["/nav"]).should_retry("PATCH",self.ship_url + "/nav",503,0))
+        self.assertFalse(self.policy.should_retry("GET",self.ship_url,404,0))
+        self.assertFalse(self.policy.should_retry("GET",self.ship_url,503,2))
+
+    #----------
+    def test_retry_after_header(self):
+        delay = self.policy.get_delay(0,make_response(429,headers={"Retry-After":"2"}))
+        self.assertGreaterEqual(delay,2)
+        self.assertLessEqual(delay,2.5)
+
+    #----------
+    def test_retry_after_in_body(self):
+        body = {"error":{"code":429,"data":{"retryAfter":1.5}}}
+        delay = self.policy.get_delay(0,make_response(429,body=body))
+        self.assertGreaterEqual(delay,1.5)
+
+    #----------
+    def test_backoff_is_bounded(self):
+        delays = [self.policy.get_delay(10,make_response(503)) for _ in range(20)]
+        self.assertTrue(all(0 <= d <= 4 for d in delays))
+
+    #----------
+    def test_stats(self):
+        policy = RetryPolicy()
+        policy.record_retry(429,1.0)
+        policy.record_retry(None,0.5)
+        stats = policy.get_stats()
+        self.assertEqual(stats['retries'],2)
+        self.assertEqual(stats['retries_by_status'],{"429":1,"connection_error":1})
+        self.assertEqual(stats['seconds_waited'],1.5)
+
+
+#==========
+class TestRequestCoalescer(unittest.TestCase):
+    """Unit testing for 'RequestCoalescer' class"""
+    #----------
+    def test_identical_requests_share_result(self):
+        coalescer = RequestCoalescer()
+        calls = []
+        results = []
+        def slow_request():
+            calls.append(1)
+            sleep(0.1)
+            return {"data":{"symbol":"X1-AB"}}
+        threads = [Thread(target=lambda: results.append(coalescer.run("key","/systems/{id}",slow_request)))
+                   for _ in range(5)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.assertEqual(len(calls),1)
+        self.assertEqual(len(results),5)
+        #Each caller gets its own copy of the data:
+        self.assertEqual(len(set(id(res) for res in results)),5)
+        self.assertEqual(coalescer.get_stats(),{"/systems/{id}":{"requests":5,"coalesced":4}})
+
+    #----------
+    def test_leader_changes_dont_reach_followers(self):
+        coalescer = RequestCoalescer()
+        followers = []
+        def request():
+            #Waiting for the follower to join the flight:
+            while coalescer.get_stats()["endpoint"]["coalesced"] < 1:
+                sleep(0.01)
+            return {"data":{"symbol":"X1-AB"}}
+        def slow_deepcopy(data):
+            sleep(0.05)
+            return deepcopy(data)
+        with mock.patch.object(http_utilities,"deepcopy",slow_deepcopy):
+            follower = Thread(target=lambda: followers.append(coalescer.run("key","endpoint",request)))
+            leader = Thread(target=lambda: coalescer.run("key","endpoint",request)["data"].update(symbol="CHANGED"))
+            leader.start()
+            while not coalescer.get_stats():
+                sleep(0.01)
+            follower.start()
+            leader.join()
+            follower.join()
+        self.assertEqual(followers,[{"data":{"symbol":"X1-AB"}}])
+
+    #----------
+    def test_errors_are_shared(self):
+        coalescer = RequestCoalescer()
+        def failing_request():
+            raise ValueError("failed")
+        self.assertRaises(ValueError,coalescer.run,"key","endpoint",failing_request)
+        #Failed flights are not kept around:
+        self.assertEqual(coalescer.run("key","endpoint",lambda: 1),1)
+
+    #----------
+    def test_endpoint_label(self):
+        url = "https://api.spacetraders.io/v2/systems/X1-AB12/waypoints/X1-AB12-3/market?page=2"
+        self.assertEqual(get_endpoint_label(url),"/v2/systems/{id}/waypoints/{id}/market")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Code for testing the resident price index behind the price chart
+"""
+
+#==========
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.utilities import cache_utilities
+from src.utilities.cache_utilities import FileShardBackend,set_cache_backend,read_cache_file,write_cache_file
+from src.utilities.price_index import PriceHeap,PriceIndex
+
+#==========
+def trade_good(sym:str,purchase:int,sell:int) -> dict:
+    return {"symbol":sym,"purchasePrice":purchase,"sellPrice":sell}
+
+#==========
+class TestPriceIndex(unittest.TestCase):
+    """Unit testing for PriceIndex and the price chart it persists"""
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.chart_path = os.path.join(self.tmp_dir.name,"price_chart.json")
+        set_cache_backend(FileShardBackend())
+
+    #----------
+    def tearDown(self):
+        set_cache_backend(FileShardBackend())
+        self.tmp_dir.cleanup()
+
+    #----------
+    def test_heap_keeps_best_prices(self):
+        heap = PriceHeap(depth=3,low_best=True)
+        for num,price in enumerate([50,10,40,30,20,60]):
+            heap.add(f"X1-W{num}",price)
+        self.assertEqual(heap.get_prices(),{"X1-W1":10,"X1-W4":20,"X1-W3":30})
+        self.assertEqual(heap.get_best(),{"X1-W1":10})
+        #A kept market's price changes:
+        heap.add("X1-W1",35)
+        self.assertEqual(heap.get_prices(),{"X1-W4":20,"X1-W3":30,"X1-W1":35})
+        sell_heap = PriceHeap(depth=2,low_best=False)
+        for num,price in enumerate([5,9,7]):
+            sell_heap.add(f"X1-W{num}",price)
+        self.assertEqual(sell_heap.get_prices(),{"X1-W1":9,"X1-W2":7})
+
+    #----------
+    def test_updates_are_batched(self):
+        index = PriceIndex(self.chart_path,depth=2,flush_seconds=3600)
+        with mock.patch.object(cache_utilities.cache_backend,"write_shard") as write:
+            for num in range(20):
+                index.update_market(f"X1-W{num}",[trade_good("IRON",100 + num,50 + num)])
+            write.assert_not_called()
+        self.assertEqual(index.get_best_prices("IRON"),({"X1-W0":100},{"X1-W19":69}))
+        self.assertTrue(index.flush())
+        self.assertFalse(index.flush())
+        self.assertEqual(read_cache_file(self.chart_path)
+                         ,{"IRON":{"purchase_prices":{"X1-W0":100,"X1-W1":101}
+                                   ,"sell_prices":{"X1-W19":69,"X1-W18":68}}})
+
+    #----------
+    def test_loads_existing_chart(self):
+        #Written with a larger depth - only the best prices are kept:
+        write_cache_file(self.chart_path,{"IRON":{"purchase_prices":{"X1-A":30,"X1-B":10,"X1-C":20}
+                                                  ,"sell_prices":{"X1-A":5,"X1-B":15,"X1-C":25}}})
+        index = PriceIndex(self.chart_path,depth=2,flush_seconds=0)
+        self.assertEqual(index.get_commodities(),["IRON"])
+        index.update_market("X1-D",[trade_good("COPPER",1,2)])
+        self.assertEqual(read_cache_file(self.chart_path)["IRON"]
+                         ,{"purchase_prices":{"X1-B":10,"X1-C":20},"sell_prices":{"X1-C":25,"X1-B":15}})
+
+    #----------
+    def test_merges_writes_of_other_processes(self):
+        index = PriceIndex(self.chart_path,depth=3,flush_seconds=3600)
+        other = PriceIndex(self.chart_path,depth=3,flush_seconds=3600)
+        index.update_market("X1-A",[trade_good("IRON",10,5)])
+        other.update_market("X1-B",[trade_good("IRON",20,8),trade_good("GOLD",90,80)])
+        other.flush()
+        index.flush()
+        chart = read_cache_file(self.chart_path)
+        self.assertEqual(chart["IRON"]["purchase_prices"],{"X1-A":10,"X1-B":20})
+        self.assertIn("GOLD",chart)
+        self.assertEqual(index.get_stats()["merges"],1)
+
+    #----------
+    def test_clear(self):
+        index = PriceIndex(self.chart_path,flush_seconds=0)
+        index.update_market("X1-A",[trade_good("IRON",10,5)])
+        index.clear()
+        index.flush()
+        self.assertEqual(read_cache_file(self.chart_path),{})
+        self.assertRaises(ValueError,PriceIndex,self.chart_path,depth=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
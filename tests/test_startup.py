@@ -0,0 +1,225 @@
+"""
+Code for testing the startup cost of the client (API calls and key derivations when connecting)
+"""
+
+#==========
+import os
+import json
+import asyncio
+import importlib
+import yaml
+import tempfile
+import unittest
+from unittest import mock
+from requests.models import Response
+from src.base import *
+from src.ships import Ships
+from src.systems import Systems,AsyncSystems
+from src.markets import Markets
+from src.contracts import Contracts
+from src.factions import Factions
+from src import base,ship_operator
+from src.prefetch import CacheWarmer
+from src.sync_jobs import CacheSyncJob
+from src.utilities import crypt_utilities
+from src.utilities.http_utilities import SessionManager
+
+#==========
+class TestStartup(unittest.TestCase):
+    """Unit testing that all endpoint classes share one lazily-created connection.
+    Runs against a temporary config file and a fake API, so it needs no network or real agent."""
+    #----------
+    password = "startup-test-password"
+
+    #----------
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        config_path = os.path.join(self.tmp_dir.name,"gameinfo.yaml")
+        #Few iterations - this test counts key derivations, it doesn't need them to be slow:
+        encrypted_key = password_encrypt(b"fake-token",self.password,iterations=1000).decode()
+        config = {
+            "agents":{"all_agents":[{"callsign":"TESTER","key_encrypted":encrypted_key}],"current":"TESTER"}
+            ,"api":{"url":"https://api.spacetraders.io/v2"}
+            ,"cache":{"path":self.tmp_dir.name + "/gameData/"}
+        }
+        with open(config_path,"w") as file:
+            yaml.dump(config,file)
+
+        self.http_calls = []
+        #Response data by URL (without query), for tests that need more than an agent:
+        self.routes = {}
+        self.patches = [
+            mock.patch.object(SpaceTraderConfigSetup,"config_path",config_path)
+            ,mock.patch.dict(os.environ,{"SPACETRADER_PASSWORD":self.password})
+            ,mock.patch.object(SessionManager,"request",self.fake_request)
+            ,mock.patch.object(crypt_utilities,"_derive_key",wraps=crypt_utilities._derive_key)
+            ,mock.patch.dict(base._reset_dates,clear=True)
+            #(A fresh rate limit budget for every test)
+            ,mock.patch.object(base,"_shared_rate_limiter",None)
+            ,mock.patch.object(base,"_shared_scheduler",None)
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.derive_key = crypt_utilities._derive_key
+        reset_shared_connection()
+
+    #----------
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        reset_shared_connection()
+        crypt_utilities.clear_key_cache()
+        self.tmp_dir.cleanup()
+
+    #----------
+    def fake_request(self,method:str,url:str,**kwargs) -> Response:
+        self.http_calls.append((method,url))
+        response = Response()
+        response.status_code = 200
+        if url == "https://api.spacetraders.io/v2/":
+            response._content = json.dumps({"status":"up","resetDate":"2024-01-07"}).encode()
+        elif url in self.routes:
+            response._content = json.dumps(self.routes[url]).encode()
+        elif url.split("?")[0] in self.routes:
+            response._content = json.dumps(self.routes[url.split("?")[0]]).encode()
+        else:
+            response._content = json.dumps({"data":{"symbol":"TESTER"}}).encode()
+        return response
+
+    #----------
+    def test_no_connection_at_import(self):
+        #(Re-run, as the module was imported before the fake API was in place)
+        importlib.reload(ship_operator)
+        self.assertEqual(len(self.http_calls),0)
+        self.assertEqual(self.derive_key.call_count,0)
+
+    #----------
+    def test_single_connection_for_all_endpoints(self):
+        endpoints = [Ships(),Systems(),Markets(),Contracts(),Factions()]
+        connections = set(id(endpoint.stc) for endpoint in endpoints)
+        self.assertEqual(len(connections),1)
+        self.assertEqual(self.http_calls,[("GET","https://api.spacetraders.io/v2/my/agent")])
+        self.assertEqual(self.derive_key.call_count,1)
+
+    #----------
+    def test_reset_creates_new_connection(self):
+        Ships()
+        reset_shared_connection()
+        Systems()
+        self.assertEqual(len(self.http_calls),2)
+        #The key derived for the first connection is re-used:
+        self.assertEqual(self.derive_key.call_count,1)
+
+    #----------
+    def test_cache_split_by_reset(self):
+        config_setup = SpaceTraderConfigSetup()
+        with open(config_setup.config_path) as file:
+            config = yaml.safe_load(file)
+        config["cache"]["epochs"] = True
+        config_setup.write_to_file(config)
+        epoch_path = self.tmp_dir.name + "/gameData/epochs/2024-01-07/"
+        self.assertEqual(Systems().stc.base_cache_path,epoch_path)
+        self.assertEqual(get_cache_backend().root,os.path.abspath(epoch_path))
+        with open(self.tmp_dir.name + "/gameData/CURRENT") as file:
+            self.assertEqual(file.read(),"2024-01-07")
+        #Connections created later don't ask for the server status again:
+        reset_shared_connection()
+        Systems()
+        self.assertEqual(self.http_calls.count(("GET","https://api.spacetraders.io/v2/")),1)
+
+    #----------
+    def test_cache_warmup(self):
+        base_url = "https://api.spacetraders.io/v2"
+        self.routes = {
+            f"{base_url}/my/ships":{"data":[{"symbol":"TESTER-1","nav":{"systemSymbol":"X1-A"}}]
+                                    ,"meta":{"total":1,"page":1,"limit":20}}
+            ,f"{base_url}/systems/X1-A":{"data":{"symbol":"X1-A","waypoints":[
+                {"symbol":"X1-A-M","traits":[{"symbol":"MARKETPLACE"}]},{"symbol":"X1-A-P","traits":[]}]}}
+            ,f"{base_url}/systems/X1-A/waypoints/X1-A-M/market":{"data":{"symbol":"X1-A-M","imports":[],"exports":[],"exchange":[]}}
+        }
+        warmer = CacheWarmer()
+        self.assertRaises(ValueError,warmer.start,["ships","everything"])
+        self.assertTrue(warmer.start(["ships","markets"]))
+        self.assertFalse(warmer.start(["ships"]))
+        warmer.wait()
+        urls = [url.split("?")[0] for method,url in self.http_calls]
+        self.assertEqual(urls.count(f"{base_url}/systems/X1-A"),1)
+        self.assertIn(f"{base_url}/systems/X1-A/waypoints/X1-A-M/market",urls)
+        self.assertNotIn(f"{base_url}/systems/X1-A/waypoints/X1-A-P/market",urls)
+        #Warmed up data comes from the cache:
+        Systems().get_system("X1-A")
+        Markets().get_market("X1-A-M")
+        self.assertEqual(len(self.http_calls),len(urls))
+        #Prefetched ship lists are handed out once:
+        self.assertEqual(list(warmer.take("ships")),["TESTER-1"])
+        self.assertIsNone(warmer.take("ships"))
+        self.assertIsNone(warmer.take("contracts"))
+        self.assertEqual(warmer.get_stats()["sets"]["markets"]["status"],"ok")
+
+    #----------
+    def test_failed_warmup_doesnt_block(self):
+        warmer = CacheWarmer()
+        with mock.patch.object(CacheWarmer,"_fetch_ships",side_effect=SystemExit("Key decryption failed")):
+            warmer.start(["ships"])
+            warmer.wait()
+        #The game exits as it would have without the warm-up, instead of waiting forever:
+        self.assertRaises(SystemExit,warmer.take,"ships")
+        self.assertEqual(warmer.get_stats()["sets"]["ships"]["status"],"failed")
+
+    #----------
+    def test_async_endpoints(self):
+        base_url = "https://api.spacetraders.io/v2"
+        system = {"symbol":"X1-A","waypoints":[]}
+        self.routes = {f"{base_url}/systems":{"data":[system],"meta":{"total":1,"page":1,"limit":20}}}
+        systems = AsyncSystems()
+        #Same method as Systems - checkpointed like a synchronous reload:
+        checkpoint = asyncio.run(systems.reload_systems_in_cache(resume=True))
+        self.assertEqual((checkpoint["completed"],checkpoint["records"]),(True,1))
+        self.assertEqual(asyncio.run(systems.get_system("X1-A")),{"X1-A":system})
+        self.assertNotIn(("GET",f"{base_url}/systems/X1-A"),self.http_calls)
+
+    #----------
+    def test_paginated_data_errors(self):
+        url = "https://api.spacetraders.io/v2/systems"
+        connection = get_shared_connection()
+        self.routes = {url:{"data":[],"meta":{"total":0,"page":1,"limit":20}}}
+        self.assertEqual(list(connection.stc_get_paginated_data("GET",url)),[])
+        self.routes = {url:{"error":{"message":"Rate limit exceeded","code":429}}}
+        self.assertRaises(Exception,list,connection.stc_get_paginated_data("GET",url))
+
+    #----------
+    def test_sync_stops_at_error_page(self):
+        url = "https://api.spacetraders.io/v2/systems"
+        systems = [{"symbol":f"X1-A{num}","waypoints":[]} for num in range(20)]
+        self.routes = {
+            url:{"data":systems,"meta":{"total":45,"page":1,"limit":20}}
+            ,f"{url}?limit=20&page=2":{"error":{"message":"Rate limit exceeded","code":429}}
+        }
+        job = Systems()
+        self.assertRaises(Exception,job.reload_systems_in_cache)
+        self.assertFalse(CacheSyncJob(job.stc,"systems",url,None).get_checkpoint().get("completed"))
+        #Resuming requests the failed page again and completes once all 3 pages are written:
+        del self.routes[f"{url}?limit=20&page=2"]
+        checkpoint = job.reload_systems_in_cache(resume=True)
+        self.assertEqual((checkpoint["completed"],checkpoint["last_page"],checkpoint["records"]),(True,3,60))
+        #Pages running out before 'meta.total' is reached doesn't complete the sync:
+        first_page = job.stc.stc_http_request("GET",url)
+        with mock.patch.object(SpaceTraderConnection,"stc_get_paginated_data",return_value=iter([first_page])):
+            checkpoint = job.reload_systems_in_cache()
+        self.assertEqual((checkpoint["completed"],checkpoint["last_page"]),(False,1))
+
+    #----------
+    def test_wrong_password_not_served_from_cache(self):
+        Ships()
+        encrypted_key = SpaceTraderConfigSetup().get_encrypted_key("TESTER").encode()
+        self.assertRaises(SystemExit,crypt_utilities.password_decrypt,encrypted_key,"wrong-password")
+        #A token decrypted before is re-used without a password - nothing to check it against is kept:
+        get_password = mock.Mock(return_value="wrong-password")
+        self.assertEqual(crypt_utilities.password_decrypt_cached(encrypted_key,get_password),b"fake-token")
+        get_password.assert_not_called()
+        crypt_utilities.clear_key_cache()
+        self.assertRaises(SystemExit,crypt_utilities.password_decrypt_cached,encrypted_key,get_password)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,8 @@ Code for testing the 'systems' class
 """
 
 #==========
-from src.utilities.basic_utilities import empty_directory,remove_dict_record_if_exists
+from src.utilities.basic_utilities import empty_directory
+from src.utilities.cache_utilities import get_cache_backend
 from collections import Counter
 from src.systems import *
 import unittest
@@ -14,7 +15,6 @@ class TestSystems(unittest.TestCase):
     #----------
     system_name = "X1-UF87"
     system_schema = ['symbol','sectorSymbol','type','x','y','waypoints','factions']
-    system_filepath = "./gameData/systems/X1-A.json"
 
     shipyard_waypoint = 'X1-ZT91-25027X'
     shipyard_schema = ['symbol', 'shipTypes', 'transactions', 'ships']
@@ -24,6 +24,7 @@ class TestSystems(unittest.TestCase):
 
 
     system = Systems()
+    system_filepath = system.create_cache_path(system_name)
 
     #----------
     def test_get_shipyard(self):
@@ -39,7 +40,7 @@ class TestSystems(unittest.TestCase):
 
     #----------
     def test_get_system_without_cache(self):
-        remove_dict_record_if_exists(self.system_filepath,self.system_name)
+        get_cache_backend().delete(self.system_filepath,self.system_name)
         data = self.system.get_system(self.system_name)
         keys_counter = Counter(data[self.system_name].keys())
         self.assertEqual(keys_counter,Counter(self.system_schema))